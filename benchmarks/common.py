@@ -0,0 +1,62 @@
+# Shared helpers for the benchmark scripts. Benchmarks run in a scratch working
+# directory so they never touch the real .data caches.
+import os
+import statistics
+import tempfile
+from typing import Any, Dict, List
+
+
+def use_scratch_data_dir() -> str:
+    path = tempfile.mkdtemp(prefix="ff14marketcalc-bench-")
+    os.makedirs(os.path.join(path, ".data"))
+    os.chdir(path)
+    return path
+
+
+def make_item(item_id: int) -> Dict[str, Any]:
+    return {
+        "ID": item_id,
+        "Name": f"Item {item_id}",
+        "LevelItem": item_id % 90 + 1,
+        "AetherialReduce": 0,
+    }
+
+
+def make_recipe(
+    recipe_id: int, result_item_id: int, ingredient_item_ids: List[int]
+) -> Dict[str, Any]:
+    recipe: Dict[str, Any] = {
+        "ID": recipe_id,
+        "ClassJob": {
+            "ID": 8,
+            "Icon": "",
+            "Name": "carpenter",
+            "Url": "/ClassJob/8",
+            "Abbreviation": "CRP",
+            "ClassJobCategory": {"Name": "Disciple of the Hand"},
+        },
+        "RecipeLevelTable": {"ClassJobLevel": recipe_id % 90 + 1},
+        "AmountResult": 1,
+        "ItemResult": make_item(result_item_id),
+    }
+    for ingredient_index in range(10):
+        if ingredient_index < len(ingredient_item_ids):
+            recipe[f"AmountIngredient{ingredient_index}"] = 1 + ingredient_index
+            recipe[f"ItemIngredient{ingredient_index}"] = make_item(
+                ingredient_item_ids[ingredient_index]
+            )
+        else:
+            recipe[f"AmountIngredient{ingredient_index}"] = 0
+            recipe[f"ItemIngredient{ingredient_index}"] = None
+        recipe[f"ItemIngredientRecipe{ingredient_index}"] = None
+    return recipe
+
+
+def print_latency(name: str, latency_list: List[float]) -> None:
+    latency_list = sorted(latency_list)
+    print(
+        f"{name}: n={len(latency_list)} "
+        f"p50={statistics.median(latency_list) * 1000:.2f}ms "
+        f"p99={latency_list[int(len(latency_list) * 0.99) - 1] * 1000:.2f}ms "
+        f"max={latency_list[-1] * 1000:.2f}ms"
+    )
@@ -0,0 +1,113 @@
+# 8 threads looking up overlapping items and recipes against the local xivapi
+# stand-in at xivapi.com latency, each a few keys ahead of the last. Items go
+# through the get_item Persist cache, recipes straight through get_content. Checks
+# that every item is requested once and every caller gets the same documents, and
+# compares with the previous behaviour: a cache lock held across each item miss and
+# every recipe lookup sending its own request.
+# Run from the repository root: python -m benchmarks.contentStress
+import random
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List
+from urllib.parse import urlparse
+
+from benchmarks.common import use_scratch_data_dir
+from benchmarks.xivapiStandIn import serve
+
+THREAD_COUNT = 8
+ITEM_COUNT = 60
+RECIPE_COUNT = 60
+THREAD_OFFSET = 3
+LATENCY_S = 0.15  # Round trip to xivapi.com
+
+
+def run_threads(lookup: Callable[[int, int], Any]) -> List[Dict[Any, Any]]:
+    result_dict_list: List[Dict[Any, Any]] = [{} for _ in range(THREAD_COUNT)]
+    barrier = threading.Barrier(THREAD_COUNT)
+
+    def run(thread_index: int) -> None:
+        key_list = [("item", id) for id in range(1, ITEM_COUNT + 1)] + [
+            ("recipe", id) for id in range(1, RECIPE_COUNT + 1)
+        ]
+        random.Random(0).shuffle(key_list)
+        # Each thread a few keys ahead of the last, as workers walking the same
+        # recipes are
+        offset = thread_index * THREAD_OFFSET
+        key_list = key_list[offset:] + key_list[:offset]
+        barrier.wait()
+        for key in key_list:
+            result_dict_list[thread_index][key] = lookup(*key)
+
+    thread_list = [
+        threading.Thread(target=run, args=(thread_index,))
+        for thread_index in range(THREAD_COUNT)
+    ]
+    for thread in thread_list:
+        thread.start()
+    for thread in thread_list:
+        thread.join()
+    return result_dict_list
+
+
+if __name__ == "__main__":
+    use_scratch_data_dir()
+    from transport.transport import http_client
+    from xivapi import xivapi
+    from xivapi.models import Recipe
+
+    server = serve(latency_s=LATENCY_S, recipe_count=RECIPE_COUNT)
+    xivapi.XIVAPI_URL = server.url
+    http_client.set_rate_limit(
+        urlparse(server.url).netloc, xivapi.REQUEST_RATE, xivapi.REQUEST_BURST
+    )
+
+    def lookup(kind: str, id: int) -> Any:
+        if kind == "item":
+            return xivapi.get_item(id)
+        return xivapi.get_content(f"Recipe/{id}", Recipe)
+
+    serial_lock = threading.Lock()
+
+    def lookup_serial(kind: str, id: int) -> Any:
+        if kind == "item":
+            with serial_lock:
+                return xivapi.get_item(id)
+        content_name = f"Recipe/{id}"
+        return xivapi._parse_content(
+            content_name,
+            http_client.get(xivapi._get_content_url(content_name)),
+            Recipe,
+        )
+
+    for name, func in (
+        ("Lock held across misses", lookup_serial),
+        ("Single flight", lookup),
+    ):
+        xivapi.get_item.cache.clear()
+        server.request_path_list.clear()
+        t = time.perf_counter()
+        result_dict_list = run_threads(func)
+        elapsed_s = time.perf_counter() - t
+        path_counter = Counter(server.request_path_list)
+        item_request_count = sum(
+            count for path, count in path_counter.items() if path.startswith("/Item/")
+        )
+        recipe_request_count = sum(
+            count for path, count in path_counter.items() if path.startswith("/Recipe/")
+        )
+        print(
+            f"{name}: {THREAD_COUNT} threads, {elapsed_s:.2f}s, "
+            f"{item_request_count} item requests for {ITEM_COUNT} items, "
+            f"{recipe_request_count} recipe requests for {RECIPE_COUNT} recipes "
+            f"from {THREAD_COUNT * RECIPE_COUNT} lookups"
+        )
+        assert item_request_count == ITEM_COUNT
+        assert all(
+            result_dict == result_dict_list[0] for result_dict in result_dict_list
+        )
+        assert all(
+            result_dict_list[0][("item", id)].ID == id
+            for id in range(1, ITEM_COUNT + 1)
+        )
+    server.shutdown()
@@ -0,0 +1,247 @@
+# Checks the delta sync against a most-recently-updated response for Sephirot kept
+# in benchmarks/fixtures, then simulates a day of the refresh loop over 1000 cached
+# items among the world's uploads, counting requests of the per item TTL walk
+# against the delta sync and the staleness each leaves.
+# Run from the repository root: python -m benchmarks.deltaSync
+# With --record the fixture is replaced by a live response from Universalis.
+import bisect
+import heapq
+import json
+import math
+import random
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.common import use_scratch_data_dir
+from benchmarks.freshnessPolicy import make_upload_times
+from benchmarks.universalisStandIn import serve
+
+FIXTURE_PATH = Path(__file__).parent / "fixtures" / "mostRecentlyUpdated-86.json"
+WORLD = 86
+FIXTURE_CHANGED_COUNT = 60
+FIXTURE_UNCHANGED_COUNT = 60
+FIXTURE_OTHER_COUNT = 200
+
+ITEM_COUNT = 1000
+SIMULATED_S = 3600 * 24
+TICK_S = 60
+WORLD_UPLOADS_PER_MIN = 40  # Uploads of items other than the cached ones
+CHUNK_SIZE = 100
+FLAT_TTL_S = 60 * 5  # The refresh scheduler's MIN_REFRESH_INTERVAL_S
+
+
+def check_fixture() -> None:
+    fixture = json.loads(FIXTURE_PATH.read_text())
+    upload_time_s = {
+        entry["itemID"]: entry["lastUploadTime"] / 1000 for entry in fixture["items"]
+    }
+    fixture_id_list = list(upload_time_s)
+    changed_id_set = set(fixture_id_list[:FIXTURE_CHANGED_COUNT])
+    unchanged_id_set = set(
+        fixture_id_list[
+            FIXTURE_CHANGED_COUNT : FIXTURE_CHANGED_COUNT + FIXTURE_UNCHANGED_COUNT
+        ]
+    )
+    other_id_set = set(range(1, FIXTURE_OTHER_COUNT * 1000, 1000)) - set(
+        fixture_id_list
+    )
+    id_list = list(changed_id_set | unchanged_id_set | other_id_set)
+
+    server = serve()
+    universalis.UNIVERSALIS_URL = server.url
+    # Cached before the changed items' last upload
+    server.upload_time_s = {
+        id: upload_time_s[id] - (3600 if id in changed_id_set else 0)
+        for id in changed_id_set | unchanged_id_set
+    }
+    universalis.get_listings_many(id_list, WORLD)
+    server.recently_updated = fixture
+    dirty_id_set = set(universalis.sync_recently_updated(WORLD, 0))
+    assert dirty_id_set == changed_id_set, dirty_id_set ^ changed_id_set
+    print(
+        f"Fixture: {len(fixture['items'])} entries, {len(id_list)} cached items, "
+        f"{len(dirty_id_set)} marked dirty, as expected"
+    )
+
+    server.upload_time_s.update({id: upload_time_s[id] for id in changed_id_set})
+    server.request_count = 0
+    universalis.get_listings_many(id_list, WORLD)
+    delta_request_count = server.request_count
+    assert universalis.sync_recently_updated(WORLD, 0) == []
+    server.request_count = 0
+    universalis.get_listings_many(id_list, WORLD, cache_timeout_s=0)
+    print(
+        f"Refresh of the cached items: {delta_request_count} request with the delta "
+        f"sync, {server.request_count} refetching every item"
+    )
+    server.shutdown()
+
+
+def simulate(
+    name: str,
+    upload_time_lists: List[List[float]],
+    world_upload_list: List[Tuple[float, int]],
+    is_expired: Callable[[int, float, float], bool],
+    on_sync: Optional[Callable[[List[Tuple[str, float]], float], None]],
+    on_fetch: Callable[[int, float, float], None],
+) -> None:
+    fetch_time_s: Dict[int, float] = {}
+    seen_upload_time_s: Dict[int, float] = {}
+    request_count = 0
+    item_request_count = 0
+    unchanged_count = 0
+    staleness_s = 0.0
+    for time_s in range(0, SIMULATED_S, TICK_S):
+        if on_sync is not None:
+            upload_count = bisect.bisect_right(world_upload_list, (time_s, math.inf))
+            request_count += 1
+            on_sync(
+                [
+                    (str([item_id, WORLD]), upload_s)
+                    for upload_s, item_id in world_upload_list[
+                        max(
+                            upload_count - universalis.DELTA_SYNC_ENTRIES, 0
+                        ) : upload_count
+                    ][::-1]
+                ],
+                time_s,
+            )
+        fetch_count = 0
+        for item_index, upload_time_list in enumerate(upload_time_lists):
+            upload_index = bisect.bisect_right(upload_time_list, time_s) - 1
+            if item_index not in fetch_time_s or is_expired(
+                item_index, fetch_time_s[item_index], time_s
+            ):
+                fetch_count += 1
+                if seen_upload_time_s.get(item_index) == upload_time_list[upload_index]:
+                    unchanged_count += 1
+                fetch_time_s[item_index] = time_s
+                seen_upload_time_s[item_index] = upload_time_list[upload_index]
+                on_fetch(item_index, time_s, upload_time_list[upload_index])
+            seen_index = bisect.bisect_right(
+                upload_time_list, seen_upload_time_s[item_index]
+            )
+            if seen_index <= upload_index:
+                staleness_s += time_s - upload_time_list[seen_index]
+        request_count += math.ceil(fetch_count / CHUNK_SIZE)
+        item_request_count += fetch_count
+    print(
+        f"{name}: {request_count} requests, {item_request_count} item fetches "
+        f"({unchanged_count} unchanged), mean staleness {staleness_s / (SIMULATED_S / TICK_S) / ITEM_COUNT:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    if "--record" in sys.argv:
+        import requests
+        from universalis.universalis import _get_recently_updated_url
+
+        response = requests.get(_get_recently_updated_url(WORLD), timeout=30)
+        response.raise_for_status()
+        FIXTURE_PATH.write_text(json.dumps(response.json(), indent=2))
+        print(f"Recorded {FIXTURE_PATH}")
+        sys.exit()
+
+    use_scratch_data_dir()
+    from universalis import universalis
+    from universalis.deltaSync import DeltaSync
+    from universalis.freshness import FreshnessPolicy
+    from universalis.models import Listings
+
+    check_fixture()
+
+    rng = random.Random(0)
+    velocity_list = []
+    upload_time_lists = []
+    for _ in range(ITEM_COUNT):
+        popularity = rng.uniform(0, 1)
+        velocity_list.append(10 ** (popularity * 3 - 0.5))
+        upload_time_lists.append(
+            make_upload_times(rng, 10 ** (4.7 - popularity * 2) * rng.uniform(0.5, 2))
+        )
+    # Cached items and other items' uploads in one stream, as the list shows them
+    world_upload_list = list(
+        heapq.merge(
+            *(
+                [(upload_s, item_index) for upload_s in upload_time_list]
+                for item_index, upload_time_list in enumerate(upload_time_lists)
+            ),
+            [
+                (upload_s, ITEM_COUNT + upload_index)
+                for upload_index, upload_s in enumerate(
+                    make_upload_times(rng, 60 / WORLD_UPLOADS_PER_MIN)
+                )
+            ],
+        )
+    )
+    print(
+        f"{len(world_upload_list) / (SIMULATED_S / 60):.0f} uploads/min to the world, "
+        f"{ITEM_COUNT} cached items"
+    )
+
+    def observe(
+        freshness_policy: FreshnessPolicy,
+        item_index: int,
+        time_s: float,
+        upload_s: float,
+    ) -> None:
+        freshness_policy.observe(
+            str(item_index),
+            Listings.construct(
+                lastUploadTime=math.floor(upload_s * 1000),
+                regularSaleVelocity=velocity_list[item_index],
+            ),
+            time_s,
+        )
+
+    simulate(
+        f"Walk with a flat {FLAT_TTL_S // 60} min TTL",
+        upload_time_lists,
+        world_upload_list,
+        lambda item_index, fetch_s, time_s: time_s - fetch_s > FLAT_TTL_S,
+        None,
+        lambda item_index, time_s, upload_s: None,
+    )
+
+    ttl_policy = FreshnessPolicy("freshness-ttl.bin", universalis.CACHE_TIMEOUT_S)
+    simulate(
+        "Walk with FreshnessPolicy TTLs",
+        upload_time_lists,
+        world_upload_list,
+        lambda item_index, fetch_s, time_s: time_s - fetch_s
+        > ttl_policy.ttl_s(str(item_index)),
+        None,
+        lambda item_index, time_s, upload_s: observe(
+            ttl_policy, item_index, time_s, upload_s
+        ),
+    )
+
+    delta_policy = FreshnessPolicy("freshness-delta.bin", universalis.CACHE_TIMEOUT_S)
+    delta_sync = DeltaSync()
+    seen_upload_s: Dict[str, float] = {}
+
+    # As universalis._get_cache_timeout_s
+    def is_delta_expired(item_index: int, fetch_s: float, time_s: float) -> bool:
+        key = str([item_index, WORLD])
+        if delta_sync.is_dirty(key):
+            return True
+        if delta_sync.covers(fetch_s, time_s):
+            return time_s - fetch_s > universalis.DELTA_SYNC_TIMEOUT_S
+        return time_s - fetch_s > delta_policy.ttl_s(str(item_index))
+
+    def on_delta_fetch(item_index: int, time_s: float, upload_s: float) -> None:
+        key = str([item_index, WORLD])
+        seen_upload_s[key] = upload_s
+        delta_sync.clean(key, upload_s)
+        observe(delta_policy, item_index, time_s, upload_s)
+
+    simulate(
+        "Delta sync",
+        upload_time_lists,
+        world_upload_list,
+        is_delta_expired,
+        lambda entries, time_s: delta_sync.apply(entries, seen_upload_s.get, time_s),
+        on_delta_fetch,
+    )
+    print(delta_sync.stats())
@@ -0,0 +1,68 @@
+# Decode throughput of recorded Recipe and Listings payloads, json + parse_obj (the
+# previous path) against fastDecode.loads + parse_model.
+# Run from the repository root: python -m benchmarks.fastDecode
+import json
+import time
+from typing import Any, Callable
+
+from benchmarks.common import make_recipe
+from benchmarks.universalisStandIn import make_listings
+from transport import fastDecode
+from universalis.models import Listings
+from xivapi.models import Recipe
+
+PAYLOAD_COUNT = 200
+
+
+def make_recipe_payload(recipe_id: int) -> bytes:
+    recipe = make_recipe(
+        recipe_id, 100000 + recipe_id, [recipe_id * 10 + index for index in range(5)]
+    )
+    # Two crafted intermediates, as XIVAPI nests ingredient recipes
+    for ingredient_index in range(2):
+        recipe[f"ItemIngredientRecipe{ingredient_index}"] = [
+            make_recipe(
+                recipe_id * 100 + ingredient_index,
+                recipe_id * 10 + ingredient_index,
+                [recipe_id * 1000 + index for index in range(4)],
+            )
+        ]
+    return json.dumps(recipe).encode()
+
+
+def measure(name: str, payload_list: list, decode: Callable[[bytes], Any]) -> float:
+    t = time.perf_counter()
+    for payload in payload_list:
+        decode(payload)
+    rate = len(payload_list) / (time.perf_counter() - t)
+    print(f"{name}: {rate:,.0f} payloads/s")
+    return rate
+
+
+if __name__ == "__main__":
+    print(f"orjson: {'yes' if fastDecode.orjson is not None else 'no'}")
+    time_s = time.time()
+    for model, payload_list in (
+        (Recipe, [make_recipe_payload(index) for index in range(1, PAYLOAD_COUNT)]),
+        (
+            Listings,
+            [
+                json.dumps(make_listings(index, "Sephirot", time_s, 100, 100)).encode()
+                for index in range(1, PAYLOAD_COUNT)
+            ],
+        ),
+    ):
+        assert fastDecode.construct(model, json.loads(payload_list[0])) == (
+            model.parse_obj(json.loads(payload_list[0]))
+        )
+        strict_rate = measure(
+            f"{model.__name__} strict",
+            payload_list,
+            lambda payload: model.parse_obj(json.loads(payload)),
+        )
+        fast_rate = measure(
+            f"{model.__name__} fast",
+            payload_list,
+            lambda payload: fastDecode.parse_model(model, fastDecode.loads(payload)),
+        )
+        print(f"{model.__name__} speedup: {fast_rate / strict_rate:.1f}x")
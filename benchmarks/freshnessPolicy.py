@@ -0,0 +1,106 @@
+# Simulates three days of the 5 minute refresh loop over 1000 items with varied
+# upload frequency and sale velocity, comparing the flat 4h TTL against the
+# FreshnessPolicy. Staleness is weighted by sale velocity, the data that matters.
+# Run from the repository root: python -m benchmarks.freshnessPolicy
+import bisect
+import math
+import random
+from typing import Callable, Dict, List
+
+from benchmarks.common import use_scratch_data_dir
+
+ITEM_COUNT = 1000
+SIMULATED_S = 3600 * 24 * 3
+TICK_S = 60 * 5
+FLAT_TTL_S = 3600 * 4
+COMPARISON_TTL_S_LIST = [FLAT_TTL_S, 3600, 60 * 30]
+
+
+def make_upload_times(rng: random.Random, interval_s: float) -> List[float]:
+    upload_time_list = [-rng.expovariate(1 / interval_s)]
+    while upload_time_list[-1] < SIMULATED_S:
+        upload_time_list.append(upload_time_list[-1] + rng.expovariate(1 / interval_s))
+    return upload_time_list
+
+
+def simulate(
+    name: str,
+    upload_time_lists: List[List[float]],
+    velocity_list: List[float],
+    get_ttl_s: Callable[[int], float],
+    on_fetch: Callable[[int, float, float], None],
+) -> None:
+    fetch_time_s: Dict[int, float] = {}
+    seen_upload_time_s: Dict[int, float] = {}
+    request_count = 0
+    wasted_count = 0
+    weighted_staleness_s = 0.0
+    weight_total = 0.0
+    for time_s in range(0, SIMULATED_S, TICK_S):
+        for item_index, upload_time_list in enumerate(upload_time_lists):
+            upload_index = bisect.bisect_right(upload_time_list, time_s) - 1
+            if item_index not in fetch_time_s or time_s - fetch_time_s[
+                item_index
+            ] > get_ttl_s(item_index):
+                request_count += 1
+                if seen_upload_time_s.get(item_index) == upload_time_list[upload_index]:
+                    wasted_count += 1
+                fetch_time_s[item_index] = time_s
+                seen_upload_time_s[item_index] = upload_time_list[upload_index]
+                on_fetch(item_index, time_s, upload_time_list[upload_index])
+            seen_index = bisect.bisect_right(
+                upload_time_list, seen_upload_time_s[item_index]
+            )
+            staleness_s = (
+                time_s - upload_time_list[seen_index]
+                if seen_index <= upload_index
+                else 0
+            )
+            weighted_staleness_s += staleness_s * velocity_list[item_index]
+            weight_total += velocity_list[item_index]
+    print(
+        f"{name}: {request_count} requests, {wasted_count} unchanged, "
+        f"velocity weighted staleness {weighted_staleness_s / weight_total / 60:.1f} min"
+    )
+
+
+if __name__ == "__main__":
+    use_scratch_data_dir()
+    from universalis.freshness import FreshnessPolicy
+    from universalis.models import Listings
+
+    rng = random.Random(0)
+    velocity_list = []
+    upload_time_lists = []
+    for _ in range(ITEM_COUNT):
+        # Fast sellers are uploaded more often
+        popularity = rng.uniform(0, 1)
+        velocity_list.append(10 ** (popularity * 3 - 0.5))
+        upload_time_lists.append(
+            make_upload_times(rng, 10 ** (4.7 - popularity * 2) * rng.uniform(0.5, 2))
+        )
+
+    for ttl_s in COMPARISON_TTL_S_LIST:
+        simulate(
+            f"Flat {ttl_s / 60:.0f} min TTL",
+            upload_time_lists,
+            velocity_list,
+            lambda item_index: ttl_s,
+            lambda item_index, time_s, upload_time_s: None,
+        )
+
+    freshness_policy = FreshnessPolicy("freshness-bench.bin", FLAT_TTL_S)
+    simulate(
+        "FreshnessPolicy",
+        upload_time_lists,
+        velocity_list,
+        lambda item_index: freshness_policy.ttl_s(str(item_index)),
+        lambda item_index, time_s, upload_time_s: freshness_policy.observe(
+            str(item_index),
+            Listings.construct(
+                lastUploadTime=math.floor(upload_time_s * 1000),
+                regularSaleVelocity=velocity_list[item_index],
+            ),
+            time_s,
+        ),
+    )
@@ -0,0 +1,70 @@
+# Cold start of the recipe, item and class job lookups against the local xivapi
+# stand-in, first crawling it with empty caches and no game data snapshot, then
+# building the snapshot and repeating the same lookups from it.
+# Run from the repository root: python -m benchmarks.gameData
+import os
+import time
+from urllib.parse import urlparse
+
+from benchmarks.common import use_scratch_data_dir
+from benchmarks.xivapiStandIn import serve
+
+RECIPE_COUNT = 900  # 10 per level
+CLASSJOB_ID = 8
+LEVEL_MAX = 90
+ITEM_LOOKUP_COUNT = 200
+LATENCY_S = 0.15  # Round trip to xivapi.com
+
+if __name__ == "__main__":
+    use_scratch_data_dir()
+    from transport.transport import http_client
+    from xivapi import xivapi
+    from xivapi.buildGameData import build_game_data
+    from xivapi.gameData import game_data
+
+    server = serve(latency_s=LATENCY_S, recipe_count=RECIPE_COUNT)
+    xivapi.XIVAPI_URL = server.url
+    http_client.set_rate_limit(
+        urlparse(server.url).netloc, xivapi.REQUEST_RATE, xivapi.REQUEST_BURST
+    )
+
+    def cold_start(name: str) -> list:
+        xivapi.recipe_graph.clear()
+        xivapi.get_item.cache.clear()
+        xivapi.get_classjob_doh_list.cache.clear()
+        xivapi.recipe_classjob_level_list.clear()
+        server.request_count = 0
+        t = time.perf_counter()
+        classjob_list = xivapi.get_classjob_doh_list()
+        recipe_list = [
+            recipe
+            for classjob_level in range(1, LEVEL_MAX + 1)
+            for recipe in xivapi.yield_recipes(CLASSJOB_ID, classjob_level)
+        ]
+        item_list = [
+            xivapi.get_item(recipe.ItemResult.ID)
+            for recipe in recipe_list[:ITEM_LOOKUP_COUNT]
+        ]
+        print(
+            f"{name}: {len(classjob_list)} class jobs, {len(recipe_list)} recipes, "
+            f"{len(item_list)} items, {server.request_count} requests, "
+            f"{time.perf_counter() - t:.2f}s"
+        )
+        return [classjob_list, recipe_list, item_list]
+
+    assert not game_data.available
+    network_result = cold_start("Crawling xivapi")
+
+    t = time.perf_counter()
+    build_game_data(["Recipe", "Item", "ClassJob"])
+    print(
+        f"Snapshot build: {time.perf_counter() - t:.1f}s, "
+        f"{os.path.getsize(game_data.file_path) / 1024:,.0f} KB"
+    )
+    t = time.perf_counter()
+    game_data.__init__()
+    print(f"Snapshot open: {(time.perf_counter() - t) * 1000:.1f}ms")
+    snapshot_result = cold_start("From the snapshot")
+    assert server.request_count == 0
+    assert snapshot_result == network_result
+    server.shutdown()
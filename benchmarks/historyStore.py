@@ -0,0 +1,63 @@
+# Compares growing purchase history with DataFrame.loc (the previous get_listings
+# path) against the append-only History store, at 10k points per item.
+# Run from the repository root: python -m benchmarks.historyStore
+import random
+import time
+
+import pandas as pd
+
+from universalis.history import History
+from universalis.models import Listing
+
+POINT_COUNT = 10000
+BATCH_SIZE = 20
+
+
+def make_batch_list() -> list:
+    rng = random.Random(0)
+    batch_list = []
+    timestamp = 1650000000
+    for _ in range(POINT_COUNT // BATCH_SIZE):
+        batch = []
+        for _ in range(BATCH_SIZE):
+            timestamp += rng.randint(1, 600)
+            price = rng.randint(100, 10000)
+            quantity = rng.randint(1, 99)
+            batch.append(
+                Listing(
+                    pricePerUnit=price,
+                    quantity=quantity,
+                    hq=rng.random() < 0.3,
+                    total=price * quantity,
+                    timestamp=timestamp,
+                )
+            )
+        # Each refresh returns the newest sales again alongside the unseen ones
+        batch_list.append(
+            (batch_list[-1][-BATCH_SIZE // 2 :] if batch_list else []) + batch
+        )
+    return batch_list
+
+
+if __name__ == "__main__":
+    batch_list = make_batch_list()
+
+    t = time.perf_counter()
+    history_df = pd.DataFrame(columns=["Price"])
+    for batch in batch_list:
+        for listing in batch:
+            history_df.loc[listing.timestamp] = listing.pricePerUnit
+    loc_s = time.perf_counter() - t
+    print(f"DataFrame.loc: {len(history_df.index)} points in {loc_s:.3f}s")
+
+    t = time.perf_counter()
+    history = History()
+    for batch in batch_list:
+        history.merge_listings(batch, "timestamp")
+    history_s = time.perf_counter() - t
+    print(f"History.merge: {len(history)} points in {history_s:.3f}s")
+
+    t = time.perf_counter()
+    history.to_dataframe()
+    print(f"History.to_dataframe: {time.perf_counter() - t:.4f}s")
+    print(f"Speedup: {loc_s / history_s:.1f}x")
@@ -0,0 +1,101 @@
+# Simulates a sixteen week session: the sale history of one busy item refreshed every
+# hour, with and without downsampling, and a 5k item listings store read in a
+# skewed pattern, unbounded and with a memory budget.
+# Run from the repository root: python -m benchmarks.listingsBudget
+import pickle
+import random
+import time
+from typing import Optional
+
+import numpy as np
+
+from benchmarks.common import use_scratch_data_dir
+from benchmarks.universalisStandIn import make_listings
+
+SESSION_HOURS = 24 * 7 * 16
+SALES_PER_HOUR = 30
+ITEM_COUNT = 5000
+READ_COUNT = 50000
+HOT_ITEM_COUNT = 500  # Items of the recipes being looked at, read most often
+MEMORY_BUDGET_BYTES = 4 * 1024**2
+WORLD = "Sephirot"
+
+
+def simulate_history(downsample: bool) -> "History":
+    rng = np.random.default_rng(0)
+    history = History()
+    start_s = int(time.time()) - SESSION_HOURS * 3600
+    for hour in range(SESSION_HOURS):
+        time_s = start_s + (hour + 1) * 3600
+        history.merge(
+            np.sort(rng.integers(time_s - 3600, time_s, SALES_PER_HOUR)),
+            rng.integers(100, 10000, SALES_PER_HOUR),
+            rng.integers(1, 99, SALES_PER_HOUR).astype(np.int32),
+            rng.random(SALES_PER_HOUR) < 0.5,
+        )
+        if downsample:
+            history.downsample(time_s)
+    return history
+
+
+def simulate_store(filename: str, memory_budget_bytes: Optional[int]) -> None:
+    store = ListingsStore(filename, memory_budget_bytes)
+    rng = random.Random(0)
+    t = time.perf_counter()
+    peak_bytes = 0
+    for _ in range(READ_COUNT):
+        if rng.random() < 0.8:
+            item_id = rng.randint(1, HOT_ITEM_COUNT)
+        else:
+            item_id = rng.randint(1, ITEM_COUNT)
+        listings, _ = store[str([item_id, WORLD])]
+        assert listings.itemID == item_id
+        peak_bytes = max(peak_bytes, store.resident_bytes)
+    print(
+        f"{READ_COUNT} reads in {time.perf_counter() - t:.3f}s, "
+        f"peak {peak_bytes / 1024**2:.1f} MB. {store.stats()}"
+    )
+    store.close()
+
+
+if __name__ == "__main__":
+    use_scratch_data_dir()
+    from universalis.history import History
+    from universalis.listingsStore import ListingsStore
+    from universalis.models import Listings
+
+    print(f"{SESSION_HOURS // 24} days of hourly refreshes, {SALES_PER_HOUR} sales/h")
+    point_count = 0
+    for downsample in (False, True):
+        t = time.perf_counter()
+        history = simulate_history(downsample)
+        print(
+            f"{'Downsampled' if downsample else 'Raw'}: {time.perf_counter() - t:.3f}s, "
+            f"{len(history)} points, {len(history.buckets()[0])} buckets, "
+            f"{len(pickle.dumps(history, pickle.HIGHEST_PROTOCOL)) / 1024:.0f} KB pickled"
+        )
+        if downsample:
+            # Every sale is still counted, in a bucket or as a point
+            assert int(history.buckets()[7].sum()) + len(history) == point_count
+        else:
+            point_count = len(history)
+
+    time_s = time.time()
+    store = ListingsStore("bench.db")
+    for chunk_start in range(1, ITEM_COUNT + 1, 100):
+        store.update(
+            {
+                str([item_id, WORLD]): (
+                    Listings.parse_obj(make_listings(item_id, WORLD, time_s)),
+                    time_s,
+                )
+                for item_id in range(
+                    chunk_start, min(chunk_start + 100, ITEM_COUNT + 1)
+                )
+            }
+        )
+    store.close()
+    print(f"Unbounded store, {ITEM_COUNT} items:")
+    simulate_store("bench.db", None)
+    print(f"Store with a {MEMORY_BUDGET_BYTES / 1024**2:.0f} MB budget:")
+    simulate_store("bench.db", MEMORY_BUDGET_BYTES)
@@ -0,0 +1,107 @@
+# Measures how long a GUI-thread cache hit waits while the crafting and gatherer
+# workers refresh listings against a slow Universalis stand-in.
+# Run from the repository root: python -m benchmarks.listingsContention
+import sys
+import threading
+import time
+
+from benchmarks.common import (
+    make_recipe,
+    print_latency,
+    use_scratch_data_dir,
+)
+from benchmarks.universalisStandIn import serve
+
+LATENCY_S = 0.2
+WORLD = 86
+RECIPE_COUNT = 300
+GATHERING_ITEM_COUNT = 100
+DURATION_S = 10.0
+
+if __name__ == "__main__":
+    repository_path = sys.path[0]
+    use_scratch_data_dir()
+    sys.path.insert(0, repository_path)
+
+    from PySide6.QtCore import QCoreApplication
+    from classjobConfig import ClassJobConfig
+    from craftingWorker import CraftingWorker
+    from gathererWorker.gathererWorker import GathererWorker
+    from universalis import universalis
+    from xivapi.models import GatheringItem, Recipe
+
+    app = QCoreApplication([])
+    server = serve(latency_s=LATENCY_S)
+    universalis.UNIVERSALIS_URL = server.url
+
+    recipe_list = [
+        Recipe.parse_obj(
+            make_recipe(
+                recipe_id,
+                100000 + recipe_id,
+                [recipe_id * 10 + index for index in range(1, 5)],
+            )
+        )
+        for recipe_id in range(1, RECIPE_COUNT + 1)
+    ]
+    classjob_config_dict = {
+        8: ClassJobConfig(
+            **recipe_list[0].ClassJob.dict(exclude={"ClassJobCategory"}),
+            ClassJobCategory=0,
+            level=90,
+        )
+    }
+    crafting_worker = CraftingWorker(WORLD, classjob_config_dict)
+    gatherer_worker = GathererWorker(WORLD, classjob_config_dict)
+
+    hot_item_id = recipe_list[0].ItemResult.ID
+    universalis.get_listings(hot_item_id, WORLD)
+    stop = threading.Event()
+
+    def run_crafting_worker() -> None:
+        while not stop.is_set():
+            crafting_worker.refresh_listings(recipe_list, force_refresh=True)
+
+    def run_gatherer_worker() -> None:
+        round_index = 0
+        while not stop.is_set():
+            gatherer_worker.update_table(
+                [
+                    GatheringItem.parse_obj(
+                        {
+                            "ID": gathering_item_id,
+                            "ItemTargetID": gathering_item_id,
+                            "Item": {
+                                "ID": 500000 + gathering_item_id,
+                                "Name": f"Gathered {gathering_item_id}",
+                                "AetherialReduce": 0,
+                            },
+                            "GameContentLinks": {"GatheringPointBase": {}},
+                        }
+                    )
+                    for gathering_item_id in range(
+                        round_index * GATHERING_ITEM_COUNT,
+                        (round_index + 1) * GATHERING_ITEM_COUNT,
+                    )
+                ]
+            )
+            round_index += 1
+
+    thread_list = [
+        threading.Thread(target=run_crafting_worker, daemon=True),
+        threading.Thread(target=run_gatherer_worker, daemon=True),
+    ]
+    for thread in thread_list:
+        thread.start()
+
+    latency_list = []
+    start_time = time.time()
+    while time.time() - start_time < DURATION_S:
+        t = time.perf_counter()
+        universalis.get_listings(hot_item_id, WORLD)
+        latency_list.append(time.perf_counter() - t)
+        time.sleep(0.01)
+    stop.set()
+    print_latency("GUI cache hit", latency_list)
+    print(f"Stand-in requests: {server.request_count}")
+    server.shutdown()
@@ -0,0 +1,29 @@
+# Compares per-item and batched listing refreshes against the local Universalis
+# stand-in. Run from the repository root: python -m benchmarks.listingsMany
+import time
+
+from benchmarks.universalisStandIn import serve
+from universalis import universalis
+
+ITEM_COUNT = 2000
+WORLD = 86
+LATENCY_S = 0.01
+
+if __name__ == "__main__":
+    server = serve(latency_s=LATENCY_S)
+    universalis.UNIVERSALIS_URL = server.url
+    item_id_list = list(range(1, ITEM_COUNT + 1))
+
+    universalis.cache.clear()
+    t = time.time()
+    for item_id in item_id_list:
+        universalis.get_listings(item_id, WORLD)
+    print(f"get_listings:      {server.request_count} requests, {time.time() - t:.2f}s")
+
+    server.request_count = 0
+    universalis.cache.clear()
+    t = time.time()
+    listings_dict = universalis.get_listings_many(item_id_list, WORLD)
+    assert len(listings_dict) == ITEM_COUNT
+    print(f"get_listings_many: {server.request_count} requests, {time.time() - t:.2f}s")
+    server.shutdown()
@@ -0,0 +1,43 @@
+# Measures the live listings cache with cache.get_size, holding each item's rows as
+# pydantic Listing models (the previous representation) against ListingTable.
+# Run from the repository root: python -m benchmarks.listingsMemory
+import time
+from typing import List
+
+from benchmarks.universalisStandIn import make_listings
+from cache import get_size
+from universalis.models import Listing, Listings
+
+ITEM_COUNT = 2000
+LISTING_COUNT = 100
+SALE_COUNT = 100
+WORLD = "Sephirot"
+
+
+class ModelListings(Listings):
+    listings: List[Listing]  # type: ignore
+    recentHistory: List[Listing]  # type: ignore
+
+
+if __name__ == "__main__":
+    time_s = time.time()
+    content_list = [
+        make_listings(item_id, WORLD, time_s, LISTING_COUNT, SALE_COUNT)
+        for item_id in range(1, ITEM_COUNT + 1)
+    ]
+
+    t = time.perf_counter()
+    model_cache = {}
+    for content in content_list:
+        listings = ModelListings.parse_obj(content)
+        model_cache[str([listings.itemID, WORLD])] = (listings, time_s)
+    print(f"Listing models: parsed in {time.perf_counter() - t:.2f}s")
+    print(f"Listing models: {get_size(model_cache):,.0f} bytes")
+
+    t = time.perf_counter()
+    table_cache = {}
+    for content in content_list:
+        listings = Listings.parse_obj(content)
+        table_cache[str([listings.itemID, WORLD])] = (listings, time_s)
+    print(f"ListingTable: parsed in {time.perf_counter() - t:.2f}s")
+    print(f"ListingTable: {get_size(table_cache):,.0f} bytes")
@@ -0,0 +1,65 @@
+# Times startup and shutdown of a 10k item listings cache, pickling the whole dict
+# (the previous save_to_disk) against the SQLite listings store.
+# Run from the repository root: python -m benchmarks.listingsStore
+import pickle
+import time
+
+from benchmarks.common import use_scratch_data_dir
+from benchmarks.universalisStandIn import make_listings
+
+ITEM_COUNT = 10000
+WORLD = "Sephirot"
+HISTORY_REFRESH_COUNT = 10  # Refreshes merged into each item's history
+
+if __name__ == "__main__":
+    use_scratch_data_dir()
+    from universalis.listingsStore import ListingsStore
+    from universalis.models import Listings
+    import universalis.universalis as universalis
+
+    time_s = time.time()
+    legacy_cache = {}
+    # _merge_listings reads the previous entry from the module cache
+    universalis.cache = legacy_cache  # type: ignore
+    for item_id in range(1, ITEM_COUNT + 1):
+        _args = [item_id, WORLD]
+        for refresh_index in range(HISTORY_REFRESH_COUNT):
+            listings = Listings.parse_obj(
+                make_listings(
+                    item_id * HISTORY_REFRESH_COUNT + refresh_index, WORLD, time_s
+                )
+            )
+            listings.itemID = item_id
+            legacy_cache[str(_args)] = universalis._merge_listings(_args, listings)
+
+    t = time.perf_counter()
+    pickle.dump(legacy_cache, open(".data/legacy.bin", "wb"))
+    print(f"Pickle shutdown (save all): {time.perf_counter() - t:.3f}s")
+    t = time.perf_counter()
+    pickle.load(open(".data/legacy.bin", "rb"))
+    print(f"Pickle startup (load all): {time.perf_counter() - t:.3f}s")
+
+    store = ListingsStore("bench.db")
+    t = time.perf_counter()
+    store.update(legacy_cache)
+    print(f"Store migration (one time): {time.perf_counter() - t:.3f}s")
+    store.close()
+
+    t = time.perf_counter()
+    store = ListingsStore("bench.db")
+    print(f"Store startup (key index): {time.perf_counter() - t:.3f}s")
+    t = time.perf_counter()
+    for item_id in range(1, 101):
+        store[str([item_id, WORLD])]
+    print(f"Store first access of 100 items: {time.perf_counter() - t:.3f}s")
+    t = time.perf_counter()
+    store.update(
+        {
+            str([item_id, WORLD]): legacy_cache[str([item_id, WORLD])]
+            for item_id in range(1, 101)
+        }
+    )
+    print(f"Store write of a 100 item refresh: {time.perf_counter() - t:.3f}s")
+    t = time.perf_counter()
+    store.close()
+    print(f"Store shutdown (checkpoint): {time.perf_counter() - t:.3f}s")
@@ -0,0 +1,146 @@
+# Compares polling only against the live market feed with polling as fallback, for
+# retainer-style rows refreshed every POLL_PERIOD_S while the market publishes
+# events. Reports Universalis requests and the staleness between an event and the
+# cache reflecting it. Time is compressed: POLL_PERIOD_S stands in for 5 minutes.
+# Run from the repository root: python -m benchmarks.marketFeed
+import random
+import sys
+import threading
+import time
+from typing import Any, Dict, List
+
+from benchmarks.common import print_latency, use_scratch_data_dir
+from benchmarks.universalisStandIn import UniversalisStandIn
+
+ITEM_COUNT = 200
+EVENT_RATE = 20  # events per second across all items
+POLL_PERIOD_S = 5.0
+RUN_S = 20.0
+
+
+class MarketStandIn(UniversalisStandIn):
+    def __init__(self) -> None:
+        super().__init__()
+        self.last_event_ms: Dict[int, int] = {}
+
+    def get_content(self, path: List[str], query: Dict[str, List[str]]) -> Any:
+        content = super().get_content(path, query)
+        for listings in content["items"].values() if "items" in content else [content]:
+            listings["lastUploadTime"] = self.last_event_ms.get(listings["itemID"], 0)
+        return content
+
+
+def run(name: str, world: int, use_feed: bool) -> None:
+    from universalis import universalis
+    from universalis.marketFeed import MarketFeed
+
+    item_id_list = list(range(1, ITEM_COUNT + 1))
+    pending_event_dict: Dict[int, List[float]] = {}
+    staleness_list: List[float] = []
+    mutex = threading.Lock()
+
+    def resolve(item_id: int, upload_time_s: float) -> None:
+        time_s = time.time()
+        with mutex:
+            pending = pending_event_dict.get(item_id, [])
+            staleness_list.extend(
+                time_s - event_s for event_s in pending if event_s <= upload_time_s
+            )
+            pending_event_dict[item_id] = [
+                event_s for event_s in pending if event_s > upload_time_s
+            ]
+
+    market_feed = None
+    if use_feed:
+        market_feed = MarketFeed(world, feed_stand_in.url)
+        market_feed.item_changed.connect(lambda item_id: resolve(item_id, time.time()))
+        market_feed.start()
+        while not market_feed.is_live():
+            app.processEvents()
+    universalis.get_listings_many(item_id_list, world)
+    request_count = server.request_count
+
+    stop = threading.Event()
+
+    def poll() -> None:
+        # The RetainerWorker refresh, one batched request per period
+        while not stop.wait(POLL_PERIOD_S):
+            listings_dict = universalis.get_listings_many(
+                item_id_list,
+                world,
+                cache_timeout_s=(
+                    None if universalis.is_live_feed() else POLL_PERIOD_S / 2
+                ),
+            )
+            for item_id, listings in listings_dict.items():
+                resolve(item_id, listings.lastUploadTime / 1000)
+
+    poll_thread = threading.Thread(target=poll)
+    poll_thread.start()
+    rng = random.Random(world)
+    end_time_s = time.time() + RUN_S
+    next_event_s = time.time()
+    event_count = 0
+    while time.time() < end_time_s:
+        app.processEvents()
+        if time.time() >= next_event_s:
+            item_id = rng.choice(item_id_list)
+            event_s = time.time()
+            with mutex:
+                pending_event_dict.setdefault(item_id, []).append(event_s)
+            server.last_event_ms[item_id] = int(event_s * 1000)
+            price = rng.randint(100, 10000)
+            feed_stand_in.publish(
+                "sales/add",
+                item_id,
+                world,
+                [
+                    {
+                        "pricePerUnit": price,
+                        "quantity": 1,
+                        "hq": False,
+                        "total": price,
+                        "timestamp": int(event_s),
+                    }
+                ],
+            )
+            event_count += 1
+            next_event_s += 1 / EVENT_RATE
+        time.sleep(0.001)
+    stop.set()
+    poll_thread.join()
+    if market_feed is not None:
+        market_feed.stop()
+        market_feed.deleteLater()
+        app.processEvents()
+    # Events still not reflected count with their age at the end of the run
+    time_s = time.time()
+    for pending in pending_event_dict.values():
+        staleness_list.extend(time_s - event_s for event_s in pending)
+
+    print(
+        f"{name}: {event_count} events, {server.request_count - request_count} requests"
+    )
+    print_latency(f"{name} staleness", staleness_list)
+
+
+if __name__ == "__main__":
+    repository_path = sys.path[0]
+    use_scratch_data_dir()
+    sys.path.insert(0, repository_path)
+
+    from PySide6.QtCore import QCoreApplication
+    from benchmarks.universalisFeedStandIn import UniversalisFeedStandIn
+    from universalis import universalis
+
+    app = QCoreApplication([])
+    server = MarketStandIn()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    universalis.UNIVERSALIS_URL = server.url
+    feed_stand_in = UniversalisFeedStandIn()
+
+    run("Polling", 86, use_feed=False)
+    run("Live feed", 87, use_feed=True)
+    feed_stand_in.close()
+    app.processEvents()
+    universalis.save_to_disk()
@@ -0,0 +1,178 @@
+# Recipe search from the local name index against the xivapi search it replaces.
+# Search latency is measured over 45k generated item names of one to four words,
+# typing 200 of them a letter at a time as the search box completes them, then
+# searching whole names, misspelled names and word infixes. Loading the indexes is
+# timed from the caches of a used install: the recipe graph and the item cache.
+# search_recipes is then compared with the previous remote search, both against the
+# local xivapi stand-in at xivapi.com latency.
+# Run from the repository root: python -m benchmarks.nameIndex
+import random
+import time
+from typing import Callable, List
+from urllib.parse import urlparse
+
+from benchmarks.common import make_item, print_latency, use_scratch_data_dir
+from benchmarks.xivapiStandIn import serve
+
+NAME_COUNT = 45000
+TYPED_NAME_COUNT = 200
+COMPLETION_COUNT = 15
+RECIPE_COUNT = 5000
+CACHED_ITEM_COUNT = 15000
+SEARCHED_RECIPE_COUNT = 20
+LATENCY_S = 0.15  # Round trip to xivapi.com
+SYLLABLE_LIST = (
+    "ba be bi bo da de di do ga ge go ka ke ki ko la le li lo ma me mi mo na ne ni "
+    "no ra re ri ro sa se si so ta te ti to va ve vi vo za ze zi zo ir on um ar "
+    "el il or an en in"
+).split()
+
+
+def make_names(count: int) -> List[str]:
+    rng = random.Random(0)
+    word_list = sorted(
+        {
+            "".join(rng.choice(SYLLABLE_LIST) for _ in range(rng.randint(2, 4)))
+            for _ in range(6000)
+        }
+    )
+    rng.shuffle(word_list)
+    # Few words are common, as "grade" or "ingot" are
+    weight_list = [1 / (rank + 1) for rank in range(len(word_list))]
+    return [
+        " ".join(rng.choices(word_list, weight_list, k=rng.randint(1, 4))).capitalize()
+        for _ in range(count)
+    ]
+
+
+def time_queries(search: Callable[[str], object], query_list: List[str]) -> List[float]:
+    latency_list: List[float] = []
+    for query in query_list:
+        t = time.perf_counter()
+        search(query)
+        latency_list.append(time.perf_counter() - t)
+    return latency_list
+
+
+def misspell(name: str, rng: random.Random) -> str:
+    word_list = name.split()
+    index = max(range(len(word_list)), key=lambda index: len(word_list[index]))
+    word = word_list[index]
+    position = rng.randrange(1, len(word) - 1)
+    word_list[index] = word[:position] + word[position + 1 :]
+    return " ".join(word_list)
+
+
+if __name__ == "__main__":
+    use_scratch_data_dir()
+    from transport.fastDecode import parse_model
+    from transport.transport import http_client
+    from xivapi import xivapi
+    from xivapi.models import Item, Recipe
+    from xivapi.nameIndex import NameIndex
+
+    name_list = make_names(NAME_COUNT)
+    name_index = NameIndex()
+    t = time.perf_counter()
+    name_index.add_many(enumerate(name_list))
+    print(f"Index of {NAME_COUNT} names built in {time.perf_counter() - t:.2f}s")
+
+    rng = random.Random(1)
+    typed_name_list = rng.sample(name_list, TYPED_NAME_COUNT)
+
+    def complete(query: str) -> object:
+        return name_index.search(query, COMPLETION_COUNT)
+
+    print_latency(
+        "As you type",
+        time_queries(
+            complete,
+            [
+                name[:length]
+                for name in typed_name_list
+                for length in range(1, len(name) + 1)
+            ],
+        ),
+    )
+    print_latency("Whole names", time_queries(complete, typed_name_list))
+    misspelled_list = [
+        misspell(name, rng)
+        for name in typed_name_list
+        if len(max(name.split(), key=len)) > 4
+    ]
+    print_latency("Misspelled names", time_queries(complete, misspelled_list))
+    found_count = sum(
+        1
+        for name, misspelled in zip(
+            [name for name in typed_name_list if len(max(name.split(), key=len)) > 4],
+            misspelled_list,
+        )
+        if name in (found_name for _, found_name in complete(misspelled))
+    )
+    print(f"  {found_count} of {len(misspelled_list)} misspelled names found")
+    infix_list = [max(name.split(), key=len)[1:-1] for name in typed_name_list]
+    print_latency("Word infixes", time_queries(complete, infix_list))
+
+    # Caches of a used install
+    server = serve(latency_s=LATENCY_S, recipe_count=RECIPE_COUNT)
+    xivapi.XIVAPI_URL = server.url
+    http_client.set_rate_limit(
+        urlparse(server.url).netloc, xivapi.REQUEST_RATE, xivapi.REQUEST_BURST
+    )
+    for recipe_id in range(1, RECIPE_COUNT + 1):
+        xivapi.recipe_graph.add(parse_model(Recipe, server.get_recipe(recipe_id)))
+    xivapi.get_item.cache.set_many(
+        {
+            str([item_id]): (Item.parse_obj(make_item(item_id)), time.time())
+            for item_id in range(1, CACHED_ITEM_COUNT + 1)
+        }
+    )
+    t = time.perf_counter()
+    xivapi.load_name_indexes()
+    print(
+        f"Indexes loaded from the caches in {time.perf_counter() - t:.2f}s: "
+        f"{len(xivapi.item_name_index)} items, {len(xivapi.recipe_name_index)} recipes"
+    )
+
+    def search_recipes_previous(search_string: str) -> List[Recipe]:
+        recipe_list: List[Recipe] = []
+        for results in xivapi.get_content_page_results(
+            f"search?string={search_string}"
+        ):
+            recipe_list.extend(
+                xivapi.get_recipes_by_url(
+                    [
+                        recipe_result.Url
+                        for recipe_result in results
+                        if recipe_result.UrlType == "Recipe"
+                    ]
+                )
+            )
+        return recipe_list
+
+    search_string_list = [
+        f"Item {recipe_id + 10000}"
+        for recipe_id in rng.sample(range(1, RECIPE_COUNT + 1), SEARCHED_RECIPE_COUNT)
+    ]
+    for name, search in (
+        ("xivapi search", search_recipes_previous),
+        ("Name index", xivapi.search_recipes),
+    ):
+        server.request_path_list.clear()
+        latency_list = time_queries(search, search_string_list)
+        print_latency(f"search_recipes, {name}", latency_list)
+        print(f"  {len(server.request_path_list)} requests")
+        for search_string in search_string_list:
+            assert search(search_string)[0].ItemResult.Name == search_string
+
+    # A name the index has not seen still goes to xivapi
+    server.request_path_list.clear()
+    recipe_id = RECIPE_COUNT + 1
+    server.recipe_count = recipe_id
+    recipe_collection = xivapi.search_recipes(f"Item {recipe_id + 10000}")
+    assert [recipe.ID for recipe in recipe_collection] == [recipe_id]
+    print(
+        f"Unseen name: {len(server.request_path_list)} requests, "
+        f"then {xivapi.recipe_name_index.search(f'Item {recipe_id + 10000}', 1)}"
+    )
+    server.shutdown()
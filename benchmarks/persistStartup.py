@@ -0,0 +1,109 @@
+# Startup and shutdown cost of the get_recipe Persist cache holding 20k recipes, a
+# tenth of them with an ingredient recipe nested. Times the indented JSON cache
+# Persist used to keep, loaded and saved in full, against the record store, then
+# imports xivapi.xivapi in a fresh interpreter under -X importtime, as ui.py does
+# at startup, once migrating the JSON cache and once opening the store.
+# Run from the repository root: python -m benchmarks.persistStartup
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.common import make_recipe, use_scratch_data_dir
+
+RECIPE_COUNT = 20000
+CACHE_TIME = 1.7e9
+TOUCHED_COUNT = 100  # Entries read and written in one session
+
+
+def import_time_s(module: str, repo_path: str) -> float:
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=dict(os.environ, PYTHONPATH=repo_path, QT_QPA_PLATFORM="offscreen"),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    for line in output.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s+(\S+)$", line)
+        if match is not None and match.group(2) == module:
+            return int(match.group(1)) / 1e6
+    raise RuntimeError(output)
+
+
+if __name__ == "__main__":
+    repo_path = os.getcwd()
+    use_scratch_data_dir()
+    from cache import RecordStore
+    from xivapi.models import Recipe
+
+    recipe_dict = {}
+    for recipe_id in range(1, RECIPE_COUNT + 1):
+        recipe = make_recipe(
+            recipe_id,
+            recipe_id + 10000,
+            [
+                (recipe_id * 7 + index * 13) % 5000 + 1
+                for index in range(1 + recipe_id % 6)
+            ],
+        )
+        if recipe_id % 10 == 0:
+            recipe["ItemIngredientRecipe0"] = [
+                make_recipe(recipe_id + 100000, 1, [2, 3])
+            ]
+        recipe_dict[str([f"/Recipe/{recipe_id}"])] = Recipe.parse_obj(recipe)
+
+    json_path = Path(".data/recipes.json")
+    t = time.perf_counter()
+    json.dump(
+        {key: (recipe.json(), CACHE_TIME) for key, recipe in recipe_dict.items()},
+        json_path.open("w"),
+        indent=2,
+    )
+    json_save_s = time.perf_counter() - t
+    t = time.perf_counter()
+    json_cache = {
+        key: (Recipe.parse_raw(value[0]), value[1])
+        for key, value in json.load(json_path.open("r")).items()
+    }
+    json_load_s = time.perf_counter() - t
+    print(
+        f"Indented JSON: {json_path.stat().st_size / 2**20:.1f} MB, "
+        f"load {json_load_s:.2f}s, save {json_save_s:.2f}s"
+    )
+
+    migrate_import_s = import_time_s("xivapi.xivapi", repo_path)
+    store_path = Path(".data/recipes.bin")
+    assert store_path.exists() and not json_path.exists()
+    store_import_s = import_time_s("xivapi.xivapi", repo_path)
+    print(
+        f"import xivapi.xivapi: {migrate_import_s:.2f}s migrating the JSON cache, "
+        f"{store_import_s:.2f}s with the record store"
+    )
+
+    t = time.perf_counter()
+    store = RecordStore(store_path)
+    open_s = time.perf_counter() - t
+    key_list = list(recipe_dict)[:: RECIPE_COUNT // TOUCHED_COUNT]
+    t = time.perf_counter()
+    assert all(store[key][0] == recipe_dict[key] for key in key_list)
+    read_s = time.perf_counter() - t
+    file_bytes = store_path.stat().st_size
+    for key in key_list:
+        store[key] = (recipe_dict[key], CACHE_TIME + 1)
+    t = time.perf_counter()
+    store.save_to_disk()
+    save_s = time.perf_counter() - t
+    print(
+        f"Record store: {file_bytes / 2**20:.1f} MB, open {open_s * 1000:.1f}ms, "
+        f"first read of {TOUCHED_COUNT} entries {read_s * 1000:.1f}ms "
+        f"({store.decode_count} decoded), save of {TOUCHED_COUNT} changed entries "
+        f"{save_s * 1000:.1f}ms, {(store_path.stat().st_size - file_bytes) / 1024:.0f} KB appended"
+    )
+    store = RecordStore(store_path)
+    assert len(store) == RECIPE_COUNT
+    assert all(store[key] == (recipe_dict[key], CACHE_TIME + 1) for key in key_list)
+    assert len(json_cache) == RECIPE_COUNT
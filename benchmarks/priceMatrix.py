@@ -0,0 +1,73 @@
+# Times the data center price matrix over 10k items x 8 worlds: filling it from
+# data center listings in request sized batches, and the vectorized argmin/argmax
+# for the cheapest world to buy and best world to sell in, against finding the
+# cheapest world item by item over the listing rows.
+# Run from the repository root: python -m benchmarks.priceMatrix
+import time
+from typing import Dict
+import numpy as np
+
+from benchmarks.universalisStandIn import DATA_CENTER_WORLD_IDS, make_listings
+from universalis.models import Listings
+from universalis.priceMatrix import PriceMatrix
+
+ITEM_COUNT = 10000
+DATA_CENTER = "Light"
+BATCH_SIZE = 100  # Items per Universalis request
+
+if __name__ == "__main__":
+    time_s = time.time()
+    listings_list = [
+        Listings.parse_obj(make_listings(item_id, DATA_CENTER, time_s, 40, 10))
+        for item_id in range(1, ITEM_COUNT + 1)
+    ]
+    print(
+        f"{ITEM_COUNT} items x {len(DATA_CENTER_WORLD_IDS[DATA_CENTER])} worlds, "
+        f"{sum(len(listings.listings) for listings in listings_list)} listings"
+    )
+
+    t = time.perf_counter()
+    loop_cheapest: Dict[int, tuple] = {}
+    for listings in listings_list:
+        world_min: Dict[int, int] = {}
+        for listing in listings.listings:
+            if listing.pricePerUnit < world_min.get(listing.worldID, 1 << 62):
+                world_min[listing.worldID] = listing.pricePerUnit
+        if len(world_min) > 0:
+            world_id = min(world_min, key=world_min.__getitem__)
+            loop_cheapest[listings.itemID] = (world_id, world_min[world_id])
+    print(f"Per item loop, cheapest world: {time.perf_counter() - t:.3f}s")
+    t = time.perf_counter()
+    for listings in listings_list:
+        world_id, inverse = np.unique(listings.listings.world_id, return_inverse=True)
+        world_min = np.full(len(world_id), np.inf)
+        np.minimum.at(world_min, inverse, listings.listings.price_per_unit)
+        world_id[world_min.argmin()]
+    print(f"Per item NumPy, cheapest world: {time.perf_counter() - t:.3f}s")
+
+    price_matrix = PriceMatrix()
+    t = time.perf_counter()
+    for batch_start in range(0, ITEM_COUNT, BATCH_SIZE):
+        batch = listings_list[batch_start : batch_start + BATCH_SIZE]
+        price_matrix.update(batch, [time_s] * len(batch))
+    print(
+        f"Matrix update in batches of {BATCH_SIZE}, incl. argmin: "
+        f"{time.perf_counter() - t:.3f}s"
+    )
+    t = time.perf_counter()
+    price_matrix.update(listings_list, [time_s] * len(listings_list))
+    print(f"Matrix update in one batch, incl. argmin: {time.perf_counter() - t:.3f}s")
+    t = time.perf_counter()
+    price_matrix.recompute()
+    print(f"Argmin and argmax over all items: {(time.perf_counter() - t) * 1000:.2f}ms")
+    t = time.perf_counter()
+    matrix_cheapest = {
+        item_id: price_matrix.get_cheapest(item_id)
+        for item_id in range(1, ITEM_COUNT + 1)
+    }
+    print(f"Lookup of every item: {(time.perf_counter() - t) * 1000:.2f}ms")
+    # Ties between worlds may pick a different world at the same price
+    assert all(
+        matrix_cheapest[item_id][1] == price
+        for item_id, (_, price) in loop_cheapest.items()
+    )
@@ -0,0 +1,91 @@
+# Fetches the items of a 1000 recipe scan from the local Universalis stand-in as
+# full listings and as price summaries, comparing payload bytes, client side parse
+# time and wall time of each.
+# Run from the repository root: python -m benchmarks.priceSummary
+import random
+import time
+
+from benchmarks.common import use_scratch_data_dir
+from benchmarks.universalisStandIn import serve
+
+RECIPE_COUNT = 1000
+RECIPE_ITEM_COUNT = 10  # Result and up to 9 ingredients
+ITEM_COUNT = 5000
+WORLD = 86
+
+if __name__ == "__main__":
+    use_scratch_data_dir()
+    from transport.fastDecode import loads
+    from transport.transport import http_client
+    from universalis import universalis
+    from universalis.priceSummary import PriceSummaryTable
+
+    server = serve()
+    universalis.UNIVERSALIS_URL = server.url
+    rng = random.Random(0)
+    item_id_set = set()
+    for _ in range(RECIPE_COUNT):
+        item_id_set.update(rng.sample(range(1, ITEM_COUNT + 1), RECIPE_ITEM_COUNT))
+    item_id_list = sorted(item_id_set)
+    chunk_list = [
+        item_id_list[chunk_index : chunk_index + universalis.MULTI_ITEM_CHUNK_SIZE]
+        for chunk_index in range(
+            0, len(item_id_list), universalis.MULTI_ITEM_CHUNK_SIZE
+        )
+    ]
+    print(f"{RECIPE_COUNT} recipes, {len(item_id_list)} items")
+
+    listings_body_list = [
+        http_client.get(universalis._get_listings_url(chunk, WORLD)).content
+        for chunk in chunk_list
+    ]
+    summary_body_list = [
+        http_client.get(universalis._get_summary_url(chunk, WORLD)).content
+        for chunk in chunk_list
+    ]
+    listings_bytes = sum(len(body) for body in listings_body_list)
+    summary_bytes = sum(len(body) for body in summary_body_list)
+    print(
+        f"Payload: full listings {listings_bytes / 1024:,.0f} KB, "
+        f"price summaries {summary_bytes / 1024:,.0f} KB "
+        f"({summary_bytes / listings_bytes:.1%})"
+    )
+
+    t = time.perf_counter()
+    for chunk, body in zip(chunk_list, listings_body_list):
+        universalis._parse_listings_many(chunk, loads(body))
+    listings_parse_s = time.perf_counter() - t
+    price_summary_table = PriceSummaryTable()
+    t = time.perf_counter()
+    for chunk, body in zip(chunk_list, summary_body_list):
+        price_summary_table.update(
+            universalis._parse_summaries_many(chunk, loads(body)), time.time()
+        )
+    summary_parse_s = time.perf_counter() - t
+    print(
+        f"Parse: full listings {listings_parse_s * 1000:.0f}ms, "
+        f"price summaries into the table {summary_parse_s * 1000:.0f}ms"
+    )
+
+    server.request_count = 0
+    t = time.perf_counter()
+    price_summary_dict = universalis.get_price_summaries_many(item_id_list, WORLD)
+    print(
+        f"get_price_summaries_many: {server.request_count} requests, "
+        f"{time.perf_counter() - t:.2f}s"
+    )
+    server.request_count = 0
+    t = time.perf_counter()
+    listings_dict = universalis.get_listings_many(item_id_list, WORLD)
+    print(
+        f"get_listings_many: {server.request_count} requests, "
+        f"{time.perf_counter() - t:.2f}s"
+    )
+    # Both tiers give the profit engine the same prices
+    assert all(
+        price_summary_dict[item_id].min_price == listings.minPrice
+        and price_summary_dict[item_id].min_sale_price
+        == int(listings.recentHistory.price_per_unit.min())
+        for item_id, listings in listings_dict.items()
+    )
+    server.shutdown()
@@ -0,0 +1,123 @@
+# Memory and cache file size of the recipes of a max level crawl of all 8 crafting
+# classes against the local xivapi stand-in, where every recipe nests the recipes of
+# two shared intermediates. Compares the previous caches, a Recipe per fetched
+# document in the get_recipe cache plus a RecipeCollection per class and level in
+# the get_recipes cache, against the recipe graph and the views built on it. Sizes
+# are measured as a restarted session holding every recipe sees them.
+# Run from the repository root: python -m benchmarks.recipeGraph
+import os
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+from benchmarks.common import use_scratch_data_dir
+from benchmarks.xivapiStandIn import serve
+
+CLASSJOB_ID_LIST = list(range(8, 16))
+LEVEL_MAX = 90
+RECIPES_PER_LEVEL = 5
+INTERMEDIATE_COUNT = 200
+
+if __name__ == "__main__":
+    use_scratch_data_dir()
+    from cache import RecordStore, get_size
+    from transport.fastDecode import parse_model
+    from transport.transport import http_client
+    from xivapi import xivapi
+    from xivapi.models import Recipe, RecipeCollection
+    from xivapi.recipeGraph import RecipeGraph
+
+    recipe_count = len(CLASSJOB_ID_LIST) * LEVEL_MAX * RECIPES_PER_LEVEL
+    server = serve(
+        recipe_count=recipe_count,
+        classjob_count=len(CLASSJOB_ID_LIST),
+        intermediate_count=INTERMEDIATE_COUNT,
+    )
+    xivapi.XIVAPI_URL = server.url
+    http_client.set_rate_limit(urlparse(server.url).netloc, 1000, 1000)
+
+    t = time.perf_counter()
+    recipe_collection_dict = {
+        classjob_id: xivapi.get_recipes_up_to_level(classjob_id, LEVEL_MAX)
+        for classjob_id in CLASSJOB_ID_LIST
+    }
+    print(
+        f"Crawl: {len(CLASSJOB_ID_LIST)} classes to level {LEVEL_MAX}, "
+        f"{sum(len(c) for c in recipe_collection_dict.values())} recipes, "
+        f"{server.request_count} requests, {time.perf_counter() - t:.2f}s"
+    )
+    assert len(xivapi.recipe_graph) == recipe_count
+
+    # Previous caches: each document parsed on its own, nested recipes included
+    recipe_dict = {
+        recipe_id: parse_model(Recipe, server.get_recipe(recipe_id))
+        for recipe_id in range(1, recipe_count + 1)
+    }
+    recipe_store = RecordStore(Path(".data/recipes.bin"))
+    recipe_store.set_many(
+        {
+            str([f"/Recipe/{recipe_id}"]): (recipe, time.time())
+            for recipe_id, recipe in recipe_dict.items()
+        }
+    )
+    recipe_store.save_to_disk()
+    collection_store = RecordStore(Path(".data/recipe_collection.bin"))
+    collection_dict = {}
+    for recipe in recipe_dict.values():
+        key = str([recipe.ClassJob.ID, recipe.RecipeLevelTable.ClassJobLevel])
+        collection_dict.setdefault(key, (RecipeCollection(), time.time()))[0].append(
+            recipe
+        )
+    collection_store.set_many(collection_dict)
+    collection_store.save_to_disk()
+    del recipe_store, collection_store, collection_dict
+    before_file_bytes = sum(
+        os.path.getsize(f".data/{filename}")
+        for filename in ("recipes.bin", "recipe_collection.bin")
+    )
+    recipe_store = RecordStore(Path(".data/recipes.bin"))
+    collection_store = RecordStore(Path(".data/recipe_collection.bin"))
+    before_cache = (
+        {key: recipe_store[key] for key in recipe_store},
+        {key: collection_store[key] for key in collection_store},
+    )
+    before_bytes = get_size(before_cache)
+    print(
+        f"Recipe and collection caches: file {before_file_bytes / 1024:,.0f} KB, "
+        f"memory {before_bytes / 1024:,.0f} KB"
+    )
+
+    xivapi.recipe_graph.save_to_disk()
+    after_file_bytes = os.path.getsize(".data/recipe_graph.bin")
+    recipe_graph = RecipeGraph("recipe_graph.bin")
+    view_dict = {
+        recipe_id: recipe_graph.get(recipe_id)
+        for recipe_id in range(1, recipe_count + 1)
+    }
+    after_bytes = get_size(recipe_graph)
+    print(
+        f"Recipe graph: file {after_file_bytes / 1024:,.0f} KB "
+        f"({after_file_bytes / before_file_bytes:.1%}), "
+        f"memory {after_bytes / 1024:,.0f} KB ({after_bytes / before_bytes:.1%})"
+    )
+
+    # The views read as the parsed documents do, with intermediates shared
+    for recipe_id, recipe in recipe_dict.items():
+        view = view_dict[recipe_id]
+        assert view.ClassJob == recipe.ClassJob
+        assert view.RecipeLevelTable == recipe.RecipeLevelTable
+        assert view.ItemResult == recipe.ItemResult
+        for ingredient_index in range(10):
+            assert getattr(view, f"AmountIngredient{ingredient_index}") == getattr(
+                recipe, f"AmountIngredient{ingredient_index}"
+            )
+            assert getattr(view, f"ItemIngredient{ingredient_index}") == getattr(
+                recipe, f"ItemIngredient{ingredient_index}"
+            )
+            sub_recipes = getattr(recipe, f"ItemIngredientRecipe{ingredient_index}")
+            view_sub_recipes = getattr(view, f"ItemIngredientRecipe{ingredient_index}")
+            assert (sub_recipes is None) == (view_sub_recipes is None)
+            for sub_recipe, view_sub_recipe in zip(
+                sub_recipes or (), view_sub_recipes or ()
+            ):
+                assert view_sub_recipe is view_dict[sub_recipe.ID]
@@ -0,0 +1,57 @@
+# Crawls the recipes of every level of one class from the local xivapi stand-in, the
+# way get_recipes_up_to_level does, once fetching each search result with its own
+# get_recipe call and once through get_recipes_by_url, comparing requests, bytes
+# and wall time. Both runs start from an empty recipe cache.
+# Run from the repository root: python -m benchmarks.recipesByUrl
+import time
+from urllib.parse import urlparse
+
+from benchmarks.common import use_scratch_data_dir
+from benchmarks.xivapiStandIn import serve
+
+RECIPE_COUNT = 900  # 10 per level
+CLASSJOB_ID = 8
+LEVEL_MAX = 90
+LATENCY_S = 0.15  # Round trip to xivapi.com
+
+if __name__ == "__main__":
+    use_scratch_data_dir()
+    from transport.transport import http_client
+    from xivapi import xivapi
+
+    server = serve(latency_s=LATENCY_S, recipe_count=RECIPE_COUNT)
+    xivapi.XIVAPI_URL = server.url
+    http_client.set_rate_limit(
+        urlparse(server.url).netloc, xivapi.REQUEST_RATE, xivapi.REQUEST_BURST
+    )
+
+    def crawl(name: str, get_recipes) -> list:
+        xivapi.recipe_graph.clear()
+        server.request_count = 0
+        server.bytes_sent = 0
+        t = time.perf_counter()
+        recipe_list = []
+        for classjob_level in range(1, LEVEL_MAX + 1):
+            for page_result_list in xivapi.get_content_page_results(
+                f"search?filters=RecipeLevelTable.ClassJobLevel={classjob_level},ClassJob.ID={CLASSJOB_ID}"
+            ):
+                recipe_list.extend(
+                    get_recipes([page_result.Url for page_result in page_result_list])
+                )
+        print(
+            f"{name}: {len(recipe_list)} recipes, {server.request_count} requests, "
+            f"{server.bytes_sent / 1024:,.0f} KB, {time.perf_counter() - t:.1f}s"
+        )
+        return recipe_list
+
+    one_by_one_list = crawl(
+        "get_recipe per result",
+        lambda url_list: [xivapi.get_recipe(url) for url in url_list],
+    )
+    bulk_list = crawl("get_recipes_by_url", xivapi.get_recipes_by_url)
+    assert bulk_list == one_by_one_list
+    assert len(xivapi.recipe_graph) == RECIPE_COUNT
+    server.request_count = 0
+    xivapi.get_recipes_by_url([f"/Recipe/{recipe_id}" for recipe_id in range(1, 101)])
+    assert server.request_count == 0
+    server.shutdown()
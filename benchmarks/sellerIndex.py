@@ -0,0 +1,90 @@
+# Finds a seller's items in a 10k item listings store, scanning every cached item's
+# listings (what walking recipes amounted to) against the store's seller index.
+# Run from the repository root: python -m benchmarks.sellerIndex
+import time
+
+from benchmarks.common import use_scratch_data_dir
+from benchmarks.universalisStandIn import make_listings
+
+ITEM_COUNT = 10000
+SELLER_COUNT = 2000
+WORLD = "Sephirot"
+RECIPE_COUNT = 1000
+RECIPE_ITEM_COUNT = 10  # Result and up to 9 ingredients
+
+if __name__ == "__main__":
+    use_scratch_data_dir()
+    from universalis.listingsStore import ListingsStore
+    from universalis.models import Listings
+
+    time_s = time.time()
+    seller_id_list = [f"{index:064x}" for index in range(SELLER_COUNT)]
+    seller_id = seller_id_list[0]
+    store = ListingsStore("bench.db")
+    t = time.perf_counter()
+    for chunk_start in range(1, ITEM_COUNT + 1, 100):
+        store.update(
+            {
+                str([item_id, WORLD]): (
+                    Listings.parse_obj(
+                        make_listings(
+                            item_id, WORLD, time_s, seller_id_list=seller_id_list
+                        )
+                    ),
+                    time_s,
+                )
+                for item_id in range(
+                    chunk_start, min(chunk_start + 100, ITEM_COUNT + 1)
+                )
+            }
+        )
+    print(
+        f"Store write of {ITEM_COUNT} items with index: {time.perf_counter() - t:.3f}s"
+    )
+    store.close()
+
+    scan_store = ListingsStore("bench.db")
+    t = time.perf_counter()
+    scan_key_set = {
+        key for key in scan_store if scan_store[key][0].listings.has_seller(seller_id)
+    }
+    print(f"Scan of every item (cold): {time.perf_counter() - t:.3f}s")
+    t = time.perf_counter()
+    scan_key_set = {
+        key for key in scan_store if scan_store[key][0].listings.has_seller(seller_id)
+    }
+    print(f"Scan of every item (loaded): {time.perf_counter() - t:.3f}s")
+
+    store = ListingsStore("bench.db")
+    t = time.perf_counter()
+    index_key_set = set(store.get_seller_positions(seller_id))
+    print(f"Index lookup (cold, reads sellers table): {time.perf_counter() - t:.3f}s")
+    t = time.perf_counter()
+    index_key_set = set(store.get_seller_positions(seller_id))
+    print(f"Index lookup (loaded): {(time.perf_counter() - t) * 1000:.3f}ms")
+    assert index_key_set == scan_key_set
+    print(f"Seller has listings of {len(index_key_set)} items")
+
+    # Per recipe check of update_table_recipe
+    recipe_key_list = [
+        [
+            str([(recipe_index * RECIPE_ITEM_COUNT + offset) % ITEM_COUNT + 1, WORLD])
+            for offset in range(RECIPE_ITEM_COUNT)
+        ]
+        for recipe_index in range(RECIPE_COUNT)
+    ]
+    t = time.perf_counter()
+    for key_list in recipe_key_list:
+        [key for key in key_list if scan_store[key][0].listings.has_seller(seller_id)]
+    scan_s = time.perf_counter() - t
+    t = time.perf_counter()
+    for key_list in recipe_key_list:
+        seller_positions = store.get_seller_positions(seller_id)
+        [key for key in key_list if key in seller_positions]
+    index_s = time.perf_counter() - t
+    print(
+        f"Per recipe check, {RECIPE_COUNT} recipes (loaded): scan {scan_s * 1000:.1f}ms, "
+        f"index {index_s * 1000:.1f}ms"
+    )
+    scan_store.close()
+    store.close()
@@ -0,0 +1,213 @@
+# Time from interpreter start to the first paint of the main window, and the import
+# cost of the heavier modules on the way there, with the caches of a long used
+# install: 20k items of listing freshness and 200 retainer listings. Each run is a
+# fresh interpreter under -X importtime against the local xivapi and Universalis
+# stand-ins. Deferred loading is timed separately, from the first paint until the
+# price graph is built.
+# Pass the path of another checkout to time it the same way for comparison, e.g.
+#   git worktree add /tmp/before <commit>
+#   python -m benchmarks.uiStartup /tmp/before
+# Run from the repository root: python -m benchmarks.uiStartup [checkout]
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Dict, List, Set, Tuple
+
+from benchmarks.common import use_scratch_data_dir
+
+FRESHNESS_ITEM_COUNT = 20000
+RETAINER_LISTINGS_COUNT = 200
+RUN_COUNT = 3
+WORLD = 86
+MODULE_LIST = [
+    "PySide6.QtWidgets",
+    "numpy",
+    "pandas",
+    "scipy.stats",
+    "pyqtgraph",
+    "requests",
+    "pydantic",
+    "cache",
+    "xivapi.xivapi",
+    "universalis.universalis",
+    "craftingWorker",
+    "gathererWorker.gathererWorker",
+    "ui",
+]
+
+CHILD_CODE = """
+import time
+t = time.perf_counter()
+import os
+import sys
+from PySide6.QtWidgets import QApplication
+import ui
+from universalis import universalis
+from universalis.marketFeed import MarketFeed
+from xivapi import xivapi
+xivapi.XIVAPI_URL = {xivapi_url!r}
+universalis.UNIVERSALIS_URL = {universalis_url!r}
+# Nothing listens here, the feed only retries in the background
+ui.MarketFeed = lambda world_id: MarketFeed(world_id, "ws://127.0.0.1:9/api/ws")
+classjob_list = xivapi.get_classjob_doh_list()
+app = QApplication([])
+main_window = ui.MainWindow(classjob_list)
+main_window.show()
+app.processEvents()
+# One write each, the workers print to stdout as well once the window is built
+os.write(1, f"\\nfirst_paint_s {{time.perf_counter() - t}}\\n".encode())
+os.write(1, f"\\nfirst_paint_modules {{','.join(sorted(sys.modules))}}\\n".encode())
+t = time.perf_counter()
+if hasattr(main_window, "load_deferred"):
+    main_window.load_deferred()
+    app.processEvents()
+os.write(1, f"\\ndeferred_s {{time.perf_counter() - t}}\\n".encode())
+os._exit(0)
+"""
+
+
+def seed_caches() -> None:
+    import pickle
+
+    from benchmarks.universalisStandIn import make_listings
+    from cache import PersistMapping
+    from universalis.freshness import ItemFreshness
+    from universalis.models import Listings
+
+    freshness = PersistMapping[str, ItemFreshness](f"freshness-{WORLD}.bin")
+    for item_id in range(1, FRESHNESS_ITEM_COUNT + 1):
+        freshness[str([item_id, WORLD])] = ItemFreshness(
+            time.time() - item_id, 3600.0, item_id % 10 / 2
+        )
+    freshness.save_to_disk()
+    with open(".data/retainer_worker_cache.bin", "wb") as f:
+        pickle.dump(
+            [
+                Listings.parse_obj(make_listings(item_id, "Sephirot", time.time()))
+                for item_id in range(1, RETAINER_LISTINGS_COUNT + 1)
+            ],
+            f,
+        )
+
+
+# Cumulative import time of each module of MODULE_LIST with its submodules,
+# counting those imported from outside it too, as scipy imports scipy.stats lazily
+def parse_import_times(output: str) -> Dict[str, float]:
+    entry_list: List[Tuple[int, str, float]] = []
+    for line in output.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|( +)(\S+)$", line)
+        if match is not None:
+            entry_list.append(
+                (
+                    (len(match.group(2)) - 1) // 2,
+                    match.group(3),
+                    int(match.group(1)) / 1e6,
+                )
+            )
+    import_time_dict: Dict[str, float] = {}
+    # Imports are listed after the imports they made, so in reverse each entry
+    # comes after its ancestors
+    ancestor_list: List[str] = []
+    for depth, name, cumulative_s in reversed(entry_list):
+        del ancestor_list[depth:]
+        for module in MODULE_LIST:
+            if _is_in(name, module) and not any(
+                _is_in(ancestor, module) for ancestor in ancestor_list
+            ):
+                import_time_dict[module] = (
+                    import_time_dict.get(module, 0.0) + cumulative_s
+                )
+        ancestor_list.append(name)
+    return import_time_dict
+
+
+def _is_in(name: str, module: str) -> bool:
+    return name == module or name.startswith(f"{module}.")
+
+
+def run_startup(
+    repo_path: str, data_path: str, xivapi_url: str, universalis_url: str
+) -> Tuple[float, float, Dict[str, float], Set[str]]:
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            CHILD_CODE.format(xivapi_url=xivapi_url, universalis_url=universalis_url),
+        ],
+        cwd=data_path,
+        env=dict(
+            os.environ,
+            PYTHONPATH=os.pathsep.join(
+                [repo_path] + [path for path in [os.environ.get("PYTHONPATH")] if path]
+            ),
+            QT_QPA_PLATFORM="offscreen",
+        ),
+        capture_output=True,
+        text=True,
+    )
+    time_dict = dict(
+        (name, float(value))
+        for name, value in re.findall(
+            r"^(first_paint_s|deferred_s) (\S+)$", result.stdout, re.MULTILINE
+        )
+    )
+    if len(time_dict) < 2:
+        raise RuntimeError(
+            f"Exit {result.returncode}: {result.stdout[-1000:]}"
+            + re.sub(r"import time:.*\n", "", result.stderr)[-3000:]
+        )
+    first_paint_module_set = set(
+        re.findall(r"^first_paint_modules (\S+)$", result.stdout, re.MULTILINE)[
+            0
+        ].split(",")
+    )
+    return (
+        time_dict["first_paint_s"],
+        time_dict["deferred_s"],
+        parse_import_times(result.stderr),
+        first_paint_module_set,
+    )
+
+
+def time_startup(
+    name: str, repo_path: str, xivapi_url: str, universalis_url: str
+) -> None:
+    data_path = use_scratch_data_dir()
+    seed_caches()
+    # The first run fills the class job and other caches a used install has
+    run_startup(repo_path, data_path, xivapi_url, universalis_url)
+    run_list: List[Tuple[float, float, Dict[str, float], Set[str]]] = [
+        run_startup(repo_path, data_path, xivapi_url, universalis_url)
+        for _ in range(RUN_COUNT)
+    ]
+    first_paint_s, deferred_s, import_time_dict, first_paint_module_set = min(
+        run_list, key=lambda r: r[0]
+    )
+    print(
+        f"{name}: first paint {first_paint_s:.2f}s after interpreter start "
+        f"(best of {RUN_COUNT}), then {deferred_s:.2f}s of deferred loading"
+    )
+    for module in MODULE_LIST:
+        if module in import_time_dict:
+            print(
+                f"  {module:32} {import_time_dict[module] * 1000:8.1f}ms"
+                + ("" if module in first_paint_module_set else " after first paint")
+            )
+        else:
+            print(f"  {module:32} {'not imported':>10}")
+
+
+if __name__ == "__main__":
+    repo_path = os.getcwd()
+    from benchmarks import universalisStandIn, xivapiStandIn
+
+    xivapi_server = xivapiStandIn.serve(recipe_count=900)
+    universalis_server = universalisStandIn.serve()
+    for name, path in [("This checkout", repo_path)] + [
+        (f"Checkout {path}", os.path.abspath(path)) for path in sys.argv[1:]
+    ]:
+        time_startup(name, path, xivapi_server.url, universalis_server.url)
@@ -0,0 +1,76 @@
+# Local stand-in for the Universalis websocket feed. Clients subscribe with BSON
+# {"event": "subscribe", "channel": "listings/add{world=86}"} messages and receive
+# the events published to matching channels. Runs on the Qt event loop of the
+# thread it is created in.
+from typing import Any, Dict, List, Set
+
+from PySide6.QtCore import QByteArray, QObject, Slot
+from PySide6.QtNetwork import QHostAddress
+from PySide6.QtWebSockets import QWebSocket, QWebSocketServer
+
+from universalis import bsonCodec
+
+
+class UniversalisFeedStandIn(QObject):
+    def __init__(self, port: int = 0) -> None:
+        super().__init__()
+        self.server = QWebSocketServer("universalis", QWebSocketServer.NonSecureMode)
+        self.server.newConnection.connect(self._on_new_connection)
+        self.server.listen(QHostAddress.LocalHost, port)
+        self._subscription_dict: Dict[QWebSocket, Set[str]] = {}
+        self.message_count = 0
+
+    @property
+    def url(self) -> str:
+        return f"ws://127.0.0.1:{self.server.serverPort()}/api/ws"
+
+    def subscriber_count(self) -> int:
+        return len(self._subscription_dict)
+
+    # Sends an event to every client subscribed to its channel for the world
+    def publish(
+        self, event: str, item: int, world: int, rows: List[Dict[str, Any]]
+    ) -> None:
+        channel = f"{event}{{world={world}}}"
+        message = QByteArray(
+            bsonCodec.encode(
+                {
+                    "event": event,
+                    "item": item,
+                    "world": world,
+                    "sales" if event.startswith("sales") else "listings": rows,
+                }
+            )
+        )
+        for web_socket, channel_set in self._subscription_dict.items():
+            if channel in channel_set:
+                web_socket.sendBinaryMessage(message)
+                self.message_count += 1
+
+    def disconnect_clients(self) -> None:
+        for web_socket in list(self._subscription_dict):
+            web_socket.close()
+
+    def close(self) -> None:
+        self.disconnect_clients()
+        self.server.close()
+
+    @Slot()
+    def _on_new_connection(self) -> None:
+        web_socket = self.server.nextPendingConnection()
+        self._subscription_dict[web_socket] = set()
+        web_socket.binaryMessageReceived.connect(
+            lambda message: self._on_message(web_socket, message)
+        )
+        web_socket.disconnected.connect(lambda: self._on_disconnected(web_socket))
+
+    def _on_message(self, web_socket: QWebSocket, message: QByteArray) -> None:
+        content = bsonCodec.decode(message.data())
+        if content.get("event") == "subscribe":
+            self._subscription_dict[web_socket].add(content["channel"])
+        elif content.get("event") == "unsubscribe":
+            self._subscription_dict[web_socket].discard(content["channel"])
+
+    def _on_disconnected(self, web_socket: QWebSocket) -> None:
+        self._subscription_dict.pop(web_socket, None)
+        web_socket.deleteLater()
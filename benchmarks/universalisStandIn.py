@@ -0,0 +1,214 @@
+# Local stand-in for the Universalis API. Serves generated market data for any item id
+# so universalis.universalis can be pointed at it through UNIVERSALIS_URL.
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+# Data centers served with per row world ids, as Universalis does for a data center
+DATA_CENTER_WORLD_IDS: Dict[str, List[int]] = {
+    "Light": [33, 36, 42, 56, 66, 67, 402, 403]
+}
+
+
+def make_listing(rng: random.Random, time_s: float, seller_id: str) -> Dict[str, Any]:
+    price = rng.randint(100, 100000)
+    quantity = rng.randint(1, 99)
+    return {
+        "lastReviewTime": int(time_s) - rng.randint(0, 3600 * 24),
+        "pricePerUnit": price,
+        "quantity": quantity,
+        "hq": rng.random() < 0.3,
+        "isCrafted": rng.random() < 0.5,
+        "retainerName": f"Retainer{rng.randint(0, 500)}",
+        "sellerID": seller_id,
+        "total": price * quantity,
+    }
+
+
+def make_sale(rng: random.Random, time_s: float) -> Dict[str, Any]:
+    price = rng.randint(100, 100000)
+    quantity = rng.randint(1, 99)
+    return {
+        "pricePerUnit": price,
+        "quantity": quantity,
+        "hq": rng.random() < 0.3,
+        "total": price * quantity,
+        "timestamp": int(time_s) - rng.randint(0, 3600 * 24 * 7),
+    }
+
+
+def make_listings(
+    item_id: int,
+    world: str,
+    time_s: float,
+    listing_count: int = 20,
+    sale_count: int = 5,
+    seller_id_list: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    rng = random.Random(item_id)
+    seller_id_list = seller_id_list or [f"{index:064x}" for index in range(50)]
+    listings = [
+        make_listing(rng, time_s, rng.choice(seller_id_list))
+        for _ in range(listing_count)
+    ]
+    sales = [make_sale(rng, time_s) for _ in range(sale_count)]
+    dc_world_ids = DATA_CENTER_WORLD_IDS.get(world)
+    if dc_world_ids is not None:
+        for row in listings + sales:
+            row["worldID"] = rng.choice(dc_world_ids)
+    prices = [listing["pricePerUnit"] for listing in listings] or [0]
+    return {
+        "itemID": item_id,
+        "worldID": int(world) if world.isdigit() else None,
+        "lastUploadTime": int(time_s * 1000),
+        "listings": listings,
+        "recentHistory": sales,
+        "currentAveragePrice": sum(prices) / len(prices),
+        "currentAveragePriceNQ": sum(prices) / len(prices),
+        "currentAveragePriceHQ": sum(prices) / len(prices),
+        "regularSaleVelocity": rng.random() * 10,
+        "nqSaleVelocity": rng.random() * 10,
+        "hqSaleVelocity": rng.random() * 10,
+        "averagePrice": sum(prices) / len(prices),
+        "averagePriceNQ": sum(prices) / len(prices),
+        "averagePriceHQ": sum(prices) / len(prices),
+        "minPrice": min(prices),
+        "minPriceNQ": min(prices),
+        "minPriceHQ": min(prices),
+        "maxPrice": max(prices),
+        "maxPriceNQ": max(prices),
+        "maxPriceHQ": max(prices),
+        "listingsCount": len(listings),
+        "recentHistoryCount": len(sales),
+        "worldName": None if world.isdigit() or dc_world_ids else world,
+        "dcName": world if dc_world_ids else None,
+    }
+
+
+# Keeps only the dotted field paths of a response, as the fields query parameter
+def select_fields(content: Any, path_list: List[List[str]]) -> Any:
+    if isinstance(content, list):
+        return [select_fields(value, path_list) for value in content]
+    if not isinstance(content, dict) or any(len(path) == 0 for path in path_list):
+        return content
+    selected = {}
+    for name, value in content.items():
+        sub_path_list = [path[1:] for path in path_list if path[0] == name]
+        if name.isdigit():  # Multi-item responses key items by id
+            sub_path_list = path_list
+        if len(sub_path_list) > 0:
+            selected[name] = select_fields(value, sub_path_list)
+    return selected
+
+
+class UniversalisStandIn(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, latency_s: float = 0.0) -> None:
+        super().__init__(("127.0.0.1", port), UniversalisStandInHandler)
+        self.latency_s = latency_s
+        self.request_count = 0
+        self.bytes_sent = 0
+        self.request_count_mutex = threading.Lock()
+        # item id: lastUploadTime in seconds served for it, instead of request time
+        self.upload_time_s: Dict[int, float] = {}
+        # Served for most-recently-updated, built from upload_time_s when None
+        self.recently_updated: Optional[Dict[str, Any]] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/api/v2"
+
+    def get_listings(
+        self, id: int, world: str, time_s: float, query: Dict[str, List[str]]
+    ) -> Dict[str, Any]:
+        listings = make_listings(id, world, time_s)
+        if id in self.upload_time_s:
+            listings["lastUploadTime"] = int(self.upload_time_s[id] * 1000)
+        if "listings" in query:
+            listings["listings"] = listings["listings"][: int(query["listings"][0])]
+            # As Universalis, listingsCount counts the listings returned
+            listings["listingsCount"] = len(listings["listings"])
+        if "entries" in query:
+            listings["recentHistory"] = listings["recentHistory"][
+                : int(query["entries"][0])
+            ]
+        return listings
+
+    def get_recently_updated(self, query: Dict[str, List[str]]) -> Dict[str, Any]:
+        if self.recently_updated is not None:
+            return self.recently_updated
+        world = query.get("world", query.get("dcName", [""]))[0]
+        entry_count = int(query.get("entries", ["200"])[0])
+        newest = sorted(self.upload_time_s.items(), key=lambda item: -item[1])
+        return {
+            "items": [
+                {
+                    "itemID": id,
+                    "lastUploadTime": int(upload_time_s * 1000),
+                    "worldID": int(world) if world.isdigit() else None,
+                }
+                for id, upload_time_s in newest[:entry_count]
+            ]
+        }
+
+    def get_content(self, path: List[str], query: Dict[str, List[str]]) -> Any:
+        if path[:3] == ["extra", "stats", "most-recently-updated"]:
+            return self.get_recently_updated(query)
+        world, id_list = path[0], [int(id) for id in path[1].split(",")]
+        time_s = time.time()
+        if len(id_list) == 1:
+            content = self.get_listings(id_list[0], world, time_s, query)
+        else:
+            content = {
+                "itemIDs": id_list,
+                "items": {
+                    str(id): self.get_listings(id, world, time_s, query)
+                    for id in id_list
+                },
+                "worldID": int(world) if world.isdigit() else None,
+                "unresolvedItems": [],
+            }
+        if "fields" in query:
+            content = select_fields(
+                content, [field.split(".") for field in query["fields"][0].split(",")]
+            )
+        return content
+
+
+class UniversalisStandInHandler(BaseHTTPRequestHandler):
+    server: UniversalisStandIn
+
+    def do_GET(self) -> None:
+        with self.server.request_count_mutex:
+            self.server.request_count += 1
+        if self.server.latency_s > 0:
+            time.sleep(self.server.latency_s)
+        url = urlparse(self.path)
+        path = [part for part in url.path.split("/") if part][2:]  # strip api/v2
+        try:
+            content = self.server.get_content(path, parse_qs(url.query))
+        except (IndexError, ValueError, KeyError):
+            self.send_error(404)
+            return
+        body = json.dumps(content).encode()
+        with self.server.request_count_mutex:
+            self.server.bytes_sent += len(body)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def serve(port: int = 0, latency_s: float = 0.0) -> UniversalisStandIn:
+    server = UniversalisStandIn(port, latency_s)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
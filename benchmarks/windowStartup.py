@@ -0,0 +1,96 @@
+# Time from a cold start to the main window being shown, with the class job catalogue
+# coming from the local xivapi stand-in at xivapi.com latency. Each run is a fresh
+# interpreter in a scratch directory with empty caches. The previous catalogue
+# query listed the class jobs and fetched every one of them in full, from inside
+# MainWindow.__init__; it now is one projected list request made before the window.
+# Run from the repository root: python -m benchmarks.windowStartup
+import os
+import subprocess
+import sys
+import time
+from typing import List
+
+from benchmarks.common import use_scratch_data_dir
+
+LATENCY_S = 0.15  # Round trip to xivapi.com
+RUN_COUNT = 3
+
+
+def _get_classjob_doh_list_previous() -> list:
+    from xivapi import xivapi
+    from xivapi.models import ClassJob
+
+    classjob_doh_list = []
+    for result_list in xivapi.get_content_page_results("ClassJob"):
+        for result in result_list:
+            classjob_info: ClassJob = xivapi.get_content(result.Url, ClassJob)
+            if classjob_info.ClassJobCategory.Name == "Disciple of the Hand":
+                classjob_doh_list.append(classjob_info)
+    return classjob_doh_list
+
+
+def run_window(query: str, xivapi_url: str, universalis_url: str) -> None:
+    use_scratch_data_dir()
+    from PySide6.QtWidgets import QApplication
+
+    import ui
+    from universalis import universalis
+    from universalis.marketFeed import MarketFeed
+    from xivapi import xivapi
+
+    xivapi.XIVAPI_URL = xivapi_url
+    universalis.UNIVERSALIS_URL = universalis_url
+    # Nothing listens here, the feed only retries in the background
+    ui.MarketFeed = lambda world_id: MarketFeed(world_id, "ws://127.0.0.1:9/api/ws")
+    t = time.perf_counter()
+    if query == "previous":
+        app = QApplication([])
+        xivapi.get_classjob_doh_list.func = _get_classjob_doh_list_previous
+        main_window = ui.MainWindow(xivapi.get_classjob_doh_list())
+    else:
+        classjob_list = xivapi.get_classjob_doh_list()
+        app = QApplication([])
+        main_window = ui.MainWindow(classjob_list)
+    main_window.show()
+    app.processEvents()
+    print(f"{time.perf_counter() - t:.3f}", flush=True)
+    os._exit(0)
+
+
+def time_window(query: str, xivapi_url: str, universalis_url: str) -> float:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.windowStartup"]
+        + [query, xivapi_url, universalis_url],
+        env=dict(os.environ, QT_QPA_PLATFORM="offscreen"),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4:
+        run_window(*sys.argv[1:])
+    from benchmarks import universalisStandIn, xivapiStandIn
+
+    xivapi_server = xivapiStandIn.serve(latency_s=LATENCY_S, recipe_count=900)
+    universalis_server = universalisStandIn.serve()
+    for query in ("previous", "current"):
+        time_list: List[float] = []
+        xivapi_server.request_path_list.clear()
+        for _ in range(RUN_COUNT):
+            time_list.append(
+                time_window(query, xivapi_server.url, universalis_server.url)
+            )
+        # The crafting worker starts on its recipes as soon as the window is built
+        catalogue_request_count = sum(
+            1
+            for path in xivapi_server.request_path_list
+            if path.startswith("/ClassJob")
+        )
+        print(
+            f"{query} catalogue query: window shown after "
+            f"{min(time_list):.2f}s (best of {RUN_COUNT}), "
+            f"{catalogue_request_count // RUN_COUNT} catalogue requests"
+        )
@@ -0,0 +1,57 @@
+# Walks every page of a 40 page xivapi search on the local stand-in with the old
+# sequential loop and with yield_content_pages, comparing wall time and checking the
+# pages come back in order. The stand-in host gets xivapi's own rate limit.
+# Run from the repository root: python -m benchmarks.xivapiPagination
+import time
+from urllib.parse import urlparse
+
+from benchmarks.common import use_scratch_data_dir
+from benchmarks.xivapiStandIn import RESULTS_PER_PAGE, serve
+
+RECIPE_COUNT = 40 * RESULTS_PER_PAGE
+LATENCY_S = 0.15  # Round trip to xivapi.com
+
+if __name__ == "__main__":
+    use_scratch_data_dir()
+    from transport.transport import http_client
+    from xivapi import xivapi
+
+    server = serve(latency_s=LATENCY_S, recipe_count=RECIPE_COUNT)
+    xivapi.XIVAPI_URL = server.url
+    http_client.set_rate_limit(
+        urlparse(server.url).netloc, xivapi.REQUEST_RATE, xivapi.REQUEST_BURST
+    )
+    content_name = "search?filters=ClassJob.ID=8"
+
+    t = time.perf_counter()
+    first_page = xivapi.get_content(content_name, xivapi.Page)
+    sequential_page_list = [first_page] + [
+        xivapi.get_page(content_name, page)
+        for page in range(2, first_page.Pagination.PageTotal + 1)
+    ]
+    print(
+        f"Sequential: {len(sequential_page_list)} pages, "
+        f"{time.perf_counter() - t:.2f}s"
+    )
+
+    t = time.perf_counter()
+    page_list = list(xivapi.yield_content_pages(content_name))
+    print(
+        f"yield_content_pages: {len(page_list)} pages, {time.perf_counter() - t:.2f}s"
+    )
+    assert [page.Pagination.Page for page in page_list] == list(
+        range(1, len(page_list) + 1)
+    )
+    assert page_list == sequential_page_list
+
+    # Stopping after the first page cancels the pages the pool has not taken yet
+    server.request_count = 0
+    page_iterator = xivapi.yield_content_pages(content_name)
+    next(page_iterator)
+    page_iterator.close()
+    time.sleep(1.0)  # Let requests already taken by the pool finish
+    print(
+        f"Stopped after the first page: {server.request_count} of "
+        f"{first_page.Pagination.PageTotal} pages requested"
+    )
+    server.shutdown()
@@ -0,0 +1,276 @@
+# Local stand-in for the xivapi endpoints the app uses. Serves generated recipes with
+# paged search results so xivapi.xivapi can be pointed at it through XIVAPI_URL.
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.common import make_item, make_recipe
+from benchmarks.universalisStandIn import select_fields
+
+RESULTS_PER_PAGE = 100
+CLASSJOB_COUNT = 40
+UNREAD_ITEM_COLUMNS: Dict[str, Any] = {
+    "Description": "An item description of about the usual length. " * 3,
+    "Icon": "/i/020000/020001.png",
+    "IconHD": "/i/020000/020001_hr1.png",
+    "ItemUICategory": {"ID": 44, "Name": "Ingredient", "Icon": "/i/060000/060455.png"},
+    "PriceLow": 5,
+    "PriceMid": 50,
+    "StackSize": 999,
+    "GamePatch": {"ID": 1, "Name": "A Realm Reborn", "ReleaseDate": 1377993600},
+}
+UNREAD_CLASSJOB_COLUMNS: Dict[str, Any] = {
+    "NameEnglish": "class",
+    "ClassJobParent": {"ID": 1, "Name": "parent class"},
+    "ItemSoulCrystal": UNREAD_ITEM_COLUMNS,
+    "ItemStartingWeapon": UNREAD_ITEM_COLUMNS,
+    "Modifiers": {f"Modifier{index}": index for index in range(40)},
+    "GameContentLinks": {
+        "ClassJobCategory": {f"ClassJob{index}": [index] for index in range(40)}
+    },
+    "GamePatch": {"ID": 1, "Name": "A Realm Reborn", "ReleaseDate": 1377993600},
+}
+UNREAD_RECIPE_COLUMNS: Dict[str, Any] = {
+    "Icon": "/i/020000/020001.png",
+    "IsExpert": 0,
+    "IsSpecializationRequired": 0,
+    "QuickSynthCraftsmanship": 0,
+    "RequiredControl": 0,
+    "RequiredCraftsmanship": 0,
+    "GameContentLinks": {"RecipeLookup": {"CRP": [1]}},
+    "GamePatch": {"ID": 1, "Name": "A Realm Reborn", "ReleaseDate": 1377993600},
+    "Url": "/Recipe/1",
+}
+
+
+def make_page(
+    result_list: List[Dict[str, Any]], page: int, results_per_page: int
+) -> Dict[str, Any]:
+    page_total = max((len(result_list) + results_per_page - 1) // results_per_page, 1)
+    page_result_list = result_list[
+        (page - 1) * results_per_page : page * results_per_page
+    ]
+    return {
+        "Pagination": {
+            "Page": page,
+            "PageNext": page + 1 if page < page_total else None,
+            "PagePrev": page - 1 if page > 1 else None,
+            "PageTotal": page_total,
+            "Results": len(page_result_list),
+            "ResultsPerPage": results_per_page,
+            "ResultsTotal": len(result_list),
+        },
+        "Results": page_result_list,
+    }
+
+
+def make_result(content_name: str, id: int, name: str) -> Dict[str, Any]:
+    return {
+        "ID": id,
+        "Name": name,
+        "Url": f"/{content_name}/{id}",
+        "UrlType": content_name,
+    }
+
+
+def make_classjob(classjob_id: int) -> Dict[str, Any]:
+    is_doh = 8 <= classjob_id <= 15
+    return {
+        "ID": classjob_id,
+        "Icon": f"/cj/1/{classjob_id}.png",
+        "Name": f"class {classjob_id}",
+        "Url": f"/ClassJob/{classjob_id}",
+        "Abbreviation": f"C{classjob_id:02}",
+        "ClassJobCategory": {
+            "Name": "Disciple of the Hand" if is_doh else "Disciple of War"
+        },
+    }
+
+
+class XivapiStandIn(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        port: int = 0,
+        latency_s: float = 0.0,
+        recipe_count: int = 5000,
+        classjob_count: int = 1,
+        intermediate_count: int = 0,
+    ) -> None:
+        super().__init__(("127.0.0.1", port), XivapiStandInHandler)
+        self.latency_s = latency_s
+        self.recipe_count = recipe_count
+        # Recipes cycle through this many crafting classes from ID 8 on, one level
+        # per recipe ID and the next class every 90 recipes
+        self.classjob_count = classjob_count
+        # Recipes up to this ID are intermediates, used with their recipe nested by
+        # the first two ingredients of every recipe after them
+        self.intermediate_count = intermediate_count
+        self.request_count = 0
+        self.request_count_mutex = threading.Lock()
+        self.request_path_list: List[str] = []
+        self.bytes_sent = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def get_recipe(self, recipe_id: int) -> Dict[str, Any]:
+        if not 1 <= recipe_id <= self.recipe_count:
+            raise KeyError(recipe_id)
+        recipe = make_recipe(
+            recipe_id,
+            recipe_id + 10000,
+            [
+                (recipe_id * 7 + index * 13) % 5000 + 1
+                for index in range(1 + recipe_id % 6)
+            ],
+        )
+        recipe["ClassJob"] = make_classjob(self.get_classjob_id(recipe_id))
+        # Some of the columns a full document carries that the app does not read
+        recipe.update(UNREAD_RECIPE_COLUMNS)
+        for name, value in list(recipe.items()):
+            if name.startswith("Item") and isinstance(value, dict):
+                value.update(UNREAD_ITEM_COLUMNS)
+        if recipe_id > self.intermediate_count > 0:
+            for ingredient_index in range(2):
+                intermediate_id = (
+                    recipe_id * 31 + ingredient_index * 17
+                ) % self.intermediate_count + 1
+                intermediate = self.get_recipe(intermediate_id)
+                recipe[f"ItemIngredient{ingredient_index}"] = intermediate["ItemResult"]
+                recipe[f"ItemIngredientRecipe{ingredient_index}"] = [intermediate]
+        return recipe
+
+    def get_classjob_id(self, recipe_id: int) -> int:
+        return 8 + (recipe_id // 90) % self.classjob_count
+
+    # Search results match every recipe, or the recipes of one level as filtered by
+    # yield_recipes, or those with the search string in their name
+    def search(self, query: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+        search_string = query.get("string", [""])[0].lower()
+        recipe_id_list = range(1, self.recipe_count + 1)
+        for search_filter in query.get("filters", [""])[0].split(","):
+            name, _, value = search_filter.partition("=")
+            if name == "RecipeLevelTable.ClassJobLevel":
+                recipe_id_list = [
+                    recipe_id
+                    for recipe_id in recipe_id_list
+                    if recipe_id % 90 + 1 == int(value)
+                ]
+            elif name == "ClassJob.ID":
+                recipe_id_list = [
+                    recipe_id
+                    for recipe_id in recipe_id_list
+                    if self.get_classjob_id(recipe_id) == int(value)
+                ]
+        return [
+            make_result("Recipe", recipe_id, f"Item {recipe_id + 10000}")
+            for recipe_id in recipe_id_list
+            if search_string in f"item {recipe_id + 10000}"
+        ]
+
+    def get_document(self, content_name: str, id: int) -> Dict[str, Any]:
+        if content_name == "Recipe":
+            return self.get_recipe(id)
+        if content_name == "Item" and 1 <= id <= self.recipe_count + 10000:
+            return dict(make_item(id), **UNREAD_ITEM_COLUMNS)
+        if content_name == "ClassJob" and 1 <= id <= CLASSJOB_COUNT:
+            return dict(make_classjob(id), **UNREAD_CLASSJOB_COLUMNS)
+        raise KeyError(content_name)
+
+    def get_id_range(self, content_name: str) -> range:
+        if content_name == "Recipe":
+            return range(1, self.recipe_count + 1)
+        if content_name == "Item":
+            return range(1, self.recipe_count + 10001)
+        if content_name == "ClassJob":
+            return range(1, CLASSJOB_COUNT + 1)
+        raise KeyError(content_name)
+
+    def get_content(self, path: List[str], query: Dict[str, List[str]]) -> Any:
+        page = int(query.get("page", ["1"])[0])
+        limit = int(query.get("limit", [str(RESULTS_PER_PAGE)])[0])
+        if path == ["search"]:
+            return make_page(self.search(query), page, RESULTS_PER_PAGE)
+        content_name = path[0]
+        if len(path) == 2:
+            return self.get_document(content_name, int(path[1]))
+        id_range = self.get_id_range(content_name)
+        if "ids" in query:
+            id_list = [int(id) for id in query["ids"][0].split(",")]
+            content = make_page(
+                [
+                    self.get_document(content_name, id)
+                    for id in id_list
+                    if id in id_range
+                ],
+                page,
+                limit,
+            )
+        elif "columns" in query:
+            content = make_page(
+                [self.get_document(content_name, id) for id in id_range], page, limit
+            )
+        else:
+            return make_page(
+                [
+                    make_result(content_name, id, f"{content_name} {id}")
+                    for id in id_range
+                ],
+                page,
+                limit,
+            )
+        if "columns" in query:
+            content["Results"] = select_fields(
+                content["Results"],
+                [column.split(".") for column in query["columns"][0].split(",")],
+            )
+        return content
+
+
+class XivapiStandInHandler(BaseHTTPRequestHandler):
+    server: XivapiStandIn
+
+    def do_GET(self) -> None:
+        with self.server.request_count_mutex:
+            self.server.request_count += 1
+            self.server.request_path_list.append(self.path)
+        if self.server.latency_s > 0:
+            time.sleep(self.server.latency_s)
+        url = urlparse(self.path)
+        path = [part for part in url.path.split("/") if part]
+        try:
+            content = self.server.get_content(path, parse_qs(url.query))
+        except (IndexError, ValueError, KeyError):
+            self.send_error(404)
+            return
+        body = json.dumps(content).encode()
+        with self.server.request_count_mutex:
+            self.server.bytes_sent += len(body)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def serve(
+    port: int = 0,
+    latency_s: float = 0.0,
+    recipe_count: int = 5000,
+    classjob_count: int = 1,
+    intermediate_count: int = 0,
+) -> XivapiStandIn:
+    server = XivapiStandIn(
+        port, latency_s, recipe_count, classjob_count, intermediate_count
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -1,5 +1,9 @@
 import sys
 import abc
+import mmap
+import struct
+import zlib
+from concurrent.futures import Future
 from functools import partial, wraps
 from pathlib import Path
 import pickle
@@ -11,6 +15,7 @@ from typing import (
     List,
     MutableMapping,
     Optional,
+    Set,
     Tuple,
     TypeVar,
     Union,
@@ -18,12 +23,236 @@ from typing import (
 import logging
 import time
 import json, atexit
+import numpy as np
 from pydantic import BaseModel
 from pydantic_collections import BaseCollectionModel
 from PySide6.QtCore import QMutex
 
 _logger = logging.getLogger(__name__)
 
+RECORD_HEADER = struct.Struct("<IId")  # key length, value length, update time
+RECORD_COMPRESS_LEVEL = 1  # zlib level of the pickled values
+DELETED_LENGTH = 0xFFFFFFFF  # Value length of a record deleting its key
+
+
+# Persist's cache of key: (value, update time) in one append-only file of records,
+# each a header, the key and the compressed pickled value. Opening reads only the headers and
+# keys into an offset index, values are unpickled when first requested. Saving
+# appends the entries set since the last save, a later record of a key supersedes
+# the earlier ones and the file is rewritten without them once they are most of it.
+class RecordStore(MutableMapping[str, Tuple[Any, float]]):
+    def __init__(self, file_path: Path) -> None:
+        self.file_path = file_path
+        self._mutex = QMutex()
+        # key: value offset, value length, update time of its latest record on disk
+        self._index: Dict[str, Tuple[int, int, float]] = {}
+        self._data: Dict[str, Tuple[Any, float]] = {}  # Entries unpickled or set
+        self._dirty: Set[str] = set()
+        self._deleted: Set[str] = set()  # On disk, deleted since the last save
+        self._mmap: Optional[mmap.mmap] = None
+        self._file_bytes = 0
+        self._live_bytes = 0  # Bytes of the records in _index
+        self.decode_count = 0
+        try:
+            self._open()
+        except (IOError, ValueError):
+            _logger.log(logging.WARN, f"Error loading {self.file_path} cache")
+            self._index = {}
+            self._live_bytes = 0
+
+    @staticmethod
+    def _record_bytes(key: str, value_length: int) -> int:
+        return RECORD_HEADER.size + len(key.encode()) + value_length
+
+    def _map(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self.file_path.exists() and self.file_path.stat().st_size > 0:
+            with self.file_path.open("rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _open(self) -> None:
+        self._map()
+        self._scan(0)
+
+    # Indexes the records from offset to the end of the mapping
+    def _scan(self, offset: int) -> None:
+        if self._mmap is None:
+            return
+        while offset + RECORD_HEADER.size <= len(self._mmap):
+            key_length, value_length, update_time = RECORD_HEADER.unpack_from(
+                self._mmap, offset
+            )
+            key_offset = offset + RECORD_HEADER.size
+            value_offset = key_offset + key_length
+            end_offset = value_offset + (
+                value_length if value_length != DELETED_LENGTH else 0
+            )
+            if end_offset > len(self._mmap):
+                break
+            key = bytes(self._mmap[key_offset:value_offset]).decode()
+            previous = self._index.pop(key, None)
+            if previous is not None:
+                self._live_bytes -= self._record_bytes(key, previous[1])
+            if value_length != DELETED_LENGTH:
+                self._index[key] = (value_offset, value_length, update_time)
+                self._live_bytes += end_offset - offset
+            offset = end_offset
+        # A record cut short by a crash is dropped and overwritten by the next save
+        self._file_bytes = offset
+
+    def _keys(self) -> Set[str]:
+        return self._index.keys() - self._deleted | self._data.keys()
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data or (key in self._index and key not in self._deleted)
+
+    def __getitem__(self, key: str) -> Tuple[Any, float]:
+        entry = self._data.get(key)
+        if entry is not None:
+            return entry
+        self._mutex.lock()
+        try:
+            entry = self._data.get(key)
+            if entry is None:
+                if key not in self._index or key in self._deleted:
+                    raise KeyError(key)
+                assert self._mmap is not None
+                offset, length, update_time = self._index[key]
+                entry = (
+                    pickle.loads(zlib.decompress(self._mmap[offset : offset + length])),
+                    update_time,
+                )
+                self.decode_count += 1
+                self._data[key] = entry
+            return entry
+        finally:
+            self._mutex.unlock()
+
+    def __setitem__(self, key: str, value: Tuple[Any, float]) -> None:
+        self._mutex.lock()
+        self._data[key] = value
+        self._dirty.add(key)
+        self._deleted.discard(key)
+        self._mutex.unlock()
+
+    def set_many(self, entry_dict: Dict[str, Tuple[Any, float]]) -> None:
+        self._mutex.lock()
+        self._data.update(entry_dict)
+        self._dirty.update(entry_dict)
+        self._deleted.difference_update(entry_dict)
+        self._mutex.unlock()
+
+    def __delitem__(self, key: str) -> None:
+        self._mutex.lock()
+        try:
+            if key not in self:
+                raise KeyError(key)
+            self._data.pop(key, None)
+            self._dirty.discard(key)
+            if key in self._index:
+                self._deleted.add(key)
+        finally:
+            self._mutex.unlock()
+
+    def __len__(self) -> int:
+        return len(self._keys())
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys())
+
+    def clear(self) -> None:
+        self._mutex.lock()
+        self._deleted.update(self._index)
+        self._data.clear()
+        self._dirty.clear()
+        self._mutex.unlock()
+
+    @staticmethod
+    def _encode(value: Any) -> bytes:
+        return zlib.compress(
+            pickle.dumps(value, pickle.HIGHEST_PROTOCOL), RECORD_COMPRESS_LEVEL
+        )
+
+    @staticmethod
+    def _record(key: str, value: Optional[bytes], update_time: float) -> bytes:
+        key_bytes = key.encode()
+        return (
+            RECORD_HEADER.pack(
+                len(key_bytes),
+                len(value) if value is not None else DELETED_LENGTH,
+                update_time,
+            )
+            + key_bytes
+            + (value or b"")
+        )
+
+    def save_to_disk(self) -> None:
+        self._mutex.lock()
+        try:
+            if len(self._dirty) == 0 and len(self._deleted) == 0:
+                return
+            record_list = [self._record(key, None, 0.0) for key in self._deleted] + [
+                self._record(
+                    key,
+                    self._encode(self._data[key][0]),
+                    self._data[key][1],
+                )
+                for key in self._dirty
+            ]
+            live_bytes = (
+                self._live_bytes
+                - sum(
+                    self._record_bytes(key, self._index[key][1])
+                    for key in self._dirty | self._deleted
+                    if key in self._index
+                )
+                + sum(len(record) for record in record_list[len(self._deleted) :])
+            )
+            file_bytes = self._file_bytes + sum(len(record) for record in record_list)
+            if file_bytes > 2 * live_bytes:
+                self._rewrite()
+            else:
+                self._append(record_list)
+            self._dirty.clear()
+            self._deleted.clear()
+        finally:
+            self._mutex.unlock()
+
+    def _append(self, record_list: List[bytes]) -> None:
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        with self.file_path.open("r+b" if self.file_path.exists() else "wb") as f:
+            f.seek(self._file_bytes)
+            f.truncate()
+            for record in record_list:
+                f.write(record)
+        self._map()
+        self._scan(self._file_bytes)
+
+    def _rewrite(self) -> None:
+        temp_path = self.file_path.with_suffix(".tmp")
+        with temp_path.open("wb") as f:
+            for key in self._keys():
+                if key in self._dirty:
+                    value = self._encode(self._data[key][0])
+                    update_time = self._data[key][1]
+                else:
+                    assert self._mmap is not None
+                    offset, length, update_time = self._index[key]
+                    value = self._mmap[offset : offset + length]
+                f.write(self._record(key, value, update_time))
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        temp_path.replace(self.file_path)
+        self._index = {}
+        self._live_bytes = 0
+        self._open()
+
 
 class Persist:
     func: Callable
@@ -40,34 +269,37 @@ class Persist:
         self.func = func  # type: ignore
         self.filename = filename
         self.return_type = return_type
+        # Guards cache writes. Misses run func outside it, one call per key at a time
         self.mutex = QMutex() if mutex else None
+        self.single_flight = SingleFlight()
+        self.cache = RecordStore(Path(f".data/{self.filename}"))
+        json_path = Path(f".data/{self.filename}").with_suffix(".json")
+        if (
+            len(self.cache) == 0
+            and json_path.exists()
+            and json_path != self.cache.file_path
+        ):
+            self._migrate_json(json_path)
+
+    # Moves a cache saved as indented JSON by earlier versions into the record store
+    def _migrate_json(self, json_path: Path) -> None:
         try:
-            self.cache: Dict[Any, Tuple[BaseModel, float]] = {
-                param: (
-                    return_type.parse_raw(value[0]),
-                    value[1],
-                )
-                for param, value in json.load(
-                    open(f".data/{self.filename}", "r")
-                ).items()
-            }
+            self.cache.set_many(
+                {
+                    param: (self.return_type.parse_raw(value[0]), value[1])
+                    for param, value in json.load(json_path.open("r")).items()
+                }
+            )
         except (IOError, ValueError):
-            _logger.log(logging.WARN, f"Error loading {self.filename} cache")
-            self.cache = {}
+            _logger.log(logging.WARN, f"Error loading {json_path} cache")
+            return
+        self.save_to_disk()
+        json_path.replace(json_path.with_suffix(".json.migrated"))
+        _logger.info(f"Migrated {len(self.cache)} entries from {json_path}")
 
     def save_to_disk(self) -> None:
         try:
-            new_cache: Dict[Any, Tuple[str, float]] = {
-                param: (
-                    value[0].json()
-                    if isinstance(value[0], BaseModel)
-                    or isinstance(value[0], BaseCollectionModel)
-                    else self.return_type.parse_obj(value[0]).json(),
-                    value[1],
-                )
-                for param, value in self.cache.items()
-            }
-            json.dump(new_cache, open(f".data/{self.filename}", "w"), indent=2)
+            self.cache.save_to_disk()
         except Exception as e:
             print(str(e))
 
@@ -82,36 +314,100 @@ class Persist:
         for kwarg_value in kwargs.values():
             _args.append(kwarg_value)
 
+        key = str(_args) if len(_args) > 0 else "null"
+        value = self._get_fresh(key, _cache_timeout_s)
+        if value is not None:
+            return value[0]
+        return self.single_flight(key, self._load, key, _args, _cache_timeout_s)
+
+    def _get_fresh(
+        self, key: str, cache_timeout_s: Optional[float]
+    ) -> Optional[Tuple[Any, float]]:
+        value = self.cache.get(key)
+        if value is None:
+            return None
+        _logger.log(
+            logging.DEBUG,
+            f"Age of {self.filename}->{key} Cache: {time.time() - value[1]}s",
+        )
+        if cache_timeout_s is not None and time.time() - value[1] > cache_timeout_s:
+            return None
+        return value
+
+    # Runs func for a miss, once for all the callers missing on key at the same time
+    def _load(
+        self, key: str, _args: List[Any], cache_timeout_s: Optional[float]
+    ) -> Any:
+        # A call finishing just before this one was claimed may have filled it
+        value = self._get_fresh(key, cache_timeout_s)
+        if value is not None:
+            return value[0]
+        value = (self.func(*_args), time.time())
         if self.mutex is not None:
             self.mutex.lock()
-        if len(_args) == 0:
-            if len(self.cache) > 0:
-                _logger.log(
-                    logging.DEBUG,
-                    f"Age of {self.filename} Cache: {time.time() - self.cache['null'][1]}s",
-                )
-            if len(self.cache) == 0 or (
-                _cache_timeout_s is not None
-                and time.time() - self.cache["null"][1] > _cache_timeout_s
-            ):
-                self.cache["null"] = (self.func(), time.time())
-            _args = "null"
-        else:
-            if str(_args) in self.cache:
-                _logger.log(
-                    logging.DEBUG,
-                    f"Age of {self.filename}->{_args} Cache: {time.time() - self.cache[str(_args)][1]}s",
-                )
-            if str(_args) not in self.cache or (
-                _cache_timeout_s is not None
-                and time.time() - self.cache[str(_args)][1] > _cache_timeout_s
-            ):
-                self.cache[str(_args)] = (self.func(*_args), time.time())
+        self.cache[key] = value
+        if self.mutex is not None:
+            self.mutex.unlock()
+        return value[0]
+
+    # Whether a call with args would be served from the cache
+    def is_cached(self, *args: Any, cache_timeout_s: float = ...) -> bool:
+        _cache_timeout_s = (
+            cache_timeout_s if cache_timeout_s is not ... else self.timeout_s
+        )
+        value = self.cache.get(str(list(args)) if len(args) > 0 else "null")
+        return value is not None and (
+            _cache_timeout_s is None or time.time() - value[1] <= _cache_timeout_s
+        )
 
-        data = self.cache[str(_args)][0]
+    # Caches a value fetched some other way, as if func had returned it for args
+    def put(self, value: Any, *args: Any) -> None:
+        if self.mutex is not None:
+            self.mutex.lock()
+        self.cache[str(list(args)) if len(args) > 0 else "null"] = (value, time.time())
         if self.mutex is not None:
             self.mutex.unlock()
-        return data
+
+
+# Concurrent callers for the same key share one in-flight call
+class SingleFlight:
+    def __init__(self) -> None:
+        self._futures: Dict[Any, Future] = {}
+        self._mutex = QMutex()
+
+    # Returns the future for key and whether the caller owns the call
+    def claim(self, key: Any) -> Tuple[Future, bool]:
+        self._mutex.lock()
+        future = self._futures.get(key)
+        owner = future is None
+        if owner:
+            future = Future()
+            self._futures[key] = future
+        self._mutex.unlock()
+        return future, owner
+
+    def resolve(
+        self, key: Any, result: Any = None, exception: Optional[BaseException] = None
+    ) -> None:
+        self._mutex.lock()
+        future = self._futures.pop(key)
+        self._mutex.unlock()
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+    def __call__(self, key: Any, func: Callable, *args: Any) -> Any:
+        future, owner = self.claim(key)
+        if not owner:
+            return future.result()
+        try:
+            result = func(*args)
+        except BaseException as e:
+            self.resolve(key, exception=e)
+            raise e
+        self.resolve(key, result)
+        return result
 
 
 T = TypeVar("T")
@@ -134,6 +430,9 @@ VT = TypeVar("VT")
 
 
 # https://stackoverflow.com/a/64323140/7552308
+# The file is loaded on first access rather than when the mapping is created, so
+# module level mappings cost nothing at import and load in whichever thread first
+# needs them
 class PersistMapping(MutableMapping[KT, VT]):
     # Cannot get type argument at runtime https://stackoverflow.com/questions/57706180/generict-base-class-how-to-get-type-of-t-from-within-instance
     def __init__(
@@ -142,18 +441,37 @@ class PersistMapping(MutableMapping[KT, VT]):
         default: Optional[Dict[KT, VT]] = None,
         **kwargs,
     ) -> None:
-        self.data = default if default is not None else {}
+        self._data: Optional[Dict[KT, VT]] = None
+        self._default = default if default is not None else {}
+        self._load_mutex = QMutex()
+        self.file_path = Path(f".data/{filename}")
         if kwargs:
             self.update(kwargs)
-        self.file_path = Path(f".data/{filename}")
+
+    @property
+    def data(self) -> Dict[KT, VT]:
+        data = self._data
+        if data is None:
+            self._load_mutex.lock()
+            try:
+                if self._data is None:
+                    self._data = self._load()
+                data = self._data
+            finally:
+                self._load_mutex.unlock()
+        return data
+
+    def _load(self) -> Dict[KT, VT]:
+        data = self._default
         if self.file_path.exists():
             try:
                 with self.file_path.open("rb") as f:
-                    self.data.update(pickle.load(f))
+                    data.update(pickle.load(f))
             except (IOError, ValueError):
                 _logger.log(logging.WARN, f"Error loading {self.file_path} cache")
         else:
             _logger.info(f"Created new {self.file_path} cache")
+        return data
 
     def __contains__(self, key: KT) -> bool:
         return key in self.data
@@ -190,8 +508,10 @@ class PersistMapping(MutableMapping[KT, VT]):
             self.data[key] = value
 
     def save_to_disk(self) -> None:
+        if self._data is None:  # Never loaded, so unchanged
+            return
         with self.file_path.open("wb") as f:
-            pickle.dump(self.data, f)
+            pickle.dump(self._data, f)
 
 
 # class PersistTimeoutMapping(MutableMapping[KT, VT]):
@@ -352,11 +672,29 @@ def get_size(obj, seen=None):
     # Important mark as seen *before* entering recursion to gracefully handle
     # self-referential objects
     seen.add(obj_id)
-    if isinstance(obj, dict):
+    if isinstance(obj, np.ndarray):
+        # getsizeof counts the buffer of arrays that own their data, but not of views
+        if obj.base is not None:
+            size += obj.nbytes
+        if obj.dtype == object:
+            size += sum([get_size(i, seen) for i in obj.flat])
+    elif isinstance(obj, dict):
         size += sum([get_size(v, seen) for v in obj.values()])
         size += sum([get_size(k, seen) for k in obj.keys()])
-    elif hasattr(obj, '__dict__'):
+    elif hasattr(obj, "__dict__"):
         size += get_size(obj.__dict__, seen)
-    elif hasattr(obj, '__iter__') and not isinstance(obj, (str, bytes, bytearray)):
+    elif slots := _get_slots(obj):
+        # __slots__ classes keep their attributes outside __dict__
+        size += sum([get_size(getattr(obj, slot), seen) for slot in slots])
+    elif hasattr(obj, "__iter__") and not isinstance(obj, (str, bytes, bytearray)):
         size += sum([get_size(i, seen) for i in obj])
-    return size
\ No newline at end of file
+    return size
+
+
+def _get_slots(obj) -> List[str]:
+    return [
+        slot
+        for cls in type(obj).__mro__
+        for slot in getattr(cls, "__slots__", ())
+        if slot not in ("__dict__", "__weakref__") and hasattr(obj, slot)
+    ]
@@ -1,6 +1,6 @@
 import logging
 import time
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 from copy import copy
 from PySide6.QtCore import (
     Slot,
@@ -13,11 +13,21 @@ from PySide6.QtCore import (
     QCoreApplication,
 )
 from classjobConfig import ClassJobConfig
-from ff14marketcalc import get_profit, log_time
+from ff14marketcalc import BuyPolicy, get_profit, get_recipe_item_ids, log_time
+from refreshScheduler import MIN_REFRESH_INTERVAL_S, RefreshScheduler
 from universalis.universalis import (
-    get_listings,
-    is_listing_expired,
+    MULTI_ITEM_CHUNK_SIZE,
+    get_cache_stats,
+    get_data_center,
+    get_delta_sync_stats,
+    get_dc_listings_many,
+    get_price_summaries_many,
+    get_price_summary,
+    get_price_summary_ttl_s,
+    get_price_summary_update_time,
+    is_price_summary_expired,
     seller_id_in_recipe,
+    sync_recently_updated,
 )
 
 from xivapi.models import Recipe, RecipeCollection, Item
@@ -28,6 +38,8 @@ from xivapi.xivapi import (
     yield_recipes,
 )
 
+REFRESH_ITEM_BUDGET = MULTI_ITEM_CHUNK_SIZE * 5  # Items refreshed per round
+
 
 class CraftingWorker(QObject):
     recipe_table_update_signal = Signal(
@@ -53,6 +65,12 @@ class CraftingWorker(QObject):
         self._item_crafting_value_table: Dict[int, float] = {}
         self._item_crafting_value_table_mutex = QMutex()
         self._recipe_sent_to_table: List[int] = []
+        self.refresh_scheduler = RefreshScheduler()
+        self._item_recipe_dict: Dict[int, List[Recipe]] = {}  # item id -> recipes
+        self._changed_item_id_set: Set[int] = set()
+        self.buy_policy = (
+            BuyPolicy.DATA_CENTER if get_data_center() is not None else BuyPolicy.WORLD
+        )
         super().__init__(parent)
 
     def get_item_crafting_value_table(self) -> Dict[int, float]:
@@ -78,26 +96,77 @@ class CraftingWorker(QObject):
                 recipes_to_remove.append(recipe)
         for recipe in recipes_to_remove:
             self.recipe_list.remove(recipe)
+            self.refresh_scheduler.remove(recipe.ID)
+        self.refresh_scheduler.reprioritise()
 
-    def emit_seller_id_in_recipe(self, recipe: Recipe) -> None:
-        for seller_listing in seller_id_in_recipe(recipe, self.world_id):
+    def emit_seller_id_in_recipe(self, recipe: Recipe) -> bool:
+        seller_listings_list = seller_id_in_recipe(recipe, self.world_id)
+        for seller_listing in seller_listings_list:
             print(
                 f"Found seller ID in recipe {recipe.ItemResult.Name}: Item: {get_item(seller_listing.itemID).Name}"
             )
             self.seller_listings_matched_signal.emit(seller_listing)
+        return len(seller_listings_list) > 0
+
+    # Oldest fetch time and shortest TTL across the recipe's items
+    def get_recipe_freshness(self, recipe: Recipe) -> Tuple[float, float]:
+        item_ids = get_recipe_item_ids(recipe)
+        return (
+            min(
+                get_price_summary_update_time(item_id, self.world_id) or 0.0
+                for item_id in item_ids
+            ),
+            min(
+                get_price_summary_ttl_s(item_id, self.world_id) for item_id in item_ids
+            ),
+        )
 
     # Update the recipe table with the given recipe
     def update_table_recipe(self, recipe: Recipe) -> None:
         # print("Updating table recipes")
-        self.emit_seller_id_in_recipe(recipe)
         # print(f"Getting profit for {recipe.ItemResult.Name}")
-        profit = get_profit(recipe, self.world_id)
+        profit = get_profit(recipe, self.world_id, buy_policy=self.buy_policy)
+        # Price summaries hold no sellers, the seller index has the items fetched
+        # in full: the retainers' items and the items the user opened
+        retainer_listed = self.emit_seller_id_in_recipe(recipe)
         # print(f"Getting velocity for {recipe.ItemResult.Name}")
-        listings = get_listings(
-            recipe.ItemResult.ID, self.world_id
+        price_summary = get_price_summary(recipe.ItemResult.ID, self.world_id)
+        self.refresh_scheduler.update(
+            recipe.ID,
+            profit,
+            price_summary.sale_velocity,
+            retainer_listed,
+            *self.get_recipe_freshness(recipe),
         )
         if profit > 0 or not self.auto_refresh_listings:
-            self.recipe_table_update_signal.emit(recipe, profit, listings.regularSaleVelocity, len(listings.listings))
+            self.recipe_table_update_signal.emit(
+                recipe,
+                profit,
+                price_summary.sale_velocity,
+                price_summary.listing_count,
+            )
+
+    # Listings of an item changed through the live market feed
+    @Slot(int)
+    def on_item_changed(self, item_id: int) -> None:
+        self._changed_item_id_set.add(item_id)
+
+    # Recompute the shown recipes that use items changed by the live market feed
+    def update_changed_recipes(self) -> None:
+        changed_item_id_set = self._changed_item_id_set
+        self._changed_item_id_set = set()
+        recipe_dict: Dict[int, Recipe] = {}
+        for item_id in changed_item_id_set:
+            for recipe in self._item_recipe_dict.get(item_id, []):
+                if (
+                    recipe.ID in self.refresh_scheduler
+                    and recipe.ItemResult.ID in self._recipe_sent_to_table
+                ):
+                    recipe_dict[recipe.ID] = recipe
+        for recipe in recipe_dict.values():
+            if self.abort or not self.auto_refresh_listings:
+                return
+            self.update_table_recipe(recipe)
 
     # Search for recipes given by the user
     @Slot(str)
@@ -106,6 +175,7 @@ class CraftingWorker(QObject):
         self._recipe_sent_to_table.clear()
         recipe_list = search_recipes(search_string)
         print(f"Found {len(recipe_list)} recipes")
+        self.refresh_scheduler.set_focus({recipe.ID for recipe in recipe_list})
         # if len(recipe_list) > 0:
         # self.refresh_listings(recipes, True)
         recipe: Recipe
@@ -144,13 +214,13 @@ class CraftingWorker(QObject):
         time_s = time.time()
 
         def _is_recipe_expired(recipe: Recipe, time_s: float) -> bool:
-            if is_listing_expired(recipe.ItemResult.ID, self.world_id, time_s):
+            if is_price_summary_expired(recipe.ItemResult.ID, self.world_id, time_s):
                 # print(f"Recipe Result {recipe.ItemResult.Name} is expired")
                 return True
             for ingredient_index in range(9):
                 item: Item = getattr(recipe, f"ItemIngredient{ingredient_index}")
                 if item:
-                    if is_listing_expired(item.ID, self.world_id, time_s):
+                    if is_price_summary_expired(item.ID, self.world_id, time_s):
                         return True
                     item_recipe_list: Optional[Tuple[Recipe, ...]] = getattr(
                         recipe, f"ItemIngredientRecipe{ingredient_index}"
@@ -163,15 +233,76 @@ class CraftingWorker(QObject):
 
         return _is_recipe_expired(recipe, time_s)
 
-    # Refresh the listings for the current recipe list
+    # Ids of the items changed upstream since their price summaries were fetched,
+    # from the world's and when buying across it the data center's most recently
+    # updated lists
+    def sync_recently_updated(self) -> Set[int]:
+        time_s = time.time()
+        dirty_item_id_set = {
+            item_id
+            for item_id in sync_recently_updated(self.world_id)
+            if is_price_summary_expired(item_id, self.world_id, time_s)
+        }
+        if self.buy_policy == BuyPolicy.DATA_CENTER:
+            dirty_item_id_set.update(sync_recently_updated(get_data_center()))
+        return dirty_item_id_set
+
+    # Refresh the listings for the given recipes, or for the current recipe list in
+    # refresh scheduler order
     @Slot(list)
     def refresh_listings(
         self, recipe_list: List[Recipe] = None, force_refresh: bool = False
     ) -> None:
-        recipe_list = recipe_list if recipe_list else self.recipe_list.copy()
-        # print(f"Refreshing listings for {len(recipe_list)} recipes")
-        num_of_recipes_updated = 0
         t = time.time()
+        self.update_changed_recipes()
+        dirty_item_id_set = self.sync_recently_updated()
+        expired_recipe_id_set: Set[int] = set()
+        expired_item_id_set: Set[int] = set()
+        if recipe_list:
+            for recipe in recipe_list:
+                if force_refresh or self.is_recipe_expired(recipe):
+                    expired_recipe_id_set.add(recipe.ID)
+                    expired_item_id_set.update(get_recipe_item_ids(recipe))
+            cache_timeout_s = 0 if force_refresh else None
+        else:
+            recipe_list = self.recipe_list.copy()
+            for recipe in self.refresh_scheduler.pop_due(REFRESH_ITEM_BUDGET):
+                expired_recipe_id_set.add(recipe.ID)
+                expired_item_id_set.update(get_recipe_item_ids(recipe))
+            # Recipes using items changed upstream, whatever their due time. Their
+            # other items are only fetched if the delta sync does not cover them.
+            for item_id in dirty_item_id_set:
+                for recipe in self._item_recipe_dict.get(item_id, []):
+                    if recipe.ID in self.refresh_scheduler:
+                        expired_recipe_id_set.add(recipe.ID)
+                        expired_item_id_set.update(
+                            recipe_item_id
+                            for recipe_item_id in get_recipe_item_ids(recipe)
+                            if is_price_summary_expired(recipe_item_id, self.world_id)
+                        )
+            cache_timeout_s = 0 if force_refresh else MIN_REFRESH_INTERVAL_S
+            # Recipes not shown yet need their first listings whatever their priority
+            new_item_id_set: Set[int] = set()
+            for recipe in recipe_list:
+                if recipe.ItemResult.ID not in self._recipe_sent_to_table:
+                    new_item_id_set.update(get_recipe_item_ids(recipe))
+            new_item_id_set -= expired_item_id_set
+            if len(new_item_id_set) > 0:
+                get_price_summaries_many(new_item_id_set, self.world_id)
+        num_of_recipes_updated = len(expired_recipe_id_set)
+        if len(expired_item_id_set) > 0:
+            self.print_status(
+                f"Refreshing marketboard data for {len(expired_item_id_set)} items..."
+            )
+            get_price_summaries_many(
+                expired_item_id_set,
+                self.world_id,
+                cache_timeout_s=cache_timeout_s,
+            )
+            if self.buy_policy == BuyPolicy.DATA_CENTER:
+                get_dc_listings_many(
+                    expired_item_id_set, cache_timeout_s=cache_timeout_s
+                )
         for recipe_index, recipe in enumerate(recipe_list):
             # self.print_status(
             #     f"Refreshing marketboard data {recipe_index+1}/{len(recipe_list)} ({recipe.ItemResult.Name})..."
@@ -183,20 +314,22 @@ class CraftingWorker(QObject):
                 print("Not auto refreshing listings")
                 return
             # t = time.time()
-            if recipe.ItemResult.ID not in self._recipe_sent_to_table or (
-                self.is_recipe_expired(recipe) or force_refresh
+            if (
+                recipe.ItemResult.ID not in self._recipe_sent_to_table
+                or recipe.ID in expired_recipe_id_set
             ):
                 self._recipe_sent_to_table.append(recipe.ItemResult.ID)
                 self.update_table_recipe(recipe)
                 self.update_item_crafting_values(recipe)
-                if self.is_recipe_expired(recipe):
-                    num_of_recipes_updated += 1
             # log_time(
             #     f"Refreshing marketboard data {recipe_index+1}/{len(recipe_list)} ({recipe.ItemResult.Name})",
             #     t,
             # )
         if num_of_recipes_updated > 0:
             log_time(f"Refreshing {num_of_recipes_updated} listings", t)
+            print(self.refresh_scheduler.stats())
+            print(get_cache_stats())
+            print(get_delta_sync_stats(self.world_id))
 
     def update_item_crafting_values(self, recipe: Recipe) -> None:
         def update_crafting_value_table(
@@ -264,6 +397,13 @@ class CraftingWorker(QObject):
                             return
                         # print("interrupts processed")
                         self.recipe_list.append(recipe)
+                        self.refresh_scheduler.add(
+                            recipe, *self.get_recipe_freshness(recipe)
+                        )
+                        for item_id in get_recipe_item_ids(recipe):
+                            self._item_recipe_dict.setdefault(item_id, []).append(
+                                recipe
+                            )
                         QCoreApplication.processEvents()
                         if self.abort:
                             print("Stopping crafting worker")
@@ -287,6 +427,9 @@ class CraftingWorker(QObject):
                 while sleep_ctr > 0:
                     QThread.sleep(1)
                     sleep_ctr -= 1
+                    QCoreApplication.processEvents()
+                    if self.auto_refresh_listings:
+                        self.update_changed_recipes()
                     if any(
                         current_level > 0
                         for current_level in self.classjob_level_current_dict.values()
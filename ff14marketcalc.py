@@ -2,7 +2,18 @@ from datetime import timedelta
 import enum
 import logging
 import time
-from typing import Callable, Any, Dict, Iterable, Mapping, Optional, Tuple, List, Union
+from typing import (
+    Callable,
+    Any,
+    Dict,
+    Iterable,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+    List,
+    Union,
+)
 
 from pydantic import BaseModel
 from universalis.models import Listings
@@ -13,7 +24,12 @@ from xivapi.xivapi import (
     get_recipes_up_to_level,
     search_recipes,
 )
-from universalis.universalis import get_listings
+from universalis.universalis import (
+    get_dc_best_sell,
+    get_dc_cheapest,
+    get_listings,
+    get_price_summary,
+)
 from universalis.universalis import save_to_disk as universalis_save_to_disk
 
 _logger = logging.getLogger(__name__)
@@ -28,16 +44,26 @@ class AquireAction(enum.Enum):
     GATHER = enum.auto()
 
 
+# Where ingredients may be bought
+class BuyPolicy(enum.Enum):
+    WORLD = enum.auto()
+    DATA_CENTER = enum.auto()  # Cheapest world of universalis.data_center
+
+
 class Action(BaseModel):
     item: Item
     recipe: Optional[Recipe] = None
     aquire_action: AquireAction
     cost: int
     quantity: int
+    world_id: Optional[int] = None  # World to buy in, if not the given world
 
 
 def get_actions(
-    recipe: Recipe, world: Union[str, int], refresh_cache: bool = False
+    recipe: Recipe,
+    world: Union[str, int],
+    refresh_cache: bool = False,
+    buy_policy: BuyPolicy = BuyPolicy.WORLD,
 ) -> List[Action]:
     action_list: List[Action] = []
     for ingredient_index in range(9):
@@ -55,7 +81,7 @@ def get_actions(
                         [
                             action.cost * action.quantity
                             for action in get_actions(
-                                ingredient_recipe, world, refresh_cache
+                                ingredient_recipe, world, refresh_cache, buy_policy
                             )
                         ]
                     )
@@ -67,9 +93,18 @@ def get_actions(
                     f"Ingredient for {recipe.ItemResult.Name}, {item.Name} to make costs {quantity} x {cost_to_make}: {quantity * cost_to_make}",
                 )
             # Assumes infinite availablity of this item at minPrice
-            cost_to_buy = get_listings(
-                item.ID, world, cache_timeout_s=60 if refresh_cache else None
-            ).minPrice
+            buy_world_id = None
+            dc_cheapest = (
+                get_dc_cheapest(item.ID, cache_timeout_s=60 if refresh_cache else None)
+                if buy_policy == BuyPolicy.DATA_CENTER
+                else None
+            )
+            if dc_cheapest is not None:
+                buy_world_id, cost_to_buy = dc_cheapest
+            else:
+                cost_to_buy = get_price_summary(
+                    item.ID, world, cache_timeout_s=60 if refresh_cache else None
+                ).min_price
             # cost_to_buy = get_listings(item.ID, world).minPrice
             _logger.log(
                 logging.DEBUG,
@@ -112,6 +147,7 @@ def get_actions(
                             aquire_action=AquireAction.BUY,
                             cost=cost_to_buy,
                             quantity=quantity,
+                            world_id=buy_world_id,
                         )
                     )
                 else:
@@ -131,6 +167,7 @@ def get_actions(
                             aquire_action=AquireAction.BUY,
                             cost=cost_to_buy,
                             quantity=quantity,
+                            world_id=buy_world_id,
                         )
                     )
                 else:
@@ -161,7 +198,10 @@ def get_actions(
 
 
 def get_profit(
-    recipe: Recipe, world: Union[str, int], refresh_cache: bool = False
+    recipe: Recipe,
+    world: Union[str, int],
+    refresh_cache: bool = False,
+    buy_policy: BuyPolicy = BuyPolicy.WORLD,
 ) -> float:
     revenue = get_revenue(recipe.ItemResult.ID, world, refresh_cache)
     _logger.log(logging.DEBUG, f"Revenue for {recipe.ItemResult.Name} is {revenue}")
@@ -170,19 +210,23 @@ def get_profit(
     return revenue - sum(
         [
             action.cost * action.quantity
-            for action in get_actions(recipe, world, refresh_cache=refresh_cache)
+            for action in get_actions(
+                recipe, world, refresh_cache=refresh_cache, buy_policy=buy_policy
+            )
         ]
     )
 
 
-def get_actions_dict(recipe, world, refresh_cache: bool = False):
+def get_actions_dict(
+    recipe, world, refresh_cache: bool = False, buy_policy: BuyPolicy = BuyPolicy.WORLD
+):
     def aquire_actions(
         recipe: Recipe,
         quantity: int,
         actions_dict: Dict[int, List[List[Action]]],
         actions_level: int,
     ) -> Dict[int, List[List[Action]]]:
-        actions = get_actions(recipe, world, refresh_cache)
+        actions = get_actions(recipe, world, refresh_cache, buy_policy)
         for action in actions:
             action.quantity *= quantity
         actions_dict.setdefault(actions_level, []).append(actions)
@@ -198,40 +242,68 @@ def get_actions_dict(recipe, world, refresh_cache: bool = False):
     return actions_dict
 
 
+def get_recipe_item_ids(recipe: Recipe) -> Set[int]:
+    item_ids = {recipe.ItemResult.ID}
+    for ingredient_index in range(9):
+        item: Item = getattr(recipe, f"ItemIngredient{ingredient_index}")
+        if item:
+            item_ids.add(item.ID)
+            ingredient_recipes = getattr(
+                recipe, f"ItemIngredientRecipe{ingredient_index}"
+            )
+            if ingredient_recipes:
+                for ingredient_recipe in ingredient_recipes:
+                    item_ids.update(get_recipe_item_ids(ingredient_recipe))
+    return item_ids
+
+
 def get_revenue(id: int, world, refresh_cache: bool = False) -> float:
-    listings = get_listings(id, world, cache_timeout_s=60 if refresh_cache else None)
-    history_price = [listing.pricePerUnit for listing in listings.recentHistory]
+    price_summary = get_price_summary(
+        id, world, cache_timeout_s=60 if refresh_cache else None
+    )
     # history_price_avg = sum(history_price) / len(history_price)
     return (
-        min(min(history_price), listings.minPrice)
-        if len(history_price) > 0
-        else listings.minPrice
+        min(price_summary.min_sale_price, price_summary.min_price)
+        if price_summary.min_sale_price > 0
+        else price_summary.min_price
     ) * 0.95
 
 
-def print_recipe(recipe: Recipe, world: Union[str, int]) -> str:
+def print_recipe(
+    recipe: Recipe, world: Union[str, int], buy_policy: BuyPolicy = BuyPolicy.WORLD
+) -> str:
+    # The full listings of the opened recipe also refresh its price summary
+    listings = get_listings(id=recipe.ItemResult.ID, world=world, cache_timeout_s=60)
     string = ""
     string += f"{recipe.ItemResult.Name} sells for: {get_revenue(recipe.ItemResult.ID, world, True):,.0f} (inc. gst)\n"
-    string += f"Expected profit: {get_profit(recipe, world, True):,.0f}\n"
+    if buy_policy == BuyPolicy.DATA_CENTER:
+        best_sell = get_dc_best_sell(recipe.ItemResult.ID, cache_timeout_s=60)
+        if best_sell is not None:
+            string += f"Best world to sell: {best_sell[0]} for {best_sell[1]:,.0f} (inc. gst)\n"
+    string += f"Expected profit: {get_profit(recipe, world, True, buy_policy):,.0f}\n"
 
-    listings = get_listings(id=recipe.ItemResult.ID, world=world, cache_timeout_s=60)
     string += f"Quantity for sale: {len(listings.listings)}\n"
 
-    history_price = [listing.pricePerUnit for listing in listings.recentHistory]
+    history_price = listings.recentHistory.price_per_unit
     if len(history_price) > 0:
-        string += f"Average history: {sum(history_price)/len(history_price):,.0f}\n"
-        string += f"Min history: {min(history_price):,.0f}\n"
+        string += f"Average history: {history_price.mean():,.0f}\n"
+        string += f"Min history: {history_price.min():,.0f}\n"
     else:
         string += "No price history\n"
 
     actions_level = 0
 
-    actions_dict = get_actions_dict(recipe, world, refresh_cache=True)
+    actions_dict = get_actions_dict(
+        recipe, world, refresh_cache=True, buy_policy=buy_policy
+    )
     for actions_level, action_list in actions_dict.items():
         string += f"Level {actions_level}:\n"
         for actions in action_list:
             for action in actions:
-                string += f"  {action.aquire_action.name} {action.item.Name} {action.quantity} x {action.cost}\n"
+                string += f"  {action.aquire_action.name} {action.item.Name} {action.quantity} x {action.cost}"
+                if action.world_id is not None:
+                    string += f" on world {action.world_id}"
+                string += "\n"
     return string
 
 
@@ -5,9 +5,7 @@ import requests
 from operator import mod
 from pathlib import Path
 from pydantic import BaseModel
-from scipy import stats
 from typing import Any, Dict, List, Optional, Set, Tuple, Union
-import pandas as pd
 import numpy as np
 import pyperclip
 from PySide6.QtCore import (
@@ -50,17 +48,6 @@ from PySide6.QtWidgets import (
     QWidgetAction,
     QSpinBox,
 )
-from pyqtgraph import (
-    PlotWidget,
-    DateAxisItem,
-    AxisItem,
-    PlotCurveItem,
-    PlotDataItem,
-    ViewBox,
-    Point,
-    functions,
-    mkPen,
-)
 from QTableWidgetFloatItem import QTableWidgetFloatItem
 from cache import PersistMapping, load_cache, save_cache
 from classjobConfig import ClassJobConfig
@@ -73,7 +60,9 @@ from universalis.models import Listings
 from craftingWorker import CraftingWorker
 from retainerWorker.retainerWorker import RetainerWorker
 from universalis.universalis import (
+    MULTI_ITEM_CHUNK_SIZE,
     get_listings,
+    get_listings_many,
     set_seller_id,
 )
 from universalis.universalis import save_to_disk as universalis_save_to_disk
@@ -84,13 +73,14 @@ from xivapi.models import (
     GatheringPointBase,
     TerritoryType,
 )
+from xivapi.gameData import game_data
 from xivapi.xivapi import (
     get_classjob_doh_list,
-    get_page,
     get_recipe_by_id,
     get_recipes,
     search_recipes,
     get_content,
+    yield_content_pages,
 )
 
 _logger = logging.getLogger(__name__)
@@ -268,40 +258,50 @@ class GathererWorker(QObject):
         # TODO: if self.gathering_items_dict.results_max == self.gathering_items_dict.results_pulled:
         # Consider defaults to 0
         # return
-        page = get_page(
+        if game_data.has_content("GatheringItem"):
+            for gathering_item in game_data.yield_models(
+                "GatheringItem", GatheringItem
+            ):
+                if (
+                    gathering_item.ID not in self.gathering_items_dict.gathering_items
+                    and self.is_gatherable(gathering_item)
+                ):
+                    self.gathering_items_dict.gathering_items[
+                        gathering_item.ID
+                    ] = gathering_item
+                    yield gathering_item
+            return
+        # Pages after the one in progress are fetched concurrently
+        for page in yield_content_pages(
             "GatheringItem", self.gathering_items_dict.results_pulled // 100 + 1
-        )
-        self.gathering_items_dict.results_max = page.Pagination.ResultsTotal
-        for index in range(
-            self.gathering_items_dict.results_pulled,
-            self.gathering_items_dict.results_max,
         ):
-            self.print_status(
-                f"Getting gathering item {index+1}/{self.gathering_items_dict.results_max}..."
-            )
-            if not index % 100:
-                print(f"getting page {index//100+1}")
-                page = get_page("GatheringItem", index // 100 + 1)
-                self.gathering_items_dict.results_max = page.Pagination.ResultsTotal
-            # print(
-            #     f"Getting item {index % 100} from page {self.gathering_items_dict.results_pulled // 100 + 1}"
-            # )
-            gathering_item: GatheringItem = get_content(
-                page.Results[index % 100].Url, GatheringItem
-            )
-            self.gathering_items_dict.results_pulled += 1
-            if gathering_item.Item is None:
-                continue
-            if gathering_item.GameContentLinks.GatheringPointBase is None:
-                print(
-                    f"ERROR: Item {gathering_item.Item.Name} has no GatheringPointBase"
+            print(f"getting page {page.Pagination.Page}")
+            self.gathering_items_dict.results_max = page.Pagination.ResultsTotal
+            for page_result in page.Results[
+                self.gathering_items_dict.results_pulled % 100 :
+            ]:
+                self.print_status(
+                    f"Getting gathering item {self.gathering_items_dict.results_pulled+1}/{self.gathering_items_dict.results_max}..."
                 )
-                print(f"Gathering Item ID: {gathering_item.ID}")
-                continue
-            self.gathering_items_dict.gathering_items[
-                gathering_item.ID
-            ] = gathering_item
-            yield gathering_item
+                gathering_item: GatheringItem = get_content(
+                    page_result.Url, GatheringItem
+                )
+                self.gathering_items_dict.results_pulled += 1
+                if not self.is_gatherable(gathering_item):
+                    continue
+                self.gathering_items_dict.gathering_items[
+                    gathering_item.ID
+                ] = gathering_item
+                yield gathering_item
+
+    def is_gatherable(self, gathering_item: GatheringItem) -> bool:
+        if gathering_item.Item is None:
+            return False
+        if gathering_item.GameContentLinks.GatheringPointBase is None:
+            print(f"ERROR: Item {gathering_item.Item.Name} has no GatheringPointBase")
+            print(f"Gathering Item ID: {gathering_item.ID}")
+            return False
+        return True
 
     def get_gathering_point_base(
         self, gathering_point_base_id: int
@@ -342,8 +342,13 @@ class GathererWorker(QObject):
             gathering_point_base_list.append(
                 self.get_gathering_point_base(gathering_point_base_id)
             )
-        profit = listings.minPrice * 0.95
-        velocity = listings.regularSaleVelocity
+        median_price = listings.sale_stats.median()
+        profit = (
+            min(listings.minPrice, median_price)
+            if median_price is not None
+            else listings.minPrice
+        ) * 0.95
+        velocity = listings.sale_stats.velocity()
         self.item_table_update_signal.emit(
             gathering_item, gathering_point_base_list, profit, velocity
         )
@@ -442,10 +447,12 @@ class GathererWorker(QObject):
         if update_map and self.selected_territory_id:
             self.update_map(self.selected_territory_id)
 
-    @Slot()
-    def run(self):
-        print("Starting gatherer worker")
-        for gathering_item in self.yield_gathering_item():
+    def update_table(self, gathering_item_list: List[GatheringItem]) -> None:
+        get_listings_many(
+            [gathering_item.Item.ID for gathering_item in gathering_item_list],
+            self.world_id,
+        )
+        for gathering_item in gathering_item_list:
             QCoreApplication.processEvents()
             if self.abort:
                 return
@@ -455,6 +462,20 @@ class GathererWorker(QObject):
                 return
             self.update_table_territory(gathering_item)
 
+    @Slot()
+    def run(self):
+        print("Starting gatherer worker")
+        gathering_item_list: List[GatheringItem] = []
+        for gathering_item in self.yield_gathering_item():
+            QCoreApplication.processEvents()
+            if self.abort:
+                return
+            gathering_item_list.append(gathering_item)
+            if len(gathering_item_list) >= MULTI_ITEM_CHUNK_SIZE:
+                self.update_table(gathering_item_list)
+                gathering_item_list.clear()
+        self.update_table(gathering_item_list)
+
     def stop(self):
         print("Stopping gatherer worker")
         save_cache(self.gathering_items_cache_filename, self.gathering_items_dict)
@@ -57,7 +57,7 @@ class ItemCleanerForm(QDialog):
             listings = get_listings(item_id, self.world_id)
             row_widgets.append(
                 QTableWidgetFloatItem(
-                    f"{listings.minPrice - listings.history['Price'].mean():.1f}"
+                    f"{listings.minPrice - listings.history.price.mean():.1f}"
                 )
             )
             row_widgets.append(QTableWidgetFloatItem(f"{listings.minPrice:.0f}"))
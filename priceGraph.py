@@ -0,0 +1,162 @@
+# Price history graph of the main window. pyqtgraph is slow to import, so ui.py
+# imports this module once the window has been shown.
+import numpy as np
+from PySide6.QtCore import Slot
+from pyqtgraph import (
+    PlotWidget,
+    DateAxisItem,
+    AxisItem,
+    ViewBox,
+    Point,
+    functions,
+    mkPen,
+)
+
+
+class PriceGraph(PlotWidget):
+    class FmtAxesItem(AxisItem):
+        def __init__(
+            self,
+            orientation,
+            pen=None,
+            textPen=None,
+            linkView=None,
+            parent=None,
+            maxTickLength=-5,
+            showValues=True,
+            text="",
+            units="",
+            unitPrefix="",
+            **args,
+        ):
+            super().__init__(
+                orientation,
+                pen,
+                textPen,
+                linkView,
+                parent,
+                maxTickLength,
+                showValues,
+                text,
+                units,
+                unitPrefix,
+                **args,
+            )
+
+        def tickStrings(self, values, scale, spacing):
+            return [f"{v:,.0f}" for v in values]
+
+    def __init__(self, parent=None, background="default", plotItem=None, **kargs):
+        kargs["axisItems"] = {
+            "bottom": DateAxisItem(),
+            "left": PriceGraph.FmtAxesItem(orientation="left"),
+            "right": PriceGraph.FmtAxesItem(orientation="right"),
+        }
+        super().__init__(parent, background, plotItem, **kargs)
+
+        self.p1 = self.plotItem
+        self.p1.getAxis("left").setLabel("Velocity", color="#00ffff")
+        self.p1_pen = mkPen(color="#00ff00", width=2)
+
+        ## create a new ViewBox, link the right axis to its coordinate system
+        self.p2 = ViewBox()
+        self.p1.showAxis("right")
+        self.p1.scene().addItem(self.p2)
+        self.p1.getAxis("right").linkToView(self.p2)
+        self.p2.setXLink(self.p1)
+        self.p1.getAxis("right").setLabel("Purchases", color="#00ff00")
+        # # self.p1.vb.setLogMode("y", True)
+        # self.p2.setLogMode(self.p1.getAxis("right"), True)
+        # self.p1.getAxis("right").setLogMode(False, True)
+        # self.p1.getAxis("right").enableAutoSIPrefix(False)
+
+        ## create third ViewBox.
+        ## this time we need to create a new axis as well.
+        self.p3 = ViewBox()
+        self.ax3 = PriceGraph.FmtAxesItem(orientation="right")
+        self.p1.layout.addItem(self.ax3, 2, 3)
+        self.p1.scene().addItem(self.p3)
+        self.ax3.linkToView(self.p3)
+        self.p3.setXLink(self.p1)
+        self.p3.setYLink(self.p2)
+        self.ax3.setZValue(-10000)
+        self.ax3.setLabel("Listings", color="#ff00ff")
+        self.ax3.hide()
+        self.ax3.setGrid(128)
+        # self.ax3.setLogMode(False, True)
+        # self.p3.setLogMode("y", True)
+        # self.ax3.hideAxis()
+        # self.ax3.setLogMode(False, True)
+        # self.ax3.enableAutoSIPrefix(False)
+
+        self.updateViews()
+        self.p1.vb.sigResized.connect(self.updateViews)
+
+    @Slot()
+    def updateViews(self) -> None:
+        self.p2.setGeometry(self.p1.vb.sceneBoundingRect())
+        self.p3.setGeometry(self.p1.vb.sceneBoundingRect())
+        self.p2.linkedViewChanged(self.p1.vb, self.p2.XAxis)
+        self.p3.linkedViewChanged(self.p1.vb, self.p3.XAxis)
+
+    def auto_range(self):
+        self.p2.enableAutoRange(axis="y")
+        self.p3.enableAutoRange(axis="y")
+        self.p1.vb.updateAutoRange()
+        self.p2.updateAutoRange()
+        self.p3.updateAutoRange()
+
+        bounds = [np.inf, -np.inf]
+        for items in (
+            self.p1.vb.addedItems,
+            self.p2.addedItems,
+            self.p3.addedItems,
+        ):
+            for item in items:
+                _bounds = item.dataBounds(0)
+                if _bounds[0] is None or _bounds[1] is None:
+                    continue
+                bounds[0] = min(_bounds[0], bounds[0])
+                bounds[1] = max(_bounds[1], bounds[1])
+        if bounds[0] != np.inf and bounds[1] != -np.inf:
+            self.p1.vb.setRange(xRange=bounds)
+
+        bounds = [np.inf, -np.inf]
+        for items in (
+            self.p2.addedItems,
+            self.p3.addedItems,
+        ):
+            for item in items:
+                _bounds = item.dataBounds(1)
+                if _bounds[0] is None or _bounds[1] is None:
+                    continue
+                bounds[0] = min(_bounds[0], bounds[0])
+                bounds[1] = max(_bounds[1], bounds[1])
+        if bounds[0] != np.inf and bounds[1] != -np.inf:
+            self.p2.setRange(yRange=bounds)
+
+    def wheelEvent(self, ev, axis=None):
+        super().wheelEvent(ev)
+        for vb in (
+            self.p1.vb,
+            self.p2,
+            self.p3,
+        ):
+            if axis in (0, 1):
+                mask = [False, False]
+                mask[axis] = vb.state["mouseEnabled"][axis]
+            else:
+                mask = vb.state["mouseEnabled"][:]
+            s = 1.02 ** (
+                (ev.angleDelta().y() - ev.angleDelta().x())
+                * vb.state["wheelScaleFactor"]
+            )  # actual scaling factor
+            s = [(None if m is False else s) for m in mask]
+            center = Point(
+                functions.invertQTransform(vb.childGroup.transform()).map(ev.position())
+            )
+
+            vb._resetTarget()
+            vb.scaleBy(s, center)
+            ev.accept()
+            vb.sigRangeChangedManually.emit(mask)
@@ -0,0 +1,157 @@
+import bisect
+import heapq
+import math
+import time
+from typing import Dict, List, Optional, Set
+from ff14marketcalc import get_recipe_item_ids
+
+from xivapi.models import Recipe
+
+MIN_REFRESH_INTERVAL_S = 60 * 5
+RETAINER_LISTED_WEIGHT = 4.0
+FOCUS_WEIGHT = 4.0  # Recipes from the latest search
+DECILE_COUNT = 10
+
+
+class RefreshEntry:
+    def __init__(self, recipe: Recipe, fetch_time_s: float, ttl_s: float) -> None:
+        self.recipe = recipe
+        self.fetch_time_s = fetch_time_s
+        self.ttl_s = ttl_s
+        self.score = 0.0
+        self.velocity = 0.0
+        self.retainer_listed = False
+        self.due_time_s = 0.0
+        self.version = 0
+
+
+# Orders recipe refreshes by expected value of information. A recipe's data goes
+# stale over its TTL, and that staleness costs more the higher the recipe scores,
+# the faster it sells and when a retainer is listed on it. A recipe falls due once
+# age / TTL * value reaches 1, so high value recipes are refreshed early, and the
+# due time stays fixed until its inputs change, which keeps the heap ordering valid.
+class RefreshScheduler:
+    def __init__(self) -> None:
+        self._entries: Dict[int, RefreshEntry] = {}
+        self._heap: List[tuple] = []  # (due_time_s, recipe_id, version)
+        self._focus_recipe_id_set: Set[int] = set()
+        self.refresh_count_by_decile = [0] * DECILE_COUNT
+        self._sorted_scores: Optional[List[float]] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, recipe_id: int) -> bool:
+        return recipe_id in self._entries
+
+    def _value(self, entry: RefreshEntry) -> float:
+        value = (1 + math.log10(1 + max(entry.score, 0.0))) * (
+            1 + math.log10(1 + max(entry.velocity, 0.0))
+        )
+        if entry.retainer_listed:
+            value *= RETAINER_LISTED_WEIGHT
+        if entry.recipe.ID in self._focus_recipe_id_set:
+            value *= FOCUS_WEIGHT
+        return value
+
+    def _push(self, entry: RefreshEntry) -> None:
+        entry.version += 1
+        entry.due_time_s = entry.fetch_time_s + max(
+            entry.ttl_s / self._value(entry), MIN_REFRESH_INTERVAL_S
+        )
+        heapq.heappush(self._heap, (entry.due_time_s, entry.recipe.ID, entry.version))
+
+    def add(self, recipe: Recipe, fetch_time_s: float, ttl_s: float) -> None:
+        if recipe.ID in self._entries:
+            return
+        entry = RefreshEntry(recipe, fetch_time_s, ttl_s)
+        self._entries[recipe.ID] = entry
+        self._sorted_scores = None
+        self._push(entry)
+
+    def remove(self, recipe_id: int) -> None:
+        # The heap entry is skipped when popped
+        if self._entries.pop(recipe_id, None) is not None:
+            self._sorted_scores = None
+
+    def update(
+        self,
+        recipe_id: int,
+        score: float,
+        velocity: float,
+        retainer_listed: bool,
+        fetch_time_s: float,
+        ttl_s: float,
+    ) -> None:
+        entry = self._entries.get(recipe_id)
+        if entry is None:
+            return
+        entry.score = score
+        entry.velocity = velocity
+        entry.retainer_listed = retainer_listed
+        entry.fetch_time_s = fetch_time_s
+        entry.ttl_s = ttl_s
+        self._sorted_scores = None
+        self._push(entry)
+
+    def set_focus(self, recipe_id_set: Set[int]) -> None:
+        self._focus_recipe_id_set = recipe_id_set
+        self.reprioritise()
+
+    # Recomputes every due time, for when the inputs to the value change together
+    def reprioritise(self) -> None:
+        self._heap.clear()
+        for entry in self._entries.values():
+            self._push(entry)
+
+    def queue_depth(self, time_s: Optional[float] = None) -> int:
+        time_s = time_s if time_s is not None else time.time()
+        return sum(entry.due_time_s <= time_s for entry in self._entries.values())
+
+    # Takes due recipes in due time order until the item budget is spent. Taken
+    # recipes are requeued by update() with their new fetch time, or retried after
+    # MIN_REFRESH_INTERVAL_S if the refresh never happens.
+    def pop_due(self, item_budget: int, time_s: Optional[float] = None) -> List[Recipe]:
+        time_s = time_s if time_s is not None else time.time()
+        recipe_list: List[Recipe] = []
+        item_id_set: Set[int] = set()
+        while len(self._heap) > 0 and self._heap[0][0] <= time_s:
+            _, recipe_id, version = self._heap[0]
+            entry = self._entries.get(recipe_id)
+            if entry is None or entry.version != version:
+                heapq.heappop(self._heap)
+                continue
+            new_item_id_set = get_recipe_item_ids(entry.recipe) - item_id_set
+            if (
+                len(recipe_list) > 0
+                and len(item_id_set) + len(new_item_id_set) > item_budget
+            ):
+                break
+            heapq.heappop(self._heap)
+            entry.version += 1
+            entry.due_time_s = time_s + MIN_REFRESH_INTERVAL_S
+            heapq.heappush(
+                self._heap, (entry.due_time_s, entry.recipe.ID, entry.version)
+            )
+            item_id_set |= new_item_id_set
+            recipe_list.append(entry.recipe)
+            self.refresh_count_by_decile[self._score_decile(entry.score)] += 1
+        return recipe_list
+
+    def _score_decile(self, score: float) -> int:
+        if self._sorted_scores is None:
+            self._sorted_scores = sorted(
+                entry.score for entry in self._entries.values()
+            )
+        return min(
+            bisect.bisect_left(self._sorted_scores, score)
+            * DECILE_COUNT
+            // max(len(self._sorted_scores), 1),
+            DECILE_COUNT - 1,
+        )
+
+    def stats(self, time_s: Optional[float] = None) -> str:
+        return (
+            f"Refresh queue: {self.queue_depth(time_s)} due of {len(self)}, "
+            f"refreshes by score decile (low to high): {self.refresh_count_by_decile}"
+        )
@@ -1,5 +1,6 @@
 import json
 import logging
+import time
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 from copy import copy
@@ -19,7 +20,13 @@ from PySide6.QtGui import QBrush, QColor
 from PySide6.QtWidgets import QTableWidgetItem
 from ff14marketcalc import get_profit
 from retainerWorker.models import ListingData
-from universalis.universalis import get_listings
+from universalis.universalis import (
+    get_listings,
+    get_listings_many,
+    get_seller_listings,
+    is_listing_expired,
+    is_live_feed,
+)
 
 from xivapi.models import ClassJob, Recipe, RecipeCollection
 from universalis.models import Listing, Listings
@@ -54,6 +61,14 @@ class RetainerWorker(QObject):
         except Exception as e:
             _logger.exception(e)
 
+    # Every cached item the seller has listings of, from the listings seller index
+    def load_seller_index(self, retainer_listings_changed_signal: Signal) -> None:
+        try:
+            for listings in get_seller_listings(self.seller_id, self.world_id).values():
+                retainer_listings_changed_signal.emit(listings)  # type: ignore
+        except Exception as e:
+            _logger.exception(e)
+
     def save_cache(self) -> None:
         with self.file_path.open("wb") as f:
             pickle.dump(
@@ -71,16 +86,32 @@ class RetainerWorker(QObject):
         return listing_data
 
     def update_listing_data(self, listing_data: ListingData) -> ListingData:
-        listing_data.listings = get_listings(
-            listing_data.item.ID, self.world_id, cache_timeout_s=0
+        # Refresh the row with every other tracked item that is due in one request.
+        # Rows whose timers fire shortly after are served from the cache. The live
+        # feed keeps cached items current, so while it is connected only entries it
+        # has not seen are due.
+        cache_timeout_s = None if is_live_feed() else ROW_REFRESH_PERIOD_MS / 1000 / 2
+        time_s = time.time()
+        item_id_list = [listing_data.item.ID] + [
+            _listing_data.item.ID
+            for _listing_data in self.table_data.values()
+            if is_listing_expired(
+                _listing_data.item.ID, self.world_id, time_s, cache_timeout_s
+            )
+        ]
+        listings_dict = get_listings_many(
+            item_id_list, self.world_id, cache_timeout_s=cache_timeout_s
         )
+        listings = listings_dict.get(listing_data.item.ID)
+        if listings is None:
+            _logger.warning(f"No listings returned for {listing_data.item.Name}")
+        else:
+            listing_data.listings = listings
+        return listing_data
 
     def timerEvent(self, event: QTimerEvent) -> None:
         if (listing_data := self.table_data.get(event.timerId())) is not None:
-            if any(
-                listing.sellerID == self.seller_id
-                for listing in listing_data.listings.listings
-            ):
+            if listing_data.listings.listings.has_seller(self.seller_id):
                 try:
                     self.update_listing_data(listing_data)
                 except Exception as e:
@@ -94,6 +125,19 @@ class RetainerWorker(QObject):
         else:
             super().timerEvent(event)
 
+    # Listings of an item changed through the live market feed
+    @Slot(int)
+    def on_item_changed(self, item_id: int) -> None:
+        listings = get_listings(item_id, self.world_id)
+        for listing_data in self.table_data.values():
+            if listing_data.item.ID == item_id:
+                listing_data.listings = listings
+                self.listing_data_updated.emit(listing_data)
+                return
+        # A new listing by the seller
+        if listings.listings.has_seller(self.seller_id):
+            self.on_retainer_listings_changed(listings)
+
     @Slot(Listings)
     def on_retainer_listings_changed(self, listings: Listings) -> None:
         print("on retainer listings changed")
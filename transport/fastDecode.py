@@ -0,0 +1,162 @@
+import json
+import logging
+from copy import copy
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Type, TypeVar
+from pydantic import BaseModel
+from pydantic.fields import (
+    SHAPE_LIST,
+    SHAPE_SEQUENCE,
+    SHAPE_SINGLETON,
+    SHAPE_TUPLE_ELLIPSIS,
+    ModelField,
+)
+from PySide6.QtCore import QMutex
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_logger = logging.getLogger(__name__)
+
+FAST_DECODE = True
+STRICT_SAMPLE_INTERVAL = 32  # Every Nth decode per model is also validated
+
+M = TypeVar("M", bound=BaseModel)
+
+_decode_count: Dict[type, int] = {}
+_strict_model_set: Set[type] = set()  # Models whose payloads failed a sampled check
+_mutex = QMutex()
+_MISSING = object()
+
+
+def set_fast_decode(enabled: bool) -> None:
+    global FAST_DECODE
+    FAST_DECODE = enabled
+
+
+def loads(content: bytes) -> Any:
+    return orjson.loads(content) if orjson is not None else json.loads(content)
+
+
+# Per model list of (name, alias, converter, required, default). Converter is None
+# for fields whose JSON value is used as is.
+FieldPlan = List[Tuple[str, str, Optional[Callable[[Any], Any]], bool, Any]]
+_plan_dict: Dict[type, FieldPlan] = {}
+
+
+def _get_single_converter(field: ModelField) -> Optional[Callable[[Any], Any]]:
+    if field.sub_fields and field.shape == SHAPE_SINGLETON:
+        # Union: objects go to the first model member, anything else is kept as is
+        for sub_field in field.sub_fields:
+            if isinstance(sub_field.type_, type) and issubclass(
+                sub_field.type_, BaseModel
+            ):
+                union_model = sub_field.type_
+                return lambda value: (
+                    construct(union_model, value) if isinstance(value, dict) else value
+                )
+        return None
+    field_type = field.type_
+    if isinstance(field_type, type):
+        if issubclass(field_type, BaseModel):
+            return lambda value: construct(field_type, value)
+        if hasattr(field_type, "__get_validators__"):
+            validator_list = list(field_type.__get_validators__())
+
+            def validate(value: Any) -> Any:
+                for validator in validator_list:
+                    value = validator(value)
+                return value
+
+            return validate
+    return None
+
+
+def _get_converter(field: ModelField) -> Optional[Callable[[Any], Any]]:
+    if field.shape == SHAPE_SINGLETON:
+        return _get_single_converter(field)
+    item_converter = _get_single_converter(
+        field.sub_fields[0] if field.sub_fields else field
+    )
+    if field.shape in (SHAPE_LIST, SHAPE_SEQUENCE):
+        if item_converter is None:
+            return None
+        return lambda value: [
+            item_converter(item) if item is not None else None for item in value
+        ]
+    if field.shape == SHAPE_TUPLE_ELLIPSIS:
+        if item_converter is None:
+            return tuple
+        return lambda value: tuple(
+            item_converter(item) if item is not None else None for item in value
+        )
+    return None
+
+
+def _get_plan(model: type) -> FieldPlan:
+    plan = _plan_dict.get(model)
+    if plan is None:
+        plan = [
+            (name, field.alias, _get_converter(field), field.required, field.default)
+            for name, field in model.__fields__.items()
+        ]
+        _plan_dict[model] = plan
+    return plan
+
+
+# Builds a model from a trusted payload without validation or coercion. Missing
+# required fields raise KeyError.
+def construct(model: Type[M], data: Any) -> M:
+    values = {}
+    if "__root__" in model.__fields__:
+        _, _, converter, _, _ = _get_plan(model)[0]
+        values["__root__"] = converter(data) if converter is not None else data
+    else:
+        for name, alias, converter, required, default in _get_plan(model):
+            value = data.get(alias, _MISSING)
+            if value is _MISSING:
+                if required:
+                    raise KeyError(f"{model.__name__} payload is missing {alias}")
+                value = copy(default)
+            elif converter is not None and value is not None:
+                value = converter(value)
+            values[name] = value
+    instance = model.__new__(model)
+    object.__setattr__(instance, "__dict__", values)
+    object.__setattr__(instance, "__fields_set__", set(values))
+    return instance
+
+
+# Parses a decoded payload into a model. In fast decode mode the model is built
+# with construct() and a sample of payloads is also validated. A model whose
+# sampled payload fails validation, or differs from the constructed model, is
+# validated in full from then on.
+def parse_model(model: Type[M], data: Any) -> M:
+    if not FAST_DECODE or model in _strict_model_set:
+        return model.parse_obj(data)
+    _mutex.lock()
+    decode_count = _decode_count.get(model, 0)
+    _decode_count[model] = decode_count + 1
+    _mutex.unlock()
+    try:
+        constructed = construct(model, data)
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        _logger.log(logging.WARN, f"Fast decode of {model.__name__} failed: {e}")
+        _set_strict(model)
+        return model.parse_obj(data)
+    if decode_count % STRICT_SAMPLE_INTERVAL == 0:
+        validated = model.parse_obj(data)
+        if validated != constructed:
+            _logger.log(
+                logging.WARN, f"Fast decode of {model.__name__} differs from validation"
+            )
+            _set_strict(model)
+            return validated
+    return constructed
+
+
+def _set_strict(model: type) -> None:
+    _mutex.lock()
+    _strict_model_set.add(model)
+    _mutex.unlock()
@@ -0,0 +1,149 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import timezone
+import email.utils
+import logging
+import random
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from PySide6.QtCore import QMutex, QSemaphore
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_RATE = 20.0  # requests per second
+DEFAULT_BURST = 20
+MAX_IN_FLIGHT = 8
+MAX_RETRIES = 6
+BACKOFF_BASE_S = 0.1
+BACKOFF_MAX_S = 10.0
+REQUEST_TIMEOUT_S = 30.0
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._time = time.monotonic()
+        self._mutex = QMutex()
+
+    # Reserve a token and sleep until it is available. Tokens may go negative so
+    # waiting callers are served in order.
+    def acquire(self) -> None:
+        self._mutex.lock()
+        now_time = time.monotonic()
+        self._tokens = min(
+            self._tokens + (now_time - self._time) * self.rate, float(self.burst)
+        )
+        self._time = now_time
+        self._tokens -= 1
+        wait_s = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        self._mutex.unlock()
+        if wait_s > 0:
+            time.sleep(wait_s)
+
+
+class HttpClient:
+    def __init__(
+        self,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        max_retries: int = MAX_RETRIES,
+        default_rate: float = DEFAULT_RATE,
+        default_burst: int = DEFAULT_BURST,
+    ) -> None:
+        self.max_retries = max_retries
+        self.default_rate = default_rate
+        self.default_burst = default_burst
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_in_flight)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._token_buckets: Dict[str, TokenBucket] = {}
+        self._token_buckets_mutex = QMutex()
+        self._in_flight_semaphore = QSemaphore(max_in_flight)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_in_flight, thread_name_prefix="HttpClient"
+        )
+
+    def set_rate_limit(self, host: str, rate: float, burst: int) -> None:
+        self._token_buckets_mutex.lock()
+        self._token_buckets[host] = TokenBucket(rate, burst)
+        self._token_buckets_mutex.unlock()
+
+    def get_token_bucket(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc
+        self._token_buckets_mutex.lock()
+        token_bucket = self._token_buckets.get(host)
+        if token_bucket is None:
+            token_bucket = TokenBucket(self.default_rate, self.default_burst)
+            self._token_buckets[host] = token_bucket
+        self._token_buckets_mutex.unlock()
+        return token_bucket
+
+    def _get_backoff_s(self, attempt: int) -> float:
+        # Full jitter: https://aws.amazon.com/blogs/architecture/exponential-backoff-and-jitter/
+        return random.uniform(0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2**attempt))
+
+    def _get_retry_after_s(self, response: requests.Response) -> Optional[float]:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after is None:
+            return None
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+        # Neither seconds nor an HTTP date, the jittered backoff is used instead
+        try:
+            retry_after_date = email.utils.parsedate_to_datetime(retry_after)
+        except (TypeError, ValueError):
+            _logger.log(logging.DEBUG, f"Unparseable Retry-After: {retry_after}")
+            return None
+        # Dates without a zone are taken as UTC, as HTTP dates are
+        if retry_after_date.tzinfo is None:
+            retry_after_date = retry_after_date.replace(tzinfo=timezone.utc)
+        return max(retry_after_date.timestamp() - time.time(), 0.0)
+
+    def _send(self, url: str) -> requests.Response:
+        self.get_token_bucket(url).acquire()
+        self._in_flight_semaphore.acquire()
+        try:
+            return self.session.get(url, timeout=REQUEST_TIMEOUT_S)
+        finally:
+            self._in_flight_semaphore.release()
+
+    # Retries connection errors, 429 and 5xx responses. Other 4xx responses are
+    # raised immediately.
+    def get(self, url: str) -> requests.Response:
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self._send(url)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise e
+                wait_s = self._get_backoff_s(attempt)
+                _logger.warning(f"{url}: {e}, retrying in {wait_s:.2f}s")
+            else:
+                if response.status_code < 400:
+                    return response
+                if response.status_code != 429 and response.status_code < 500:
+                    response.raise_for_status()
+                if attempt == self.max_retries:
+                    response.raise_for_status()
+                wait_s = self._get_backoff_s(attempt)
+                if response.status_code == 429:
+                    retry_after_s = self._get_retry_after_s(response)
+                    if retry_after_s is not None:
+                        wait_s = retry_after_s
+                _logger.warning(
+                    f"{url}: HTTP {response.status_code}, retrying in {wait_s:.2f}s"
+                )
+            time.sleep(wait_s)
+        raise RuntimeError(f"Failed to get {url}")
+
+    def submit(self, url: str) -> "Future[requests.Response]":
+        return self._executor.submit(self.get, url)
+
+
+http_client = HttpClient()
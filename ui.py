@@ -1,9 +1,8 @@
 import json
 import logging
 import math
-from scipy import stats
-from typing import Dict, List, Optional, Tuple
-import pandas as pd
+import threading
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 import numpy as np
 import pyperclip
 from PySide6.QtCore import (
@@ -15,6 +14,8 @@ from PySide6.QtCore import (
     Qt,
     QBasicTimer,
     QCoreApplication,
+    QMetaObject,
+    QStringListModel,
 )
 from PySide6.QtGui import QBrush, QColor
 from PySide6.QtWidgets import (
@@ -35,17 +36,7 @@ from PySide6.QtWidgets import (
     QMenuBar,
     QWidgetAction,
     QSpinBox,
-)
-from pyqtgraph import (
-    PlotWidget,
-    DateAxisItem,
-    AxisItem,
-    PlotCurveItem,
-    PlotDataItem,
-    ViewBox,
-    Point,
-    functions,
-    mkPen,
+    QCompleter,
 )
 from QTableWidgetFloatItem import QTableWidgetFloatItem
 from cache import PersistMapping
@@ -57,23 +48,39 @@ from retainerWorker.models import ListingData
 from universalis.models import Listings
 from craftingWorker import CraftingWorker
 from retainerWorker.retainerWorker import RetainerWorker
-from universalis.universalis import get_listings, set_seller_id, world_id
+from universalis.marketFeed import MarketFeed
+from universalis.universalis import (
+    get_listings,
+    set_data_center,
+    set_seller_id,
+    world_id,
+)
 from universalis.universalis import save_to_disk as universalis_save_to_disk
 from xivapi.models import ClassJob, Recipe, RecipeCollection
 from xivapi.xivapi import (
     get_classjob_doh_list,
     get_recipe_by_id,
     get_recipes,
+    load_name_indexes,
+    migrate_recipe_cache,
+    recipe_name_index,
     search_recipes,
 )
 from xivapi.xivapi import save_to_disk as xivapi_save_to_disk
 
+if TYPE_CHECKING:
+    from priceGraph import PriceGraph
+
 logging.basicConfig(
     level=logging.INFO, format=" %(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
 
 _logger = logging.getLogger(__name__)
 
+# Data center of world_id, e.g. "Light", to buy ingredients on any of its worlds
+DATA_CENTER: Optional[str] = None
+SEARCH_COMPLETION_COUNT = 15  # Names the search box suggests as it is typed
+
 
 class MainWindow(QMainWindow):
     class RecipeListTable(QTableWidget):
@@ -231,36 +238,26 @@ class MainWindow(QMainWindow):
             self.table_data.clear()
 
         def get_min_price(self, listings: Listings) -> float:
-            listing_prices = [
-                listing.pricePerUnit
-                for listing in listings.listings
-                if listing.sellerID != self.seller_id
-            ]
-            if len(listing_prices) > 0:
-                return min(listing_prices)
-            else:
-                return np.inf
+            min_price = listings.listings.min_price(exclude_seller_id=self.seller_id)
+            return min_price if min_price is not None else np.inf
 
         @Slot(list)
         def on_listing_data_updated(self, listing_data: ListingData) -> None:
             row_list_index = 0
             row_list = self.table_data.setdefault(listing_data.item.ID, [])
+            min_price = self.get_min_price(listing_data.listings)
             for listing in listing_data.listings.listings:
                 if listing.sellerID == self.seller_id:
                     if row_list_index < len(row_list):
                         row_data = row_list[row_list_index]
                         row_data[2].setText(f"{listing.pricePerUnit:,.0f}")
-                        row_data[3].setText(
-                            f"{self.get_min_price(listing_data.listings):,.0f}"
-                        )
+                        row_data[3].setText(f"{min_price:,.0f}")
                     else:
                         row_data = [
                             QTableWidgetItem(listing.retainerName),
                             QTableWidgetItem(listing_data.item.Name),
                             QTableWidgetItem(f"{listing.pricePerUnit:,.0f}"),
-                            QTableWidgetItem(
-                                f"{self.get_min_price(listing_data.listings):,.0f}"
-                            ),
+                            QTableWidgetItem(f"{min_price:,.0f}"),
                         ]
                         row_count = self.rowCount()
                         self.insertRow(row_count)
@@ -275,156 +272,6 @@ class MainWindow(QMainWindow):
                         table_widget_item.setBackground(color)
                     row_list_index += 1
 
-    class PriceGraph(PlotWidget):
-        class FmtAxesItem(AxisItem):
-            def __init__(
-                self,
-                orientation,
-                pen=None,
-                textPen=None,
-                linkView=None,
-                parent=None,
-                maxTickLength=-5,
-                showValues=True,
-                text="",
-                units="",
-                unitPrefix="",
-                **args,
-            ):
-                super().__init__(
-                    orientation,
-                    pen,
-                    textPen,
-                    linkView,
-                    parent,
-                    maxTickLength,
-                    showValues,
-                    text,
-                    units,
-                    unitPrefix,
-                    **args,
-                )
-
-            def tickStrings(self, values, scale, spacing):
-                return [f"{v:,.0f}" for v in values]
-
-        def __init__(self, parent=None, background="default", plotItem=None, **kargs):
-            kargs["axisItems"] = {
-                "bottom": DateAxisItem(),
-                "left": MainWindow.PriceGraph.FmtAxesItem(orientation="left"),
-                "right": MainWindow.PriceGraph.FmtAxesItem(orientation="right"),
-            }
-            super().__init__(parent, background, plotItem, **kargs)
-
-            self.p1 = self.plotItem
-            self.p1.getAxis("left").setLabel("Velocity", color="#00ffff")
-            self.p1_pen = mkPen(color="#00ff00", width=2)
-
-            ## create a new ViewBox, link the right axis to its coordinate system
-            self.p2 = ViewBox()
-            self.p1.showAxis("right")
-            self.p1.scene().addItem(self.p2)
-            self.p1.getAxis("right").linkToView(self.p2)
-            self.p2.setXLink(self.p1)
-            self.p1.getAxis("right").setLabel("Purchases", color="#00ff00")
-            # # self.p1.vb.setLogMode("y", True)
-            # self.p2.setLogMode(self.p1.getAxis("right"), True)
-            # self.p1.getAxis("right").setLogMode(False, True)
-            # self.p1.getAxis("right").enableAutoSIPrefix(False)
-
-            ## create third ViewBox.
-            ## this time we need to create a new axis as well.
-            self.p3 = ViewBox()
-            self.ax3 = MainWindow.PriceGraph.FmtAxesItem(orientation="right")
-            self.p1.layout.addItem(self.ax3, 2, 3)
-            self.p1.scene().addItem(self.p3)
-            self.ax3.linkToView(self.p3)
-            self.p3.setXLink(self.p1)
-            self.p3.setYLink(self.p2)
-            self.ax3.setZValue(-10000)
-            self.ax3.setLabel("Listings", color="#ff00ff")
-            self.ax3.hide()
-            self.ax3.setGrid(128)
-            # self.ax3.setLogMode(False, True)
-            # self.p3.setLogMode("y", True)
-            # self.ax3.hideAxis()
-            # self.ax3.setLogMode(False, True)
-            # self.ax3.enableAutoSIPrefix(False)
-
-            self.updateViews()
-            self.p1.vb.sigResized.connect(self.updateViews)
-
-        @Slot()
-        def updateViews(self) -> None:
-            self.p2.setGeometry(self.p1.vb.sceneBoundingRect())
-            self.p3.setGeometry(self.p1.vb.sceneBoundingRect())
-            self.p2.linkedViewChanged(self.p1.vb, self.p2.XAxis)
-            self.p3.linkedViewChanged(self.p1.vb, self.p3.XAxis)
-
-        def auto_range(self):
-            self.p2.enableAutoRange(axis="y")
-            self.p3.enableAutoRange(axis="y")
-            self.p1.vb.updateAutoRange()
-            self.p2.updateAutoRange()
-            self.p3.updateAutoRange()
-
-            bounds = [np.inf, -np.inf]
-            for items in (
-                self.p1.vb.addedItems,
-                self.p2.addedItems,
-                self.p3.addedItems,
-            ):
-                for item in items:
-                    _bounds = item.dataBounds(0)
-                    if _bounds[0] is None or _bounds[1] is None:
-                        continue
-                    bounds[0] = min(_bounds[0], bounds[0])
-                    bounds[1] = max(_bounds[1], bounds[1])
-            if bounds[0] != np.inf and bounds[1] != -np.inf:
-                self.p1.vb.setRange(xRange=bounds)
-
-            bounds = [np.inf, -np.inf]
-            for items in (
-                self.p2.addedItems,
-                self.p3.addedItems,
-            ):
-                for item in items:
-                    _bounds = item.dataBounds(1)
-                    if _bounds[0] is None or _bounds[1] is None:
-                        continue
-                    bounds[0] = min(_bounds[0], bounds[0])
-                    bounds[1] = max(_bounds[1], bounds[1])
-            if bounds[0] != np.inf and bounds[1] != -np.inf:
-                self.p2.setRange(yRange=bounds)
-
-        def wheelEvent(self, ev, axis=None):
-            super().wheelEvent(ev)
-            for vb in (
-                self.p1.vb,
-                self.p2,
-                self.p3,
-            ):
-                if axis in (0, 1):
-                    mask = [False, False]
-                    mask[axis] = vb.state["mouseEnabled"][axis]
-                else:
-                    mask = vb.state["mouseEnabled"][:]
-                s = 1.02 ** (
-                    (ev.angleDelta().y() - ev.angleDelta().x())
-                    * vb.state["wheelScaleFactor"]
-                )  # actual scaling factor
-                s = [(None if m is False else s) for m in mask]
-                center = Point(
-                    functions.invertQTransform(vb.childGroup.transform()).map(
-                        ev.position()
-                    )
-                )
-
-                vb._resetTarget()
-                vb.scaleBy(s, center)
-                ev.accept()
-                vb.sigRangeChangedManually.emit(mask)
-
     # class JobLevelWidget(QWidget):
     #     def __init__(self, parent: Optional[QWidget] = ..., f: Qt.WindowFlags = ...) -> None:
     #         super().__init__(parent, f)
@@ -456,7 +303,7 @@ class MainWindow(QMainWindow):
     auto_refresh_listings_changed = Signal(bool)
     search_recipes = Signal(str)
 
-    def __init__(self):
+    def __init__(self, classjob_list: List[ClassJob]):
         super().__init__()
 
         self.main_widget = QWidget()
@@ -487,8 +334,6 @@ class MainWindow(QMainWindow):
         self.table_search_widget = QWidget()
 
         # Classjob level stuff!
-        _logger.info("Getting classjob list...")
-        classjob_list: List[ClassJob] = get_classjob_doh_list()
         self.classjob_config = PersistMapping[int, ClassJobConfig](
             f"classjob_config-{world_id}.bin",
             {
@@ -518,6 +363,16 @@ class MainWindow(QMainWindow):
         self.search_layout.addWidget(self.search_label)
         self.search_lineedit = QLineEdit(self)
         self.search_lineedit.returnPressed.connect(self.on_search_return_pressed)
+        self.search_lineedit.textEdited.connect(self.on_search_text_edited)
+        # Recipe names matching the text as it is typed, best first
+        self.search_completer_model = QStringListModel(self)
+        self.search_completer = QCompleter(self.search_completer_model, self)
+        self.search_completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.search_completer.setMaxVisibleItems(SEARCH_COMPLETION_COUNT)
+        self.search_completer.activated[str].connect(
+            self.on_search_completion_activated
+        )
+        self.search_lineedit.setCompleter(self.search_completer)
         self.search_layout.addWidget(self.search_lineedit)
         self.search_refresh_button = QPushButton(self)
         self.search_refresh_button.setText("Refresh")
@@ -540,15 +395,14 @@ class MainWindow(QMainWindow):
             "4d9521317c92e33772cd74a166c72b0207ab9edc5eaaed5a1edb52983b70b2c2"
         )
         set_seller_id(self.seller_id)
+        set_data_center(DATA_CENTER)
 
         self.retainer_table = MainWindow.RetainerTable(self, self.seller_id)
         self.retainer_table.cellClicked.connect(self.on_retainer_table_clicked)
         self.right_splitter.addWidget(self.retainer_table)
 
-        self.price_graph = MainWindow.PriceGraph(self)
-        # self.price_graph = MainWindow.PriceGraph()
-        self.right_splitter.addWidget(self.price_graph)
-        self.right_splitter.setSizes([1, 1])
+        # Built by load_deferred once the window has been shown
+        self.price_graph: Optional["PriceGraph"] = None
 
         self.main_layout.addWidget(self.centre_splitter)
         self.main_widget.setLayout(self.main_layout)
@@ -596,12 +450,48 @@ class MainWindow(QMainWindow):
             self.retainer_table.on_listing_data_updated
         )
 
+        self.market_feed_thread = QThread()
+        self.market_feed = MarketFeed(world_id=world_id)
+        self.market_feed.moveToThread(self.market_feed_thread)
+        self.market_feed_thread.started.connect(self.market_feed.start)
+        self.market_feed_thread.finished.connect(self.market_feed.deleteLater)
+        self.market_feed.item_changed.connect(self.crafting_worker.on_item_changed)
+        self.market_feed.item_changed.connect(self.retainerworker.on_item_changed)
+
         self.crafting_worker_thread.start(QThread.LowPriority)
         # self.crafting_worker_thread.start()
+        self.retainerworker_thread.start(QThread.LowPriority)
+        self.market_feed_thread.start(QThread.LowPriority)
+
+    # Loads what the first paint does not need, called once the window is shown.
+    # The retainer listings are loaded from their caches in a background thread,
+    # which also imports the modules the price graph analysis needs.
+    def load_deferred(self) -> None:
+        threading.Thread(target=self._load_in_background, daemon=True).start()
+        self.create_price_graph()
+
+    def _load_in_background(self) -> None:
+        import pandas
+        import scipy.stats
+
+        self.retainerworker.load_seller_index(
+            self.crafting_worker.seller_listings_matched_signal
+        )
         self.retainerworker.load_cache(
             self.crafting_worker.seller_listings_matched_signal
         )
-        self.retainerworker_thread.start(QThread.LowPriority)
+        # Before the name indexes, which read the recipe graph
+        migrate_recipe_cache()
+        load_name_indexes()
+
+    def create_price_graph(self) -> None:
+        if self.price_graph is not None:
+            return
+        from priceGraph import PriceGraph
+
+        self.price_graph = PriceGraph(self)
+        self.right_splitter.addWidget(self.price_graph)
+        self.right_splitter.setSizes([1, 1])
 
     @Slot(int, int)
     def on_classjob_level_value_changed(
@@ -632,9 +522,37 @@ class MainWindow(QMainWindow):
 
     @Slot()
     def on_search_return_pressed(self):
+        # Return on a completion searches for it once it is activated
+        if (
+            self.search_completer.popup().isVisible()
+            and self.search_completer.popup().currentIndex().isValid()
+        ):
+            return
         self.table.clear_contents()
         self.search_recipes.emit(self.search_lineedit.text())
 
+    @Slot(str)
+    def on_search_text_edited(self, text: str) -> None:
+        # Nothing is suggested until the index has loaded in the background
+        if not recipe_name_index.loaded:
+            return
+        self.search_completer_model.setStringList(
+            list(
+                dict.fromkeys(
+                    name
+                    for _, name in recipe_name_index.search(
+                        text, SEARCH_COMPLETION_COUNT * 2
+                    )
+                )
+            )[:SEARCH_COMPLETION_COUNT]
+        )
+
+    @Slot(str)
+    def on_search_completion_activated(self, text: str) -> None:
+        self.search_lineedit.setText(text)
+        self.table.clear_contents()
+        self.search_recipes.emit(text)
+
     @Slot(int, int)
     def on_retainer_table_clicked(self, row: int, column: int):
         for row_group_list in self.retainer_table.table_data.values():
@@ -664,8 +582,14 @@ class MainWindow(QMainWindow):
         self.status_bar_label.setText(f"Processing {item_name}...")
         QCoreApplication.processEvents()
         recipe = get_recipe_by_id(recipe_id)
-        self.recipe_textedit.setText(print_recipe(recipe, world_id))
-        profit = get_profit(recipe, world_id)
+        self.recipe_textedit.setText(
+            print_recipe(recipe, world_id, self.crafting_worker.buy_policy)
+        )
+        # print_recipe fetched the result item in full, which may list a retainer
+        self.crafting_worker.emit_seller_id_in_recipe(recipe)
+        profit = get_profit(
+            recipe, world_id, buy_policy=self.crafting_worker.buy_policy
+        )
         listings = get_listings(recipe.ItemResult.ID, world_id)
         self.table.on_recipe_table_update(
             recipe, profit, listings.regularSaleVelocity, len(listings.listings)
@@ -673,17 +597,23 @@ class MainWindow(QMainWindow):
         self.status_bar_label.setText(f"Done processing {item_name}...")
 
     def plot_listings(self, listings: Listings) -> None:
+        import pandas as pd
+        from pyqtgraph import PlotDataItem
+        from scipy import stats
+
+        self.create_price_graph()
+        assert self.price_graph is not None
         self.price_graph.p1.clear()
         self.price_graph.p2.clear()
         self.price_graph.p3.clear()
-        listings.history.sort_index(inplace=True)
-        listings.listing_history.sort_index(inplace=True)
+        history_df = listings.history.to_dataframe()
+        listing_history_df = listings.listing_history.to_dataframe()
         self.price_graph.p1.plot(
-            x=np.asarray(listings.history.index[1:]),
+            x=np.asarray(history_df.index[1:]),
             y=(3600 * 24 * 7)
             / np.asarray(
-                pd.Series(listings.history.index)
-                - pd.Series(listings.history.index).shift(periods=1)
+                pd.Series(history_df.index)
+                - pd.Series(history_df.index).shift(periods=1)
             )[1:],
             pen="c",
             symbol="o",
@@ -691,7 +621,7 @@ class MainWindow(QMainWindow):
             symbolBrush=("c"),
         )
 
-        if len(listings.history.index) > 2:
+        if len(history_df.index) > 2:
             # smoothing: https://stackoverflow.com/a/63511354/7552308
             # history_df = listings.history[["Price"]].apply(
             #     savgol_filter, window_length=5, polyorder=2
@@ -708,8 +638,8 @@ class MainWindow(QMainWindow):
             # )
             self.price_graph.p2.addItem(
                 p2 := PlotDataItem(
-                    np.asarray(listings.history.index),
-                    listings.history["Price"].values,
+                    np.asarray(history_df.index),
+                    history_df["Price"].values,
                     pen=self.price_graph.p1_pen,
                     symbol="o",
                     symbolSize=5,
@@ -718,25 +648,15 @@ class MainWindow(QMainWindow):
             )
 
         if (
-            listings.listing_history.index.size > 2
-            and listings.listing_history["Price"].max()
-            - listings.listing_history["Price"].min()
+            listing_history_df.index.size > 2
+            and listing_history_df["Price"].max() - listing_history_df["Price"].min()
             > 0
         ):
-            listing_history_df = listings.listing_history[
-                (np.abs(stats.zscore(listings.listing_history)) < 3).all(axis=1)
-            ]
-            if listing_history_df.index.size != listings.listing_history.index.size:
+            outlier_mask = np.abs(stats.zscore(listing_history_df["Price"])) >= 3
+            if outlier_mask.any():
                 _logger.info("Ignoring outliers:")
-                _logger.info(
-                    listings.listing_history.loc[
-                        listings.listing_history.index.difference(
-                            listing_history_df.index
-                        )
-                    ]["Price"]
-                )
-        else:
-            listing_history_df = listings.listing_history
+                _logger.info(listing_history_df[outlier_mask]["Price"])
+            listing_history_df = listing_history_df[~outlier_mask]
         self.price_graph.p3.addItem(
             p3 := PlotDataItem(
                 np.asarray(listing_history_df.index),
@@ -771,6 +691,10 @@ class MainWindow(QMainWindow):
         self.retainerworker_thread.quit()
         self.retainerworker_thread.wait()
         print("retainer worker closed")
+        QMetaObject.invokeMethod(self.market_feed, "stop", Qt.BlockingQueuedConnection)
+        self.market_feed_thread.quit()
+        self.market_feed_thread.wait()
+        print("market feed closed")
         self.classjob_config.save_to_disk()
         print("classjob config saved")
         universalis_save_to_disk()
@@ -783,10 +707,16 @@ class MainWindow(QMainWindow):
 
 
 if __name__ == "__main__":
+    # Loaded before any window exists so the window is built without waiting on it
+    _logger.info("Getting classjob list...")
+    classjob_list: List[ClassJob] = get_classjob_doh_list()
+
     app = QApplication([])
 
-    main_window = MainWindow()
+    main_window = MainWindow(classjob_list)
     main_window.show()
+    app.processEvents()
+    main_window.load_deferred()
 
     app.exec()
 
@@ -0,0 +1,102 @@
+import struct
+from typing import Any, Dict, Tuple
+
+# Minimal BSON codec for the Universalis websocket feed, which sends and expects
+# BSON documents. Covers the element types the feed uses.
+
+_DOUBLE = 0x01
+_STRING = 0x02
+_DOCUMENT = 0x03
+_ARRAY = 0x04
+_OBJECT_ID = 0x07
+_BOOL = 0x08
+_DATETIME = 0x09
+_NULL = 0x0A
+_INT32 = 0x10
+_TIMESTAMP = 0x11
+_INT64 = 0x12
+
+
+def _encode_element(name: str, value: Any) -> bytes:
+    key = name.encode() + b"\x00"
+    if value is None:
+        return bytes([_NULL]) + key
+    if isinstance(value, bool):
+        return bytes([_BOOL]) + key + (b"\x01" if value else b"\x00")
+    if isinstance(value, int):
+        if -(2**31) <= value < 2**31:
+            return bytes([_INT32]) + key + struct.pack("<i", value)
+        return bytes([_INT64]) + key + struct.pack("<q", value)
+    if isinstance(value, float):
+        return bytes([_DOUBLE]) + key + struct.pack("<d", value)
+    if isinstance(value, str):
+        string = value.encode() + b"\x00"
+        return bytes([_STRING]) + key + struct.pack("<i", len(string)) + string
+    if isinstance(value, dict):
+        return bytes([_DOCUMENT]) + key + encode(value)
+    if isinstance(value, (list, tuple)):
+        return (
+            bytes([_ARRAY])
+            + key
+            + encode({str(index): item for index, item in enumerate(value)})
+        )
+    raise TypeError(f"Cannot encode {type(value).__name__} as BSON")
+
+
+def encode(document: Dict[str, Any]) -> bytes:
+    elements = b"".join(
+        _encode_element(name, value) for name, value in document.items()
+    )
+    return struct.pack("<i", len(elements) + 5) + elements + b"\x00"
+
+
+def _decode_document(data: bytes, offset: int) -> Tuple[Dict[str, Any], int]:
+    (size,) = struct.unpack_from("<i", data, offset)
+    end = offset + size - 1
+    offset += 4
+    document: Dict[str, Any] = {}
+    while offset < end:
+        element_type = data[offset]
+        name_end = data.index(b"\x00", offset + 1)
+        name = data[offset + 1 : name_end].decode()
+        offset = name_end + 1
+        if element_type == _DOUBLE:
+            (value,) = struct.unpack_from("<d", data, offset)
+            offset += 8
+        elif element_type == _STRING:
+            (length,) = struct.unpack_from("<i", data, offset)
+            value = data[offset + 4 : offset + 3 + length].decode()
+            offset += 4 + length
+        elif element_type in (_DOCUMENT, _ARRAY):
+            value, offset = _decode_document(data, offset)
+            if element_type == _ARRAY:
+                value = list(value.values())
+        elif element_type == _OBJECT_ID:
+            value = data[offset : offset + 12].hex()
+            offset += 12
+        elif element_type == _BOOL:
+            value = data[offset] != 0
+            offset += 1
+        elif element_type in (_DATETIME, _INT64):
+            (value,) = struct.unpack_from("<q", data, offset)
+            offset += 8
+        elif element_type == _NULL:
+            value = None
+        elif element_type == _INT32:
+            (value,) = struct.unpack_from("<i", data, offset)
+            offset += 4
+        elif element_type == _TIMESTAMP:
+            (value,) = struct.unpack_from("<Q", data, offset)
+            offset += 8
+        else:
+            raise ValueError(f"Unsupported BSON element type {element_type:#x}")
+        document[name] = value
+    return document, end + 1
+
+
+# Raises ValueError for a truncated or malformed document
+def decode(data: bytes) -> Dict[str, Any]:
+    try:
+        return _decode_document(data, 0)[0]
+    except (struct.error, IndexError) as e:
+        raise ValueError(f"Malformed BSON document: {e}") from e
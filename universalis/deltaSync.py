@@ -0,0 +1,116 @@
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from PySide6.QtCore import QMutex
+
+MAX_ENTRIES = 200  # Most entries Universalis returns from most-recently-updated
+STALE_S = 60 * 5  # Coverage lapses when the list has not been synced for this long
+
+
+# Tracks which cached items of one world changed upstream, from Universalis' list of
+# the most recently uploaded items. Items uploaded after their cached
+# lastUploadTime are marked dirty until they are refetched.
+#
+# Consecutive lists overlap as long as fewer uploads than the list holds happened
+# between two syncs, and while they do every upload since covered_since_s has been
+# seen. A clean entry fetched after covered_since_s is then known to match upstream.
+# A gap between two lists restarts coverage from the oldest upload in the newer one.
+class DeltaSync:
+    def __init__(self) -> None:
+        self._mutex = QMutex()
+        self._dirty: Dict[str, float] = {}  # key: upload time seen in the list
+        self.covered_since_s: Optional[float] = None
+        self.last_sync_s: Optional[float] = None
+        self._newest_upload_s: Optional[float] = None
+        self.sync_count = 0
+        self.gap_count = 0
+
+    # Applies one list of (key, upload time) entries, newest first as Universalis
+    # returns them. cached_upload_time gives the lastUploadTime in seconds of a
+    # cached key, None when it is not cached. Returns the keys newly marked dirty.
+    def apply(
+        self,
+        entries: List[Tuple[str, float]],
+        cached_upload_time: Callable[[str], Optional[float]],
+        time_s: Optional[float] = None,
+    ) -> List[str]:
+        time_s = time_s if time_s is not None else time.time()
+        dirty_key_list: List[str] = []
+        self._mutex.lock()
+        try:
+            if len(entries) < MAX_ENTRIES:
+                # The list holds every upload Universalis keeps track of
+                oldest_upload_s = 0.0
+            else:
+                oldest_upload_s = min(upload_s for _, upload_s in entries)
+            if (
+                self.covered_since_s is None
+                or self._newest_upload_s is None
+                or self.last_sync_s is None
+                or time_s - self.last_sync_s > STALE_S
+                or oldest_upload_s > self._newest_upload_s
+            ):
+                if self.covered_since_s is not None:
+                    self.gap_count += 1
+                self.covered_since_s = oldest_upload_s
+            for key, upload_s in entries:
+                if upload_s <= self._dirty.get(key, 0.0):
+                    continue
+                cached_upload_s = cached_upload_time(key)
+                if cached_upload_s is not None and cached_upload_s < upload_s:
+                    if key not in self._dirty:
+                        dirty_key_list.append(key)
+                    self._dirty[key] = upload_s
+            if len(entries) > 0:
+                self._newest_upload_s = max(
+                    self._newest_upload_s or 0.0,
+                    max(upload_s for _, upload_s in entries),
+                )
+            self.last_sync_s = time_s
+            self.sync_count += 1
+        finally:
+            self._mutex.unlock()
+        return dirty_key_list
+
+    # Clears a key refetched with the given lastUploadTime in seconds, unless an
+    # upload newer than it was seen meanwhile
+    def clean(self, key: str, upload_s: float) -> None:
+        if key not in self._dirty:
+            return
+        self._mutex.lock()
+        try:
+            if self._dirty.get(key, upload_s + 1) <= upload_s:
+                del self._dirty[key]
+        finally:
+            self._mutex.unlock()
+
+    def is_dirty(self, key: str) -> bool:
+        return key in self._dirty
+
+    # Newest upload seen of a dirty key, None when it is clean
+    def get_dirty_upload_time(self, key: str) -> Optional[float]:
+        return self._dirty.get(key)
+
+    def dirty_keys(self) -> List[str]:
+        self._mutex.lock()
+        try:
+            return list(self._dirty)
+        finally:
+            self._mutex.unlock()
+
+    # Whether a clean entry fetched at update_time_s is known to match upstream
+    def covers(self, update_time_s: float, time_s: Optional[float] = None) -> bool:
+        time_s = time_s if time_s is not None else time.time()
+        covered_since_s = self.covered_since_s
+        last_sync_s = self.last_sync_s
+        return (
+            covered_since_s is not None
+            and last_sync_s is not None
+            and time_s - last_sync_s <= STALE_S
+            and update_time_s >= covered_since_s
+        )
+
+    def stats(self) -> str:
+        return (
+            f"Delta sync: {self.sync_count} syncs, {self.gap_count} gaps, "
+            f"{len(self._dirty)} items dirty"
+        )
@@ -0,0 +1,90 @@
+import time
+from typing import Optional
+from cache import PersistMapping
+
+from universalis.models import Listings
+
+WEEK_S = 3600 * 24 * 7
+MIN_TTL_S = 60 * 5
+MAX_TTL_S = 3600 * 24
+UPLOAD_INTERVAL_SMOOTHING = 0.3  # Weight of the newest sample in the moving average
+MAX_BACKOFF_STEPS = 4  # TTL doubles for each refetch that found no new upload
+
+
+class ItemFreshness:
+    def __init__(
+        self, last_upload_time_s: float, upload_interval_s: float, sale_velocity: float
+    ) -> None:
+        self.last_upload_time_s = last_upload_time_s
+        self.upload_interval_s = upload_interval_s
+        self.sale_velocity = sale_velocity
+        self.unchanged_count = 0
+        self.ttl_s = MIN_TTL_S
+
+
+# Picks each item's cache TTL from how often its listings are uploaded and how fast
+# it sells. Listings only change when someone uploads them, so an item is not
+# refetched much sooner than its next expected upload, and slow sellers wait for
+# their next expected sale. Refetches that find the same lastUploadTime back off.
+class FreshnessPolicy:
+    def __init__(self, filename: str, default_ttl_s: float) -> None:
+        self.default_ttl_s = default_ttl_s
+        self.items: PersistMapping[str, ItemFreshness] = PersistMapping(filename)
+
+    def ttl_s(self, key: str) -> float:
+        item_freshness = self.items.get(key)
+        return (
+            item_freshness.ttl_s if item_freshness is not None else self.default_ttl_s
+        )
+
+    def observe(
+        self, key: str, listings: Listings, time_s: Optional[float] = None
+    ) -> None:
+        self.observe_upload(
+            key, listings.lastUploadTime / 1000, listings.regularSaleVelocity, time_s
+        )
+
+    # As observe, for fetches that return only the upload time and sale velocity
+    def observe_upload(
+        self,
+        key: str,
+        upload_time_s: float,
+        sale_velocity: float,
+        time_s: Optional[float] = None,
+    ) -> None:
+        time_s = time_s if time_s is not None else time.time()
+        # Age at fetch time averages to the upload interval regardless of how often
+        # the item is fetched
+        upload_age_s = max(time_s - upload_time_s, 0.0)
+        item_freshness = self.items.get(key)
+        if item_freshness is None:
+            item_freshness = ItemFreshness(upload_time_s, upload_age_s, sale_velocity)
+        elif upload_time_s == item_freshness.last_upload_time_s:
+            item_freshness.unchanged_count = min(
+                item_freshness.unchanged_count + 1, MAX_BACKOFF_STEPS
+            )
+        else:
+            item_freshness.last_upload_time_s = upload_time_s
+            item_freshness.upload_interval_s += UPLOAD_INTERVAL_SMOOTHING * (
+                upload_age_s - item_freshness.upload_interval_s
+            )
+            item_freshness.unchanged_count = 0
+        item_freshness.sale_velocity = sale_velocity
+
+        sale_interval_s = (
+            WEEK_S / item_freshness.sale_velocity
+            if item_freshness.sale_velocity > 0
+            else MAX_TTL_S
+        )
+        item_freshness.ttl_s = min(
+            max(
+                max(item_freshness.upload_interval_s, sale_interval_s)
+                * 2**item_freshness.unchanged_count,
+                MIN_TTL_S,
+            ),
+            MAX_TTL_S,
+        )
+        self.items[key] = item_freshness
+
+    def save_to_disk(self) -> None:
+        self.items.save_to_disk()
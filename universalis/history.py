@@ -0,0 +1,313 @@
+from typing import TYPE_CHECKING, Any, Iterable, Tuple
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+from universalis.listingTable import ListingTable
+
+HistoryColumns = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+# start, width_s, open, high, low, close, volume, count
+BucketColumns = Tuple[
+    np.ndarray,
+    np.ndarray,
+    np.ndarray,
+    np.ndarray,
+    np.ndarray,
+    np.ndarray,
+    np.ndarray,
+    np.ndarray,
+]
+
+INITIAL_CAPACITY = 16
+HOUR_S = 3600
+DAY_S = 3600 * 24
+# Older points are kept as hourly buckets. Covers the longest SaleStats window, which
+# reads raw points.
+RAW_HISTORY_S = DAY_S * 30
+HOURLY_HISTORY_S = DAY_S * 90  # Older hourly buckets are merged into daily ones
+
+
+def listing_columns(
+    listing_list: Iterable[Any], timestamp_field: str
+) -> HistoryColumns:
+    if isinstance(listing_list, ListingTable):
+        timestamp = (
+            listing_list.timestamp
+            if timestamp_field == "timestamp"
+            else listing_list.last_review_time
+        )
+        present = timestamp != 0
+        return (
+            timestamp[present],
+            listing_list.price_per_unit[present],
+            listing_list.quantity[present],
+            listing_list.hq[present],
+        )
+    rows = [
+        (
+            getattr(listing, timestamp_field),
+            listing.pricePerUnit,
+            listing.quantity,
+            listing.hq,
+        )
+        for listing in listing_list
+        if getattr(listing, timestamp_field) is not None
+    ]
+    return (
+        np.fromiter((row[0] for row in rows), np.int64, len(rows)),
+        np.fromiter((row[1] for row in rows), np.int64, len(rows)),
+        np.fromiter((row[2] for row in rows), np.int32, len(rows)),
+        np.fromiter((row[3] for row in rows), np.bool_, len(rows)),
+    )
+
+
+# The rows at index of each column
+def _take(columns: Tuple[np.ndarray, ...], index: Any) -> Any:
+    return tuple(column[index] for column in columns)
+
+
+def _empty_buckets() -> BucketColumns:
+    return (
+        np.empty(0, np.int64),
+        np.empty(0, np.int32),
+        np.empty(0, np.int64),
+        np.empty(0, np.int64),
+        np.empty(0, np.int64),
+        np.empty(0, np.int64),
+        np.empty(0, np.int64),
+        np.empty(0, np.int32),
+    )
+
+
+# Buckets of width 0, one per point
+def _point_buckets(columns: HistoryColumns) -> BucketColumns:
+    timestamp, price, quantity, _ = columns
+    return (
+        timestamp,
+        np.zeros(len(timestamp), np.int32),
+        price,
+        price,
+        price,
+        price,
+        quantity.astype(np.int64),
+        np.ones(len(timestamp), np.int32),
+    )
+
+
+# Merges buckets into buckets of width_s aligned to multiples of width_s, keeping
+# open and close in time order
+def _aggregate(buckets: BucketColumns, width_s: int) -> BucketColumns:
+    if len(buckets[0]) == 0:
+        return _empty_buckets()
+    start = buckets[0] // width_s * width_s
+    order = np.lexsort((buckets[0], start))
+    start = start[order]
+    buckets = _take(buckets, order)
+    first = np.flatnonzero(np.concatenate(([True], start[1:] != start[:-1])))
+    last = np.concatenate((first[1:], [len(start)])) - 1
+    return (
+        start[first],
+        np.full(len(first), width_s, np.int32),
+        buckets[2][first],
+        np.maximum.reduceat(buckets[3], first),
+        np.minimum.reduceat(buckets[4], first),
+        buckets[5][last],
+        np.add.reduceat(buckets[6], first),
+        np.add.reduceat(buckets[7], first).astype(np.int32),
+    )
+
+
+def _concat_buckets(*bucket_list: BucketColumns) -> BucketColumns:
+    return tuple(np.concatenate(columns) for columns in zip(*bucket_list))  # type: ignore
+
+
+# Append-only time series of (timestamp, price, quantity, hq) points sorted by
+# timestamp. Columns are over-allocated so new points are appended in place, readers
+# take the (columns, size) snapshot in _state and never see a partial write.
+#
+# downsample() folds points older than RAW_HISTORY_S into hourly OHLC and volume
+# buckets, and hourly buckets older than HOURLY_HISTORY_S into daily ones, so an
+# item's history stops growing with the length of the session. Points older than
+# raw_start_s are already in the buckets and are dropped by merge.
+class History:
+    def __init__(self) -> None:
+        self._state: Tuple[HistoryColumns, int] = (
+            (
+                np.empty(INITIAL_CAPACITY, np.int64),
+                np.empty(INITIAL_CAPACITY, np.int64),
+                np.empty(INITIAL_CAPACITY, np.int32),
+                np.empty(INITIAL_CAPACITY, np.bool_),
+            ),
+            0,
+        )
+        self._buckets: BucketColumns = _empty_buckets()
+        self.raw_start_s = 0
+
+    @classmethod
+    def from_dataframe(cls, df: "pd.DataFrame") -> "History":
+        history = cls()
+        if len(df.index) > 0:
+            history.merge(
+                np.asarray(df.index, np.int64),
+                np.asarray(df["Price"], np.int64),
+                np.ones(len(df.index), np.int32),
+                np.zeros(len(df.index), np.bool_),
+            )
+        return history
+
+    def __len__(self) -> int:
+        return self._state[1]
+
+    def columns(self) -> HistoryColumns:
+        columns, size = self._state
+        return (
+            columns[0][:size],
+            columns[1][:size],
+            columns[2][:size],
+            columns[3][:size],
+        )
+
+    @property
+    def timestamp(self) -> np.ndarray:
+        return self.columns()[0]
+
+    @property
+    def price(self) -> np.ndarray:
+        return self.columns()[1]
+
+    @property
+    def quantity(self) -> np.ndarray:
+        return self.columns()[2]
+
+    @property
+    def hq(self) -> np.ndarray:
+        return self.columns()[3]
+
+    def buckets(self) -> BucketColumns:
+        return self._buckets
+
+    # Merges a batch of points, dropping exact duplicates. Returns the points that
+    # were not already in the history.
+    def merge(
+        self,
+        timestamp: np.ndarray,
+        price: np.ndarray,
+        quantity: np.ndarray,
+        hq: np.ndarray,
+    ) -> HistoryColumns:
+        if self.raw_start_s > 0 and len(timestamp) > 0:
+            recent = timestamp >= self.raw_start_s
+            if not recent.all():
+                timestamp, price, quantity, hq = (
+                    timestamp[recent],
+                    price[recent],
+                    quantity[recent],
+                    hq[recent],
+                )
+        if len(timestamp) == 0:
+            return (timestamp, price, quantity, hq)
+        columns, size = self._state
+        # Only the existing points at or after the oldest new point can overlap
+        start = int(np.searchsorted(columns[0][:size], timestamp.min(), side="left"))
+        origin = np.concatenate(
+            (np.zeros(size - start, np.bool_), np.ones(len(timestamp), np.bool_))
+        )
+        merged = tuple(
+            np.concatenate((column[start:size], batch_column))
+            for column, batch_column in zip(columns, (timestamp, price, quantity, hq))
+        )
+        # Existing points sort ahead of equal new points so they win the dedup
+        order = np.lexsort((origin, merged[3], merged[2], merged[1], merged[0]))
+        origin = origin[order]
+        merged = tuple(column[order] for column in merged)
+        keep = np.ones(len(origin), np.bool_)
+        keep[1:] = (
+            (merged[0][1:] != merged[0][:-1])
+            | (merged[1][1:] != merged[1][:-1])
+            | (merged[2][1:] != merged[2][:-1])
+            | (merged[3][1:] != merged[3][:-1])
+        )
+        new = keep & origin
+        new_points: HistoryColumns = tuple(column[new] for column in merged)  # type: ignore
+        if len(new_points[0]) == 0:
+            return new_points
+        merged = tuple(column[keep] for column in merged)
+        new_size = start + len(merged[0])
+
+        if new_size <= len(columns[0]) and not origin[keep][: size - start].any():
+            # Pure append: existing tail is unchanged, write past the current size
+            for column, merged_column in zip(columns, merged):
+                column[size:new_size] = merged_column[size - start :]
+            self._state = (columns, new_size)
+        else:
+            # New points interleave with existing ones or the columns are full:
+            # build new columns so readers of the old snapshot are unaffected
+            capacity = max(len(columns[0]), INITIAL_CAPACITY)
+            while capacity < new_size:
+                capacity *= 2
+            new_columns = tuple(np.empty(capacity, column.dtype) for column in columns)
+            for column, new_column, merged_column in zip(columns, new_columns, merged):
+                new_column[:start] = column[:start]
+                new_column[start:new_size] = merged_column
+            self._state = (new_columns, new_size)  # type: ignore
+        return new_points
+
+    def merge_listings(
+        self, listing_list: Iterable[Any], timestamp_field: str
+    ) -> HistoryColumns:
+        return self.merge(*listing_columns(listing_list, timestamp_field))
+
+    # Moves points and hourly buckets past their age into coarser buckets. Returns
+    # the number of points moved.
+    def downsample(self, time_s: float) -> int:
+        raw_start_s = int(time_s - RAW_HISTORY_S) // HOUR_S * HOUR_S
+        daily_start_s = int(time_s - HOURLY_HISTORY_S) // DAY_S * DAY_S
+        columns, size = self._state
+        point_count = int(np.searchsorted(columns[0][:size], raw_start_s))
+        buckets = self._buckets
+        hourly = buckets[1] == HOUR_S
+        if point_count == 0 and not (hourly & (buckets[0] < daily_start_s)).any():
+            return 0
+        buckets = _concat_buckets(
+            buckets,
+            _aggregate(_point_buckets(_take(columns, slice(point_count))), HOUR_S),
+        )
+        daily = (buckets[1] == DAY_S) | (buckets[0] < daily_start_s)
+        self._buckets = _concat_buckets(
+            _aggregate(_take(buckets, daily), DAY_S),
+            _aggregate(_take(buckets, ~daily), HOUR_S),
+        )
+        # New columns so readers of the old snapshot are unaffected
+        new_size = size - point_count
+        capacity = max(INITIAL_CAPACITY, new_size)
+        new_columns = tuple(np.empty(capacity, column.dtype) for column in columns)
+        for column, new_column in zip(columns, new_columns):
+            new_column[:new_size] = column[point_count:size]
+        self._state = (new_columns, new_size)  # type: ignore
+        self.raw_start_s = max(self.raw_start_s, raw_start_s)
+        return point_count
+
+    # pandas is imported on first use, it is slow to import and only the price
+    # graph needs it
+    def to_dataframe(self) -> "pd.DataFrame":
+        import pandas as pd
+
+        timestamp, price, quantity, hq = self.columns()
+        return pd.DataFrame(
+            {"Price": price, "Quantity": quantity, "HQ": hq},
+            index=pd.Index(timestamp.copy(), name="Timestamp"),
+        )
+
+    def __getstate__(self) -> dict:
+        return {
+            "columns": tuple(column.copy() for column in self.columns()),
+            "buckets": self._buckets,
+            "raw_start_s": self.raw_start_s,
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        columns = state["columns"]
+        self._state = (columns, len(columns[0]))
+        self._buckets = state.get("buckets", _empty_buckets())
+        self.raw_start_s = state.get("raw_start_s", 0)
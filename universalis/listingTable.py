@@ -0,0 +1,223 @@
+import sys
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+import numpy as np
+
+FIELD_NAMES = (
+    "listingID",
+    "lastReviewTime",
+    "pricePerUnit",
+    "quantity",
+    "hq",
+    "isCrafted",
+    "retainerName",
+    "sellerID",
+    "total",
+    "timestamp",
+    "worldID",
+)
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+
+# One row of a ListingTable, with the same fields as models.Listing
+class ListingRecord:
+    __slots__ = FIELD_NAMES
+
+    def __init__(self, **kwargs: Any) -> None:
+        for field_name in FIELD_NAMES:
+            setattr(self, field_name, kwargs.get(field_name))
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in FIELD_NAMES)
+        return f"ListingRecord({fields})"
+
+
+# Columnar store for the listings or sales of one item. Each field is a NumPy
+# column, missing timestamps and world ids are stored as 0 and seller ids and
+# retainer names are interned so repeated sellers across items share one string.
+class ListingTable:
+    __slots__ = (
+        "listing_id",
+        "last_review_time",
+        "price_per_unit",
+        "quantity",
+        "hq",
+        "is_crafted",
+        "retainer_name",
+        "seller_id",
+        "total",
+        "timestamp",
+        "world_id",
+    )
+
+    def __init__(self, listing_list: Iterable[Any] = ()) -> None:
+        rows = [
+            listing if isinstance(listing, dict) else listing.__dict__
+            for listing in listing_list
+        ]
+        self.listing_id = np.array([row.get("listingID") for row in rows], dtype=object)
+        self.last_review_time = np.fromiter(
+            (row.get("lastReviewTime") or 0 for row in rows), np.int64, len(rows)
+        )
+        self.price_per_unit = np.fromiter(
+            (row["pricePerUnit"] for row in rows), np.int64, len(rows)
+        )
+        self.quantity = np.fromiter(
+            (row["quantity"] for row in rows), np.int32, len(rows)
+        )
+        self.hq = np.fromiter((row["hq"] for row in rows), np.bool_, len(rows))
+        self.is_crafted = np.fromiter(
+            (bool(row.get("isCrafted")) for row in rows), np.bool_, len(rows)
+        )
+        self.retainer_name = np.array(
+            [_intern(row.get("retainerName")) for row in rows], dtype=object
+        )
+        self.seller_id = np.array(
+            [_intern(row.get("sellerID")) for row in rows], dtype=object
+        )
+        self.total = np.fromiter((row["total"] for row in rows), np.int64, len(rows))
+        self.timestamp = np.fromiter(
+            (row.get("timestamp") or 0 for row in rows), np.int64, len(rows)
+        )
+        self.world_id = np.fromiter(
+            (row.get("worldID") or 0 for row in rows), np.int32, len(rows)
+        )
+
+    # pydantic v1 custom type hooks, API responses arrive as lists of dicts
+    @classmethod
+    def __get_validators__(cls) -> Generator[Callable[..., Any], None, None]:
+        yield cls.validate
+
+    @classmethod
+    def validate(cls, value: Any) -> "ListingTable":
+        if isinstance(value, ListingTable):
+            return value
+        if isinstance(value, list):
+            return cls(value)
+        raise TypeError("ListingTable requires a list of listings")
+
+    def __len__(self) -> int:
+        return len(self.price_per_unit)
+
+    def __iter__(self) -> Iterator[ListingRecord]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def __getitem__(self, index: int) -> ListingRecord:
+        return ListingRecord(
+            listingID=self.listing_id[index],
+            lastReviewTime=int(self.last_review_time[index]) or None,
+            pricePerUnit=int(self.price_per_unit[index]),
+            quantity=int(self.quantity[index]),
+            hq=bool(self.hq[index]),
+            isCrafted=bool(self.is_crafted[index]),
+            retainerName=self.retainer_name[index],
+            sellerID=self.seller_id[index],
+            total=int(self.total[index]),
+            timestamp=int(self.timestamp[index]) or None,
+            worldID=int(self.world_id[index]) or None,
+        )
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, ListingTable):
+            return NotImplemented
+        return all(
+            np.array_equal(getattr(self, field_name), getattr(other, field_name))
+            for field_name in self.__slots__
+        )
+
+    def _with_columns(self, get_column: Callable[[str], np.ndarray]) -> "ListingTable":
+        listing_table = ListingTable.__new__(ListingTable)
+        for field_name in self.__slots__:
+            setattr(listing_table, field_name, get_column(field_name))
+        return listing_table
+
+    def concat(self, other: "ListingTable") -> "ListingTable":
+        return self._with_columns(
+            lambda field_name: np.concatenate(
+                (getattr(self, field_name), getattr(other, field_name))
+            )
+        )
+
+    def filter(self, mask: np.ndarray) -> "ListingTable":
+        return self._with_columns(lambda field_name: getattr(self, field_name)[mask])
+
+    # Drops the rows that match a row of other, by listing id where both have one
+    # and otherwise by retainer, price and quantity
+    def without(self, other: "ListingTable") -> "ListingTable":
+        listing_id_set = {
+            listing_id for listing_id in other.listing_id if listing_id is not None
+        }
+        row_set = set(
+            zip(
+                other.retainer_name.tolist(),
+                other.price_per_unit.tolist(),
+                other.quantity.tolist(),
+            )
+        )
+        mask = np.fromiter(
+            (
+                listing_id not in listing_id_set
+                if listing_id is not None
+                else row not in row_set
+                for listing_id, row in zip(
+                    self.listing_id,
+                    zip(
+                        self.retainer_name.tolist(),
+                        self.price_per_unit.tolist(),
+                        self.quantity.tolist(),
+                    ),
+                )
+            ),
+            np.bool_,
+            len(self),
+        )
+        return self.filter(mask)
+
+    def has_seller(self, seller_id: Optional[str]) -> bool:
+        return seller_id is not None and bool((self.seller_id == seller_id).any())
+
+    # Row positions of each seller's listings
+    def seller_positions(self) -> Dict[str, Tuple[int, ...]]:
+        positions: Dict[str, List[int]] = {}
+        for index, seller_id in enumerate(self.seller_id):
+            if seller_id is not None:
+                positions.setdefault(seller_id, []).append(index)
+        return {
+            seller_id: tuple(index_list) for seller_id, index_list in positions.items()
+        }
+
+    def min_price(self, exclude_seller_id: Optional[str] = None) -> Optional[int]:
+        price_per_unit = (
+            self.price_per_unit[self.seller_id != exclude_seller_id]
+            if exclude_seller_id is not None
+            else self.price_per_unit
+        )
+        return int(price_per_unit.min()) if len(price_per_unit) > 0 else None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {field_name: getattr(self, field_name) for field_name in self.__slots__}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        for field_name, value in state.items():
+            setattr(self, field_name, value)
+        if "listing_id" not in state:
+            self.listing_id = np.full(len(self.price_per_unit), None, dtype=object)
+        if "world_id" not in state:
+            self.world_id = np.zeros(len(self.price_per_unit), np.int32)
+        # Unpickled strings are separate copies
+        for column in (self.retainer_name, self.seller_id):
+            for index, value in enumerate(column):
+                column[index] = _intern(value)
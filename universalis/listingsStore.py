@@ -0,0 +1,320 @@
+import itertools
+import json
+import logging
+from pathlib import Path
+import pickle
+import sqlite3
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Tuple,
+)
+from PySide6.QtCore import QMutex
+
+from universalis.models import Listings
+
+_logger = logging.getLogger(__name__)
+
+CacheEntry = Tuple[Listings, float]
+SellerPositions = Dict[str, Tuple[int, ...]]  # key: listing positions
+
+SCHEMA_VERSION = 1  # 1: sellers table
+EVICTION_TARGET = 0.9  # Eviction frees down to this fraction of the budget
+
+
+# Listings cache backed by SQLite in WAL mode. Only the key index is read at
+# startup, entries are unpickled on first access and every write is committed as
+# it happens so a crash loses at most the write in progress.
+#
+# Entries in memory are bounded by memory_budget_bytes, measured by their pickled
+# size. Once over it the least recently used entries are dropped from memory in
+# one batch, they are already on disk and are unpickled again on their next access.
+#
+# The sellers table indexes the listings of every entry by seller id and is
+# written in the same transaction as the entry, so finding a seller's items is a
+# lookup instead of a scan over every cached item.
+class ListingsStore(MutableMapping[str, CacheEntry]):
+    def __init__(
+        self, filename: str, memory_budget_bytes: Optional[int] = None
+    ) -> None:
+        self.memory_budget_bytes = memory_budget_bytes
+        self.file_path = Path(f".data/{filename}")
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        self._mutex = QMutex()
+        self._connection = sqlite3.connect(
+            self.file_path, check_same_thread=False, isolation_level=None
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS listings "
+            "(key TEXT PRIMARY KEY, update_time REAL NOT NULL, data BLOB NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS sellers (seller_id TEXT NOT NULL, "
+            "key TEXT NOT NULL, positions TEXT NOT NULL, PRIMARY KEY (seller_id, key))"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS sellers_key ON sellers (key)"
+        )
+        self._update_times: Dict[str, float] = dict(
+            self._connection.execute("SELECT key, update_time FROM listings")
+        )
+        self._data: Dict[str, CacheEntry] = {}
+        self._sizes: Dict[str, int] = {}  # Pickled size of the entries in _data
+        # Access order of the entries in _data, written without locking
+        self._last_access: Dict[str, int] = {}
+        self._access_counter = itertools.count()
+        self.resident_bytes = 0
+        self.eviction_count = 0
+        self.load_count = 0
+        # seller id: SellerPositions, each seller read from the sellers table on
+        # first lookup and kept current as entries are written
+        self._seller_index: Dict[str, SellerPositions] = {}
+        if self._connection.execute("PRAGMA user_version").fetchone()[0] < 1:
+            self._build_seller_table()
+
+    # Stores written before the sellers table existed are indexed once
+    def _build_seller_table(self) -> None:
+        rows = []
+        for key, data in self._connection.execute("SELECT key, data FROM listings"):
+            rows.extend(
+                self._get_seller_rows(
+                    key, pickle.loads(data).listings.seller_positions()
+                )
+            )
+        with self._connection:
+            self._connection.execute("BEGIN")
+            self._connection.execute("DELETE FROM sellers")
+            self._connection.executemany(
+                "INSERT INTO sellers (seller_id, key, positions) VALUES (?, ?, ?)",
+                rows,
+            )
+            self._connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        if len(self._update_times) > 0:
+            _logger.info(f"Indexed sellers of {len(self._update_times)} listings")
+
+    @staticmethod
+    def _get_seller_rows(
+        key: str, seller_positions: Dict[str, Tuple[int, ...]]
+    ) -> List[Tuple[str, str, str]]:
+        return [
+            (seller_id, key, json.dumps(positions))
+            for seller_id, positions in seller_positions.items()
+        ]
+
+    # Replaces the index entries of key for the sellers already read, with the mutex
+    # held
+    def _index_sellers(
+        self, key: str, seller_positions: Dict[str, Tuple[int, ...]]
+    ) -> None:
+        for seller_id, key_positions in self._seller_index.items():
+            if seller_id in seller_positions:
+                key_positions[key] = seller_positions[seller_id]
+            else:
+                key_positions.pop(key, None)
+
+    # Keys and listing positions of every entry the seller has listings in
+    def get_seller_positions(self, seller_id: str) -> SellerPositions:
+        self._mutex.lock()
+        try:
+            key_positions = self._seller_index.get(seller_id)
+            if key_positions is None:
+                key_positions = {
+                    key: tuple(json.loads(positions))
+                    for key, positions in self._connection.execute(
+                        "SELECT key, positions FROM sellers WHERE seller_id = ?",
+                        (seller_id,),
+                    )
+                }
+                self._seller_index[seller_id] = key_positions
+            return dict(key_positions)
+        finally:
+            self._mutex.unlock()
+
+    def get_seller_ids(self) -> List[str]:
+        self._mutex.lock()
+        try:
+            return [
+                row[0]
+                for row in self._connection.execute(
+                    "SELECT DISTINCT seller_id FROM sellers"
+                )
+            ]
+        finally:
+            self._mutex.unlock()
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._update_times
+
+    def __len__(self) -> int:
+        return len(self._update_times)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._update_times))
+
+    def get_update_time(self, key: str) -> Optional[float]:
+        return self._update_times.get(key)
+
+    def __getitem__(self, key: str) -> CacheEntry:
+        entry = self._data.get(key)
+        if entry is not None:
+            self._last_access[key] = next(self._access_counter)
+            return entry
+        self._mutex.lock()
+        try:
+            row = self._connection.execute(
+                "SELECT data, update_time FROM listings WHERE key = ?", (key,)
+            ).fetchone()
+        finally:
+            self._mutex.unlock()
+        if row is None:
+            raise KeyError(key)
+        entry = (pickle.loads(row[0]), row[1])
+        self._mutex.lock()
+        try:
+            # Another thread may have stored a newer entry while this one was loading
+            if key in self._data:
+                return self._data[key]
+            self.load_count += 1
+            self._set_resident(key, entry, len(row[0]))
+            self._evict()
+        finally:
+            self._mutex.unlock()
+        return entry
+
+    # Keeps an entry in memory, with the mutex held
+    def _set_resident(self, key: str, entry: CacheEntry, size: int) -> None:
+        self._data[key] = entry
+        self.resident_bytes += size - self._sizes.get(key, 0)
+        self._sizes[key] = size
+        self._last_access[key] = next(self._access_counter)
+
+    # Drops an entry from memory, with the mutex held
+    def _drop_resident(self, key: str) -> None:
+        self._data.pop(key, None)
+        self.resident_bytes -= self._sizes.pop(key, 0)
+        self._last_access.pop(key, None)
+
+    # Drops the least recently used entries once over budget, with the mutex held
+    def _evict(self) -> None:
+        if (
+            self.memory_budget_bytes is None
+            or self.resident_bytes <= self.memory_budget_bytes
+        ):
+            return
+        target_bytes = self.memory_budget_bytes * EVICTION_TARGET
+        last_access = dict(self._last_access)
+        for key in sorted(self._data, key=lambda key: last_access.get(key, 0)):
+            if self.resident_bytes <= target_bytes:
+                break
+            self._drop_resident(key)
+            self.eviction_count += 1
+
+    def set_memory_budget(self, memory_budget_bytes: Optional[int]) -> None:
+        self._mutex.lock()
+        try:
+            self.memory_budget_bytes = memory_budget_bytes
+            self._evict()
+        finally:
+            self._mutex.unlock()
+
+    def stats(self) -> str:
+        return (
+            f"Listings in memory: {len(self._data)} of {len(self)}, "
+            f"{self.resident_bytes / 1024 ** 2:,.1f} MB"
+            + (
+                f" of {self.memory_budget_bytes / 1024 ** 2:,.1f} MB"
+                if self.memory_budget_bytes is not None
+                else ""
+            )
+            + f", {self.eviction_count} evicted, {self.load_count} loaded from disk"
+        )
+
+    def __setitem__(self, key: str, value: CacheEntry) -> None:
+        self.update({key: value})
+
+    # Writes all entries in one transaction
+    def update(self, entries: Mapping[str, CacheEntry]) -> None:  # type: ignore[override]
+        rows = [
+            (key, value[1], pickle.dumps(value[0], pickle.HIGHEST_PROTOCOL))
+            for key, value in entries.items()
+        ]
+        seller_positions = {
+            key: value[0].listings.seller_positions() for key, value in entries.items()
+        }
+        self._mutex.lock()
+        try:
+            with self._connection:
+                self._connection.execute("BEGIN")
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO listings (key, update_time, data) "
+                    "VALUES (?, ?, ?)",
+                    rows,
+                )
+                self._connection.executemany(
+                    "DELETE FROM sellers WHERE key = ?", [(key,) for key in entries]
+                )
+                self._connection.executemany(
+                    "INSERT INTO sellers (seller_id, key, positions) VALUES (?, ?, ?)",
+                    [
+                        row
+                        for key, positions in seller_positions.items()
+                        for row in self._get_seller_rows(key, positions)
+                    ],
+                )
+            for key, positions in seller_positions.items():
+                self._index_sellers(key, positions)
+            for key, update_time, data in rows:
+                self._set_resident(key, entries[key], len(data))
+            self._update_times.update((key, value[1]) for key, value in entries.items())
+            self._evict()
+        finally:
+            self._mutex.unlock()
+
+    def __delitem__(self, key: str) -> None:
+        self._mutex.lock()
+        try:
+            with self._connection:
+                self._connection.execute("BEGIN")
+                self._connection.execute("DELETE FROM listings WHERE key = ?", (key,))
+                self._connection.execute("DELETE FROM sellers WHERE key = ?", (key,))
+            self._index_sellers(key, {})
+            self._drop_resident(key)
+            del self._update_times[key]
+        finally:
+            self._mutex.unlock()
+
+    def clear(self) -> None:
+        self._mutex.lock()
+        try:
+            with self._connection:
+                self._connection.execute("BEGIN")
+                self._connection.execute("DELETE FROM listings")
+                self._connection.execute("DELETE FROM sellers")
+            self._data.clear()
+            self._sizes.clear()
+            self._last_access.clear()
+            self.resident_bytes = 0
+            for key_positions in self._seller_index.values():
+                key_positions.clear()
+            self._update_times.clear()
+        finally:
+            self._mutex.unlock()
+
+    # Folds the write-ahead log back into the database file
+    def flush(self) -> None:
+        self._mutex.lock()
+        try:
+            self._connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            self._mutex.unlock()
+
+    def close(self) -> None:
+        self.flush()
+        self._connection.close()
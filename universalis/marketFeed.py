@@ -0,0 +1,111 @@
+import logging
+import time
+from typing import Optional
+from PySide6.QtCore import QByteArray, QObject, QTimer, QUrl, Signal, Slot
+from PySide6.QtNetwork import QAbstractSocket
+from PySide6.QtWebSockets import QWebSocket
+
+from universalis import bsonCodec
+from universalis.universalis import apply_market_event, set_live_feed
+
+_logger = logging.getLogger(__name__)
+
+UNIVERSALIS_WS_URL = "wss://universalis.app/api/ws"
+EVENT_CHANNELS = ("listings/add", "listings/remove", "sales/add")
+RECONNECT_MIN_S = 1.0
+RECONNECT_MAX_S = 60.0
+
+
+# Subscribes to the Universalis websocket feed for one world and applies listing and
+# sale events to the listings cache as they arrive. While connected the cache
+# treats entries as current, so polling falls back to an occasional resync, and
+# when the connection drops polling takes over until it reconnects.
+class MarketFeed(QObject):
+    item_changed = Signal(int)  # item id
+    live_changed = Signal(bool)
+
+    def __init__(
+        self,
+        world_id: int,
+        url: str = UNIVERSALIS_WS_URL,
+        parent: Optional[QObject] = None,
+    ) -> None:
+        super().__init__(parent)
+        self.world_id = world_id
+        self.url = url
+        self.event_count = 0
+        self.applied_event_count = 0
+        self._reconnect_s = RECONNECT_MIN_S
+        self._running = False
+        self._web_socket: Optional[QWebSocket] = None
+
+    # Creates the socket in the thread the feed lives in
+    @Slot()
+    def start(self) -> None:
+        self._running = True
+        self._web_socket = QWebSocket()
+        self._web_socket.setParent(self)
+        self._web_socket.connected.connect(self._on_connected)
+        self._web_socket.disconnected.connect(self._on_disconnected)
+        self._web_socket.binaryMessageReceived.connect(self._on_binary_message)
+        self._web_socket.open(QUrl(self.url))
+
+    @Slot()
+    def stop(self) -> None:
+        self._running = False
+        if self._web_socket is not None:
+            self._web_socket.close()
+
+    def is_live(self) -> bool:
+        return (
+            self._web_socket is not None
+            and self._web_socket.state() == QAbstractSocket.ConnectedState
+        )
+
+    @Slot()
+    def _on_connected(self) -> None:
+        for channel in EVENT_CHANNELS:
+            self._web_socket.sendBinaryMessage(
+                QByteArray(
+                    bsonCodec.encode(
+                        {
+                            "event": "subscribe",
+                            "channel": f"{channel}{{world={self.world_id}}}",
+                        }
+                    )
+                )
+            )
+        _logger.info(f"Market feed connected to {self.url}")
+        self._reconnect_s = RECONNECT_MIN_S
+        set_live_feed(time.time())
+        self.live_changed.emit(True)
+
+    @Slot()
+    def _on_disconnected(self) -> None:
+        set_live_feed(None)
+        self.live_changed.emit(False)
+        if self._running:
+            _logger.info(f"Market feed disconnected, retrying in {self._reconnect_s}s")
+            QTimer.singleShot(int(self._reconnect_s * 1000), self._reconnect)
+            self._reconnect_s = min(self._reconnect_s * 2, RECONNECT_MAX_S)
+
+    @Slot()
+    def _reconnect(self) -> None:
+        if self._running:
+            self._web_socket.open(QUrl(self.url))
+
+    @Slot(QByteArray)
+    def _on_binary_message(self, message: QByteArray) -> None:
+        self.event_count += 1
+        try:
+            content = bsonCodec.decode(message.data())
+            if content.get("world") != self.world_id:
+                return
+            rows = content.get("listings", content.get("sales", []))
+            if apply_market_event(
+                content["event"], content["item"], self.world_id, rows
+            ):
+                self.applied_event_count += 1
+                self.item_changed.emit(content["item"])
+        except (KeyError, TypeError, ValueError) as e:
+            _logger.log(logging.WARN, f"Bad market feed message: {e}")
@@ -1,10 +1,14 @@
+import time
 from typing import Any, Dict, List, Optional, Tuple, Type, Union
 from pydantic import BaseModel
 from pydantic_collections import BaseCollectionModel
-import pandas as pd
+from universalis.history import History
+from universalis.listingTable import ListingTable
+from universalis.saleStats import SaleStats
 
 
 class Listing(BaseModel):
+    listingID: Optional[str]
     lastReviewTime: Optional[int]
     pricePerUnit: int
     quantity: int
@@ -14,6 +18,7 @@ class Listing(BaseModel):
     sellerID: Optional[str]
     total: int
     timestamp: Optional[int]
+    worldID: Optional[int]  # Set in data center responses
 
 
 # class History(BaseModel):
@@ -24,10 +29,12 @@ class Listings(BaseModel):
     itemID: int
     worldID: Optional[int]
     lastUploadTime: int
-    listings: List[Listing]
-    recentHistory: List[Listing]
-    history: Optional[Union[pd.DataFrame, str]] = None
-    listing_history: Optional[Union[pd.DataFrame, str]] = None
+    # Parsed from the API into compact tables rather than one Listing per row
+    listings: ListingTable
+    recentHistory: ListingTable
+    history: Optional[History] = None
+    listing_history: Optional[History] = None
+    sale_stats: Optional[SaleStats] = None
     currentAveragePrice: float
     currentAveragePriceNQ: float
     currentAveragePriceHQ: float
@@ -44,6 +51,25 @@ class Listings(BaseModel):
     maxPriceNQ: int
     maxPriceHQ: int
     worldName: Optional[str]
+    dcName: Optional[str]
 
     class Config:
         arbitrary_types_allowed = True
+
+    def __setstate__(self, state: Any) -> None:
+        super().__setstate__(state)
+        # Caches written before ListingTable hold lists of Listing
+        for field_name in ("listings", "recentHistory"):
+            value = self.__dict__[field_name]
+            if not isinstance(value, ListingTable):
+                self.__dict__[field_name] = ListingTable(value)
+        # Caches written before data center queries have no dcName
+        self.__dict__.setdefault("dcName", None)
+        # Caches written before sale statistics have no sale_stats. Histories still
+        # held as DataFrames are converted, and their statistics built, on migration.
+        if self.__dict__.get("sale_stats") is None and isinstance(
+            self.__dict__.get("history"), History
+        ):
+            self.__dict__["sale_stats"] = SaleStats.from_history(
+                self.history, time.time()
+            )
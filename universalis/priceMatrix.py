@@ -0,0 +1,183 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from PySide6.QtCore import QMutex
+
+from universalis.models import Listings
+
+INITIAL_ITEM_CAPACITY = 1024
+NO_WORLD = -1
+SALE_TAX = 0.95  # As in ff14marketcalc.get_revenue
+
+
+# Items x worlds prices for one data center, filled from data center listings where
+# every row carries its world id. Holds the lowest listing and the lowest recent
+# sale per world, and after each update recomputes in one vectorized pass over the
+# updated rows the cheapest world to buy each item in and the best world to sell
+# it in. Missing prices are NaN.
+class PriceMatrix:
+    def __init__(self, world_ids: Iterable[int] = ()) -> None:
+        self._mutex = QMutex()
+        self.world_ids: List[int] = []
+        self._item_row: Dict[int, int] = {}
+        self.listing_price = np.full((INITIAL_ITEM_CAPACITY, 0), np.nan)
+        self.sale_price = np.full((INITIAL_ITEM_CAPACITY, 0), np.nan)
+        self.update_time = np.zeros(INITIAL_ITEM_CAPACITY)
+        self.cheapest_column = np.full(INITIAL_ITEM_CAPACITY, NO_WORLD, np.int16)
+        self.best_sell_column = np.full(INITIAL_ITEM_CAPACITY, NO_WORLD, np.int16)
+        self._add_worlds(world_ids)
+
+    def __len__(self) -> int:
+        return len(self._item_row)
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._item_row
+
+    def get_update_time(self, item_id: int) -> Optional[float]:
+        self._mutex.lock()
+        try:
+            row = self._item_row.get(item_id)
+            return float(self.update_time[row]) if row is not None else None
+        finally:
+            self._mutex.unlock()
+
+    def _add_worlds(self, world_ids: Iterable[int]) -> None:
+        new_world_ids = [
+            world_id
+            for world_id in dict.fromkeys(world_ids)
+            if world_id not in self.world_ids
+        ]
+        if len(new_world_ids) == 0:
+            return
+        self.world_ids.extend(new_world_ids)
+        padding = np.full((len(self.listing_price), len(new_world_ids)), np.nan)
+        self.listing_price = np.hstack((self.listing_price, padding))
+        self.sale_price = np.hstack((self.sale_price, padding))
+
+    def _get_rows(self, item_ids: Sequence[int]) -> np.ndarray:
+        for item_id in item_ids:
+            if item_id not in self._item_row:
+                self._item_row[item_id] = len(self._item_row)
+        capacity = len(self.update_time)
+        if len(self._item_row) > capacity:
+            while capacity < len(self._item_row):
+                capacity *= 2
+            grow = capacity - len(self.update_time)
+            self.listing_price = np.vstack(
+                (self.listing_price, np.full((grow, len(self.world_ids)), np.nan))
+            )
+            self.sale_price = np.vstack(
+                (self.sale_price, np.full((grow, len(self.world_ids)), np.nan))
+            )
+            self.update_time = np.concatenate((self.update_time, np.zeros(grow)))
+            self.cheapest_column = np.concatenate(
+                (self.cheapest_column, np.full(grow, NO_WORLD, np.int16))
+            )
+            self.best_sell_column = np.concatenate(
+                (self.best_sell_column, np.full(grow, NO_WORLD, np.int16))
+            )
+        return np.fromiter(
+            (self._item_row[item_id] for item_id in item_ids), np.int64, len(item_ids)
+        )
+
+    # Replaces the rows of the given data center listings
+    def update(
+        self, listings_list: Sequence[Listings], update_time_list: Sequence[float]
+    ) -> None:
+        if len(listings_list) == 0:
+            return
+        self._mutex.lock()
+        try:
+            rows = self._get_rows([listings.itemID for listings in listings_list])
+            world_id = np.concatenate(
+                [
+                    getattr(listings, field_name).world_id
+                    for listings in listings_list
+                    for field_name in ("listings", "recentHistory")
+                ]
+            )
+            self._add_worlds(np.unique(world_id[world_id != 0]).tolist())
+            self._fill(self.listing_price, rows, listings_list, "listings")
+            self._fill(self.sale_price, rows, listings_list, "recentHistory")
+            self.update_time[rows] = update_time_list
+            self._recompute(rows)
+        finally:
+            self._mutex.unlock()
+
+    def _fill(
+        self,
+        matrix: np.ndarray,
+        rows: np.ndarray,
+        listings_list: Sequence[Listings],
+        field_name: str,
+    ) -> None:
+        listing_tables = [getattr(listings, field_name) for listings in listings_list]
+        row = np.repeat(rows, [len(listing_table) for listing_table in listing_tables])
+        world_id = np.concatenate(
+            [listing_table.world_id for listing_table in listing_tables]
+        )
+        price = np.concatenate(
+            [listing_table.price_per_unit for listing_table in listing_tables]
+        )
+        # Rows without a world id are not from a data center query
+        mask = world_id != 0
+        column_lookup = np.full(max(self.world_ids, default=0) + 1, NO_WORLD)
+        column_lookup[self.world_ids] = np.arange(len(self.world_ids))
+        matrix[rows] = np.nan
+        np.fmin.at(
+            matrix,
+            (row[mask], column_lookup[world_id[mask]]),
+            price[mask].astype(np.float64),
+        )
+
+    def _recompute(self, rows: np.ndarray) -> None:
+        # No world columns until the first data center listings are added
+        if self.listing_price.shape[1] == 0:
+            self.cheapest_column[rows] = NO_WORLD
+            self.best_sell_column[rows] = NO_WORLD
+            return
+        listing_price = self.listing_price[rows]
+        buy_price = np.where(np.isnan(listing_price), np.inf, listing_price)
+        cheapest_column = buy_price.argmin(axis=1)
+        cheapest_column[np.isinf(buy_price.min(axis=1))] = NO_WORLD
+        self.cheapest_column[rows] = cheapest_column
+        # As get_revenue, the lower of the cheapest listing and the cheapest sale
+        sell_price = np.fmin(listing_price, self.sale_price[rows])
+        sell_price = np.where(np.isnan(sell_price), -np.inf, sell_price)
+        best_sell_column = sell_price.argmax(axis=1)
+        best_sell_column[np.isneginf(sell_price.max(axis=1))] = NO_WORLD
+        self.best_sell_column[rows] = best_sell_column
+
+    # Recomputes every row, as after a bulk change
+    def recompute(self) -> None:
+        self._mutex.lock()
+        try:
+            self._recompute(np.arange(len(self._item_row)))
+        finally:
+            self._mutex.unlock()
+
+    # World id and price per unit of the cheapest listing in the data center
+    def get_cheapest(self, item_id: int) -> Optional[Tuple[int, int]]:
+        self._mutex.lock()
+        try:
+            row = self._item_row.get(item_id)
+            if row is None or self.cheapest_column[row] == NO_WORLD:
+                return None
+            column = self.cheapest_column[row]
+            return self.world_ids[column], int(self.listing_price[row, column])
+        finally:
+            self._mutex.unlock()
+
+    # World id and revenue per unit, after tax, of the best world to sell in
+    def get_best_sell(self, item_id: int) -> Optional[Tuple[int, float]]:
+        self._mutex.lock()
+        try:
+            row = self._item_row.get(item_id)
+            if row is None or self.best_sell_column[row] == NO_WORLD:
+                return None
+            column = self.best_sell_column[row]
+            sell_price = np.fmin(
+                self.listing_price[row, column], self.sale_price[row, column]
+            )
+            return self.world_ids[column], float(sell_price) * SALE_TAX
+        finally:
+            self._mutex.unlock()
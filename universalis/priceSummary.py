@@ -0,0 +1,163 @@
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Sequence
+import numpy as np
+from PySide6.QtCore import QMutex
+
+from universalis.models import Listings
+
+INITIAL_ITEM_CAPACITY = 1024
+SALE_ENTRIES = 5  # Recent sales per item, as in a full listings response
+# Fields of a listings response the summaries are read from
+SUMMARY_FIELDS = (
+    "itemID",
+    "lastUploadTime",
+    "minPrice",
+    "minPriceNQ",
+    "minPriceHQ",
+    "regularSaleVelocity",
+    # listingsCount counts only the listings returned, so listings are returned
+    # with one field each and counted
+    "listings.hq",
+    "recentHistory.pricePerUnit",
+)
+
+SUMMARY_DTYPE = np.dtype(
+    [
+        ("min_price", np.int64),
+        ("min_price_nq", np.int64),
+        ("min_price_hq", np.int64),
+        ("min_sale_price", np.int64),
+        ("sale_velocity", np.float32),
+        ("listing_count", np.int32),
+        ("last_upload_time_s", np.float64),
+        ("update_time", np.float64),
+    ]
+)
+
+
+class PriceSummary(NamedTuple):
+    min_price: int
+    min_price_nq: int
+    min_price_hq: int
+    min_sale_price: int  # Lowest of the recent sales, 0 without any
+    sale_velocity: float
+    listing_count: int
+    last_upload_time_s: float
+    update_time: float
+
+
+def _summary_row(content: Dict[str, Any], update_time: float) -> tuple:
+    sale_price_list = [
+        sale["pricePerUnit"] for sale in content.get("recentHistory", ())
+    ][:SALE_ENTRIES]
+    return (
+        content.get("minPrice", 0),
+        content.get("minPriceNQ", 0),
+        content.get("minPriceHQ", 0),
+        min(sale_price_list, default=0),
+        content.get("regularSaleVelocity", 0.0),
+        len(content.get("listings", ())),
+        content["lastUploadTime"] / 1000,
+        update_time,
+    )
+
+
+def _listings_row(listings: Listings, update_time: float) -> tuple:
+    sale_price = listings.recentHistory.price_per_unit[:SALE_ENTRIES]
+    return (
+        listings.minPrice,
+        listings.minPriceNQ,
+        listings.minPriceHQ,
+        int(sale_price.min()) if len(sale_price) > 0 else 0,
+        listings.regularSaleVelocity,
+        len(listings.listings),
+        listings.lastUploadTime / 1000,
+        update_time,
+    )
+
+
+# Min prices and sale statistics of one world's items, one row per item in a
+# single structured array. Rows come from listings queries that return one field per
+# listing and only the latest sale prices, or from full listings as they are fetched.
+# Writers take the mutex, readers take a row without locking as each row is written
+# in one assignment and the array is only replaced whole when it grows.
+class PriceSummaryTable:
+    def __init__(self) -> None:
+        self._mutex = QMutex()
+        self._item_row: Dict[int, int] = {}
+        self._rows = np.zeros(INITIAL_ITEM_CAPACITY, SUMMARY_DTYPE)
+
+    def __len__(self) -> int:
+        return len(self._item_row)
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._item_row
+
+    def get(self, item_id: int) -> Optional[PriceSummary]:
+        row = self._item_row.get(item_id)
+        if row is None:
+            return None
+        return PriceSummary(*self._rows[row].item())
+
+    def get_update_time(self, item_id: int) -> Optional[float]:
+        row = self._item_row.get(item_id)
+        return float(self._rows["update_time"][row]) if row is not None else None
+
+    def _set_rows(self, item_id_list: Sequence[int], row_list: Sequence[tuple]) -> None:
+        if len(item_id_list) == 0:
+            return
+        self._mutex.lock()
+        try:
+            new_item_count = len(set(item_id_list) - self._item_row.keys())
+            if len(self._item_row) + new_item_count > len(self._rows):
+                capacity = len(self._rows)
+                while capacity < len(self._item_row) + new_item_count:
+                    capacity *= 2
+                rows = np.zeros(capacity, SUMMARY_DTYPE)
+                rows[: len(self._rows)] = self._rows
+                self._rows = rows
+            rows = self._rows
+            for item_id, row in zip(item_id_list, row_list):
+                # Rows are written before the item is findable
+                index = self._item_row.get(item_id, len(self._item_row))
+                rows[index] = row
+                self._item_row[item_id] = index
+        finally:
+            self._mutex.unlock()
+
+    # Writes the rows of listings responses queried for SUMMARY_FIELDS
+    def update(
+        self, content_list: Iterable[Dict[str, Any]], update_time: float
+    ) -> None:
+        content_list = list(content_list)
+        self._set_rows(
+            [content["itemID"] for content in content_list],
+            [_summary_row(content, update_time) for content in content_list],
+        )
+
+    # Writes the rows of full listings
+    def update_listings(
+        self, listings_list: Iterable[Listings], update_time: float
+    ) -> None:
+        listings_list = list(listings_list)
+        self._set_rows(
+            [listings.itemID for listings in listings_list],
+            [_listings_row(listings, update_time) for listings in listings_list],
+        )
+
+    def __getstate__(self) -> dict:
+        self._mutex.lock()
+        try:
+            return {
+                "item_row": dict(self._item_row),
+                "rows": self._rows[: len(self._item_row)].copy(),
+            }
+        finally:
+            self._mutex.unlock()
+
+    def __setstate__(self, state: dict) -> None:
+        self._mutex = QMutex()
+        self._item_row = state["item_row"]
+        self._rows = np.zeros(
+            max(INITIAL_ITEM_CAPACITY, len(state["rows"])), SUMMARY_DTYPE
+        )
+        self._rows[: len(state["rows"])] = state["rows"]
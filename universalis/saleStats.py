@@ -0,0 +1,116 @@
+from bisect import bisect_left, insort
+import heapq
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+from universalis.history import History
+
+WINDOW_S: Dict[str, int] = {
+    "1d": 3600 * 24,
+    "7d": 3600 * 24 * 7,
+    "30d": 3600 * 24 * 30,
+}
+DEFAULT_WINDOW = "7d"
+MIN_VELOCITY_SPAN_S = 3600  # Stops a burst of sales reading as a huge velocity
+
+
+# Rolling aggregates over the sales inside one time window. Sales are kept in a
+# heap by timestamp so expiry pops the oldest, and in a sorted price list for the
+# median and percentiles.
+class SaleWindow:
+    def __init__(self, window_s: int) -> None:
+        self.window_s = window_s
+        self._sales: List[Tuple[int, int, int]] = []  # heap of (timestamp, price, qty)
+        self._sorted_prices: List[int] = []
+        self.price_sum = 0
+        self.quantity_sum = 0
+
+    def __len__(self) -> int:
+        return len(self._sales)
+
+    def add(self, timestamp: int, price: int, quantity: int) -> None:
+        heapq.heappush(self._sales, (timestamp, price, quantity))
+        insort(self._sorted_prices, price)
+        self.price_sum += price
+        self.quantity_sum += quantity
+
+    def expire(self, time_s: float) -> None:
+        while len(self._sales) > 0 and self._sales[0][0] <= time_s - self.window_s:
+            _, price, quantity = heapq.heappop(self._sales)
+            del self._sorted_prices[bisect_left(self._sorted_prices, price)]
+            self.price_sum -= price
+            self.quantity_sum -= quantity
+
+    # Sales per week, the unit of Listings.regularSaleVelocity. The rate is taken
+    # over the part of the window covered by the sales seen so far.
+    def velocity(self, time_s: float) -> float:
+        if len(self._sales) == 0:
+            return 0.0
+        span_s = min(
+            max(time_s - self._sales[0][0], MIN_VELOCITY_SPAN_S), self.window_s
+        )
+        return len(self._sales) * 3600 * 24 * 7 / span_s
+
+    def mean(self) -> Optional[float]:
+        if len(self._sales) == 0:
+            return None
+        return self.price_sum / len(self._sales)
+
+    def percentile(self, q: float) -> Optional[int]:
+        if len(self._sorted_prices) == 0:
+            return None
+        index = min(
+            int(q / 100 * len(self._sorted_prices)), len(self._sorted_prices) - 1
+        )
+        return self._sorted_prices[index]
+
+    def median(self) -> Optional[int]:
+        return self.percentile(50)
+
+
+# Per-item sale statistics over each window in WINDOW_S, updated with only the
+# sales that were new to the item's history.
+class SaleStats:
+    def __init__(self) -> None:
+        self.windows = {
+            name: SaleWindow(window_s) for name, window_s in WINDOW_S.items()
+        }
+        self.update_time_s = 0.0
+
+    @classmethod
+    def from_history(cls, history: History, time_s: float) -> "SaleStats":
+        sale_stats = cls()
+        timestamp, price, quantity, _ = history.columns()
+        start = int(np.searchsorted(timestamp, time_s - max(WINDOW_S.values())))
+        sale_stats.update(timestamp[start:], price[start:], quantity[start:], time_s)
+        return sale_stats
+
+    def update(
+        self,
+        timestamp: np.ndarray,
+        price: np.ndarray,
+        quantity: np.ndarray,
+        time_s: float,
+    ) -> None:
+        for sale_window in self.windows.values():
+            in_window = timestamp > time_s - sale_window.window_s
+            for sale in zip(
+                timestamp[in_window].tolist(),
+                price[in_window].tolist(),
+                quantity[in_window].tolist(),
+            ):
+                sale_window.add(*sale)
+            sale_window.expire(time_s)
+        self.update_time_s = time_s
+
+    def velocity(self, window: str = DEFAULT_WINDOW) -> float:
+        return self.windows[window].velocity(self.update_time_s)
+
+    def mean(self, window: str = DEFAULT_WINDOW) -> Optional[float]:
+        return self.windows[window].mean()
+
+    def median(self, window: str = DEFAULT_WINDOW) -> Optional[int]:
+        return self.windows[window].median()
+
+    def percentile(self, q: float, window: str = DEFAULT_WINDOW) -> Optional[int]:
+        return self.windows[window].percentile(q)
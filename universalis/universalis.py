@@ -1,91 +1,211 @@
+import ast
+from concurrent.futures import Future
 import json
 from pathlib import Path
 import pickle
-from typing import Any, Dict, List, Optional, Tuple, TypeVar, Union
+from typing import (
+    Any,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
 import logging
 import time
-import pandas as pd
+from urllib.parse import urlparse
+import numpy as np
 from pydantic import BaseModel
-import requests
 from PySide6.QtCore import QMutex, Signal
-from cache import Persist, get_size, persist_to_file
+from cache import (
+    Persist,
+    SingleFlight,
+    get_size,
+    load_cache,
+    persist_to_file,
+    save_cache,
+)
+from transport.fastDecode import loads, parse_model
+from transport.transport import http_client
 
+from universalis.deltaSync import DeltaSync
+from universalis.freshness import FreshnessPolicy
+from universalis.history import History
+from universalis.listingTable import ListingTable
+from universalis.listingsStore import ListingsStore
 from universalis.models import Listings
+from universalis.priceMatrix import PriceMatrix
+from universalis.priceSummary import (
+    SALE_ENTRIES,
+    SUMMARY_FIELDS,
+    PriceSummary,
+    PriceSummaryTable,
+)
+from universalis.saleStats import SaleStats
 from xivapi.models import Item, Recipe
 
 _logger = logging.getLogger(__name__)
 
-GET_CONTENT_RATE = 0.05
-get_content_time = time.time() - GET_CONTENT_RATE
+UNIVERSALIS_URL = "https://universalis.app/api/v2"
+REQUEST_RATE = 20  # requests per second
+REQUEST_BURST = 20
 
+http_client.set_rate_limit(
+    urlparse(UNIVERSALIS_URL).netloc, REQUEST_RATE, REQUEST_BURST
+)
+
+# Guards cache writes, readers take entries without locking
 universalis_mutex = QMutex()
+listings_single_flight = SingleFlight()
+summary_single_flight = SingleFlight()
+summary_table_mutex = QMutex()  # Guards loading price_summary_dict
 
 # world_id = 55
 world_id = 86
+# Data center of world_id, set to price ingredients across its worlds
+data_center: Optional[str] = None
 
 CACHE_TIMEOUT_S = 3600 * 4
-CACHE_FILENAME = f"listings-{world_id}.bin"
+LIVE_FEED_TIMEOUT_S = 3600 * 24  # Resync of entries kept current by the live feed
+DELTA_SYNC_INTERVAL_S = 60
+DELTA_SYNC_ENTRIES = 200  # Most the most-recently-updated endpoint returns
+DELTA_SYNC_TIMEOUT_S = 3600 * 24  # Resync of entries the delta sync saw no upload of
+MULTI_ITEM_CHUNK_SIZE = 100  # Max item ids per Universalis request
+LISTINGS_MEMORY_BUDGET_BYTES = 256 * 1024**2  # Pickled size of listings in memory
+CACHE_FILENAME = f"listings-{world_id}.db"
+LEGACY_CACHE_FILENAME = f"listings-{world_id}.bin"
+FRESHNESS_FILENAME = f"freshness-{world_id}.bin"
+SUMMARY_FILENAME = "summaries-{world}.bin"
 
 PRINT_CACHE_SIZE = False
 
-cache: Dict[Any, Tuple[Listings, float]]
-try:
-    if Path(f".data/{CACHE_FILENAME}").exists():
-        cache = pickle.load(open(f".data/{CACHE_FILENAME}", "rb"))
-    else:
-        cache = {}
-        _logger.info("Created new listings cache")
-    # for cache_tuple in cache.values():
-    #     listings = cache_tuple[0]
-    #     listings.history = (
-    #         pd.read_json(listings.history, convert_axes=False)
-    #         if listings.history is not None
-    #         else pd.DataFrame(columns=["Price"])
-    #     )
-    #     listings.listing_history = (
-    #         pd.read_json(listings.listing_history, convert_axes=False)
-    #         if listings.listing_history is not None
-    #         else pd.DataFrame(columns=["Price"])
-    #     )
-    #     listings.history.index = listings.history.index.astype("float64")
-    #     listings.listing_history.index = listings.listing_history.index.astype(
-    #         "float64"
-    #     )
-except (IOError, ValueError):
-    _logger.log(logging.WARN, f"Error loading {CACHE_FILENAME} cache")
-    cache = {}
+cache = ListingsStore(CACHE_FILENAME, LISTINGS_MEMORY_BUDGET_BYTES)
+# Per-item TTLs, used wherever a caller does not pass its own cache_timeout_s
+freshness_policy = FreshnessPolicy(FRESHNESS_FILENAME, CACHE_TIMEOUT_S)
+# Items x worlds prices of data_center, filled as its listings are fetched
+price_matrix = PriceMatrix()
+# world: PriceSummaryTable, loaded on first use
+price_summary_dict: Dict[Union[int, str], PriceSummaryTable] = {}
+# world: DeltaSync, for the worlds synced with sync_recently_updated
+delta_sync_dict: Dict[Union[int, str], DeltaSync] = {}
+
+
+def _migrate_legacy_cache(file_path: Path) -> None:
+    try:
+        legacy_cache: Dict[str, Tuple[Listings, float]] = pickle.load(
+            open(file_path, "rb")
+        )
+    except (IOError, ValueError, pickle.UnpicklingError):
+        _logger.log(logging.WARN, f"Error loading {file_path.name} cache")
+        return
+    # Caches written before the history store kept DataFrames
+    import pandas as pd
+
+    for cache_tuple in legacy_cache.values():
+        if isinstance(cache_tuple[0].history, pd.DataFrame):
+            cache_tuple[0].history = History.from_dataframe(cache_tuple[0].history)
+        if isinstance(cache_tuple[0].listing_history, pd.DataFrame):
+            cache_tuple[0].listing_history = History.from_dataframe(
+                cache_tuple[0].listing_history
+            )
+        if getattr(cache_tuple[0], "sale_stats", None) is None:
+            cache_tuple[0].sale_stats = SaleStats.from_history(
+                cache_tuple[0].history, time.time()
+            )
+    cache.update(legacy_cache)
+    file_path.rename(file_path.with_suffix(".bin.migrated"))
+    _logger.info(f"Migrated {len(legacy_cache)} listings from {file_path.name}")
+
+
+if Path(f".data/{LEGACY_CACHE_FILENAME}").exists():
+    _migrate_legacy_cache(Path(f".data/{LEGACY_CACHE_FILENAME}"))
 
 if PRINT_CACHE_SIZE:
     print(f"Size of listings cache: {len(cache)} {get_size(cache):,.0f} bytes")
 
 
+# Entries are written as they are refreshed, this only checkpoints the WAL
 def save_to_disk() -> None:
-    pickle.dump(cache, open(f".data/{CACHE_FILENAME}", "wb"))
+    cache.flush()
+    _logger.info(cache.stats())
+    universalis_mutex.lock()
+    try:
+        freshness_policy.save_to_disk()
+        for world, price_summary_table in list(price_summary_dict.items()):
+            save_cache(SUMMARY_FILENAME.format(world=world), price_summary_table)
+    finally:
+        universalis_mutex.unlock()
+
+
+def _get_listings_url(ids: List[int], world: Union[int, str]) -> str:
+    return f"{UNIVERSALIS_URL}/{world}/{','.join(str(id) for id in ids)}?noGst=true"
 
 
 def _get_listings(id: int, world: Union[int, str]) -> Listings:
-    url = f"https://universalis.app/api/v2/{world}/{id}?noGst=true"
-    global get_content_time
-    now_time = time.time()
-    if now_time - get_content_time < GET_CONTENT_RATE:
-        time.sleep(GET_CONTENT_RATE - now_time + get_content_time)
-    for _ in range(10):
-        try:
-            content_response = requests.get(url)
-            get_content_time = time.time()
-            content_response.raise_for_status()
-        except Exception as e:
-            time.sleep(0.05)
-            print(str(e))
-        else:
-            break
-    if content_response is not None:
-        return Listings.parse_obj(content_response.json())
-    else:
-        raise RuntimeError("Failed to get Universalis Content")
+    return parse_model(
+        Listings, loads(http_client.get(_get_listings_url([id], world)).content)
+    )
+
+
+def _get_recently_updated_url(world: Union[int, str]) -> str:
+    query = f"world={world}" if isinstance(world, int) else f"dcName={world}"
+    return (
+        f"{UNIVERSALIS_URL}/extra/stats/most-recently-updated?{query}"
+        f"&entries={DELTA_SYNC_ENTRIES}"
+    )
+
+
+def _parse_listings_many(ids: List[int], content: Any) -> List[Listings]:
+    # A single id returns a plain listings object rather than a multi-item response
+    if len(ids) == 1:
+        return [parse_model(Listings, content)]
+    if len(content.get("unresolvedItems", [])) > 0:
+        _logger.log(logging.DEBUG, f"Unresolved items: {content['unresolvedItems']}")
+    items = content["items"]
+    if isinstance(items, dict):
+        items = items.values()
+    return [parse_model(Listings, item) for item in items]
+
+
+# Requests every chunk concurrently and yields the parsed chunks in order
+def _get_listings_many(
+    ids: List[int], world: Union[int, str]
+) -> Generator[List[Listings], None, None]:
+    chunk_list = [
+        ids[chunk_index : chunk_index + MULTI_ITEM_CHUNK_SIZE]
+        for chunk_index in range(0, len(ids), MULTI_ITEM_CHUNK_SIZE)
+    ]
+    future_list = [
+        http_client.submit(_get_listings_url(chunk, world)) for chunk in chunk_list
+    ]
+    for chunk, future in zip(chunk_list, future_list):
+        yield _parse_listings_many(chunk, loads(future.result().content))
 
 
 seller_id = None
+live_feed_since_s: Optional[float] = None
+
+
+# Called by the market feed with the time it connected, or None once disconnected
+def set_live_feed(since_s: Optional[float]) -> None:
+    global live_feed_since_s
+    live_feed_since_s = since_s
+
+
+def is_live_feed() -> bool:
+    return live_feed_since_s is not None
+
+
+def set_data_center(name: Optional[str]) -> None:
+    global data_center
+    data_center = name
+
+
+def get_data_center() -> Optional[str]:
+    return data_center
 
 
 def set_seller_id(id: str) -> None:
@@ -95,24 +215,52 @@ def set_seller_id(id: str) -> None:
 
 def seller_id_in_listings(listings: Listings) -> bool:
     global seller_id
-    return seller_id is not None and any(
-        listing.sellerID == seller_id for listing in listings.listings
-    )
+    return listings.listings.has_seller(seller_id)
+
+
+# Item ids and listing positions of every cached item the seller has listings of
+def get_seller_item_positions(
+    id: str, world: Union[int, str]
+) -> Dict[int, Tuple[int, ...]]:
+    item_positions = {}
+    for key, positions in cache.get_seller_positions(id).items():
+        item_id, key_world = ast.literal_eval(key)
+        if key_world == world:
+            item_positions[item_id] = positions
+    return item_positions
 
 
+def get_seller_listings(id: str, world: Union[int, str]) -> Dict[int, Listings]:
+    return {
+        item_id: cache[str([item_id, world])][0]
+        for item_id in get_seller_item_positions(id, world)
+    }
+
+
+# Listings of the recipe's items that the seller is in, from the seller index. Only
+# the items the index reports are refreshed, to check the seller is still listed.
 def seller_id_in_recipe(recipe: Recipe, world_id: int) -> List[Listings]:
     global seller_id
-    listings_list = []
-    listings = get_listings(recipe.ItemResult.ID, world_id)
-    if seller_id_in_listings(listings):
-        listings_list.append(listings)
+    if seller_id is None:
+        return []
+    item_id_list = [recipe.ItemResult.ID]
     for ingredient_index in range(9):
         item: Item = getattr(recipe, f"ItemIngredient{ingredient_index}")
         if item is not None:
-            listings = get_listings(item.ID, world_id)
-            if seller_id_in_listings(listings):
-                listings_list.append(listings)
-    return listings_list
+            item_id_list.append(item.ID)
+    seller_positions = cache.get_seller_positions(seller_id)
+    seller_item_id_list = [
+        item_id
+        for item_id in dict.fromkeys(item_id_list)
+        if str([item_id, world_id]) in seller_positions
+    ]
+    if len(seller_item_id_list) == 0:
+        return []
+    return [
+        listings
+        for listings in get_listings_many(seller_item_id_list, world_id).values()
+        if seller_id_in_listings(listings)
+    ]
 
 
 def is_listing_expired(
@@ -122,10 +270,99 @@ def is_listing_expired(
     cache_timeout_s: Optional[float] = None,
 ) -> bool:
     _args = [id, world]
-    _cache_timeout_s = (
-        cache_timeout_s if cache_timeout_s is not None else CACHE_TIMEOUT_S
+    return _is_cache_expired(
+        _args, time_s, _get_cache_timeout_s(_args, cache_timeout_s)
     )
-    return str(_args) not in cache or time_s - cache[str(_args)][1] > _cache_timeout_s
+
+
+def get_listing_update_time(id: int, world: Union[int, str]) -> Optional[float]:
+    return cache.get_update_time(str([id, world]))
+
+
+# Resident size and eviction counts of the listings cache
+def get_cache_stats() -> str:
+    return cache.stats()
+
+
+def get_listing_ttl_s(id: int, world: Union[int, str]) -> float:
+    return _get_cache_timeout_s([id, world], None)
+
+
+def _get_cache_timeout_s(_args: List[Any], cache_timeout_s: Optional[float]) -> float:
+    # Entries the delta sync saw change upstream are stale whatever their age, and
+    # entries it saw no upload of since they were fetched match upstream, so their
+    # default TTL is extended. An explicit cache_timeout_s is kept as given.
+    delta_sync = delta_sync_dict.get(_args[1])
+    if delta_sync is not None and cache_timeout_s != 0:
+        if delta_sync.is_dirty(str(_args)):
+            return 0.0
+        update_time = cache.get_update_time(str(_args))
+        if (
+            cache_timeout_s is None
+            and update_time is not None
+            and delta_sync.covers(update_time)
+        ):
+            return max(freshness_policy.ttl_s(str(_args)), DELTA_SYNC_TIMEOUT_S)
+    if cache_timeout_s is not None:
+        return cache_timeout_s
+    ttl_s = freshness_policy.ttl_s(str(_args))
+    # Entries fetched while the live feed has been connected receive every change
+    # since, polling them is only a fallback for missed events
+    if live_feed_since_s is not None:
+        update_time = cache.get_update_time(str(_args))
+        if update_time is not None and update_time >= live_feed_since_s:
+            return max(ttl_s, LIVE_FEED_TIMEOUT_S)
+    return ttl_s
+
+
+def _is_cache_expired(_args: List[Any], time_s: float, cache_timeout_s: float) -> bool:
+    update_time = cache.get_update_time(str(_args))
+    return update_time is None or time_s - update_time > cache_timeout_s
+
+
+def _merge_listings(_args: List[Any], listings: Listings) -> Tuple[Listings, float]:
+    # TODO: Rename history to purchase_history
+
+    # Merge history and listing_history
+    time_s = time.time()
+    if str(_args) in cache:
+        cached_listings = cache[str(_args)][0]
+        listings.history = cached_listings.history
+        listings.listing_history = cached_listings.listing_history
+        listings.sale_stats = getattr(cached_listings, "sale_stats", None)
+        if listings.sale_stats is None:
+            listings.sale_stats = SaleStats.from_history(listings.history, time_s)
+    else:
+        listings.history = History()
+        listings.listing_history = History()
+        listings.sale_stats = SaleStats()
+    new_sales = listings.history.merge_listings(listings.recentHistory, "timestamp")
+    listings.listing_history.merge_listings(listings.listings, "lastReviewTime")
+    listings.history.downsample(time_s)
+    listings.listing_history.downsample(time_s)
+
+    # Velocity calculation, only the sales new to the history are added
+    listings.sale_stats.update(*new_sales[:3], time_s)
+    listings.regularSaleVelocity = listings.sale_stats.velocity()
+    freshness_policy.observe(str(_args), listings, time_s)
+    get_price_summary_table(_args[1]).update_listings([listings], time_s)
+    delta_sync = delta_sync_dict.get(_args[1])
+    if delta_sync is not None:
+        delta_sync.clean(str(_args), listings.lastUploadTime / 1000)
+
+    return (listings, time.time())
+
+
+def _load_listings(_args: List[Any], cache_timeout_s: float) -> Listings:
+    # Another caller may have refreshed the entry since it was checked
+    if _is_cache_expired(_args, time.time(), cache_timeout_s):
+        listings = _get_listings(*_args)
+        universalis_mutex.lock()
+        try:
+            cache[str(_args)] = _merge_listings(_args, listings)
+        finally:
+            universalis_mutex.unlock()
+    return cache[str(_args)][0]
 
 
 def get_listings(
@@ -133,61 +370,392 @@ def get_listings(
     world: Union[int, str],
     cache_timeout_s: Optional[float] = None,
 ) -> Listings:
-    _cache_timeout_s = (
-        cache_timeout_s if cache_timeout_s is not None else CACHE_TIMEOUT_S
-    )
     _args = [id, world]
+    _cache_timeout_s = _get_cache_timeout_s(_args, cache_timeout_s)
 
-    universalis_mutex.lock()
-    if str(_args) in cache:
+    # Fresh entries are read without locking, cache entries are replaced whole
+    cache_entry = cache.get(str(_args))
+    if cache_entry is not None:
         _logger.log(
             logging.DEBUG,
-            f"Age of {CACHE_FILENAME}->{_args} Cache: {time.time() - cache[str(_args)][1]}s",
+            f"Age of {CACHE_FILENAME}->{_args} Cache: {time.time() - cache_entry[1]}s",
         )
-    if str(_args) not in cache or time.time() - cache[str(_args)][1] > _cache_timeout_s:
-        listings = _get_listings(id, world)
+        if time.time() - cache_entry[1] <= _cache_timeout_s:
+            return cache_entry[0]
+    return listings_single_flight(str(_args), _load_listings, _args, _cache_timeout_s)
 
-        # TODO: Rename history to purchase_history
 
-        # Merge history and listing_history
-        if str(_args) in cache:
-            listings.history = cache[str(_args)][0].history
-            listings.listing_history = cache[str(_args)][0].listing_history
-        else:
-            listings.history = pd.DataFrame(columns=["Price"])
-            listings.listing_history = pd.DataFrame(columns=["Price"])
-        try:
-            for recent_history_listing in listings.recentHistory:
-                listings.history.loc[
-                    recent_history_listing.timestamp
-                ] = recent_history_listing.pricePerUnit
-        except Exception as e:
-            print(f"Error adding purchase history to listings: {e}")
-            print(f"Tried to add {recent_history_listing}")
-            print(f"listings history: {listings.history}")
-            raise e
+def get_listings_many(
+    ids: Iterable[int],
+    world: Union[int, str],
+    cache_timeout_s: Optional[float] = None,
+) -> Dict[int, Listings]:
+    id_list = list(dict.fromkeys(ids))
+
+    time_s = time.time()
+    owned_id_list: List[int] = []
+    waiting_future_list: List[Future] = []
+    for id in id_list:
+        _args = [id, world]
+        if _is_cache_expired(
+            _args, time_s, _get_cache_timeout_s(_args, cache_timeout_s)
+        ):
+            future, owner = listings_single_flight.claim(str([id, world]))
+            if owner:
+                owned_id_list.append(id)
+            else:
+                waiting_future_list.append(future)
+
+    if len(owned_id_list) > 0:
+        _logger.log(
+            logging.DEBUG, f"Getting {len(owned_id_list)} listings from {world}"
+        )
+    unresolved_id_set = set(owned_id_list)
+    error: Optional[BaseException] = None
+    try:
+        for listings_list in _get_listings_many(owned_id_list, world):
+            universalis_mutex.lock()
+            try:
+                cache.update(
+                    {
+                        str([listings.itemID, world]): _merge_listings(
+                            [listings.itemID, world], listings
+                        )
+                        for listings in listings_list
+                    }
+                )
+            finally:
+                universalis_mutex.unlock()
+            for listings in listings_list:
+                if listings.itemID in unresolved_id_set:
+                    unresolved_id_set.remove(listings.itemID)
+                    listings_single_flight.resolve(
+                        str([listings.itemID, world]), listings
+                    )
+    except BaseException as e:
+        error = e
+        raise e
+    finally:
+        for id in unresolved_id_set:
+            listings_single_flight.resolve(
+                str([id, world]),
+                exception=error or KeyError(f"No listings for item {id} in {world}"),
+            )
+
+    for future in waiting_future_list:
+        future.exception()
+
+    data = {}
+    for id in id_list:
+        cache_entry = cache.get(str([id, world]))
+        if cache_entry is not None:
+            data[id] = cache_entry[0]
+    return data
+
+
+def get_price_summary_table(world: Union[int, str]) -> PriceSummaryTable:
+    price_summary_table = price_summary_dict.get(world)
+    if price_summary_table is None:
+        summary_table_mutex.lock()
         try:
-            for listing in listings.listings:
-                listings.listing_history.loc[
-                    listing.lastReviewTime
-                ] = listing.pricePerUnit
-        except Exception as e:
-            print(f"Error adding current listings: {e}")
-            print(f"Tried to add {listing}")
-            print(f"to listings: {listings.listing_history}")
-            raise e
-
-        # Velocity calculation
+            price_summary_table = price_summary_dict.get(world)
+            if price_summary_table is None:
+                price_summary_table = load_cache(
+                    SUMMARY_FILENAME.format(world=world), PriceSummaryTable()
+                )
+                price_summary_dict[world] = price_summary_table
+        finally:
+            summary_table_mutex.unlock()
+    return price_summary_table
+
+
+def _get_summary_url(ids: List[int], world: Union[int, str]) -> str:
+    # Multi-item responses nest each item under items
+    field_prefix = "items." if len(ids) > 1 else ""
+    return (
+        f"{_get_listings_url(ids, world)}&entries={SALE_ENTRIES}"
+        f"&fields={','.join(field_prefix + field for field in SUMMARY_FIELDS)}"
+    )
+
+
+def _parse_summaries_many(ids: List[int], content: Any) -> List[Dict[str, Any]]:
+    if len(ids) == 1:
+        return [content]
+    items = content["items"]
+    return list(items.values()) if isinstance(items, dict) else items
+
+
+def _get_summary_timeout_s(
+    _args: List[Any],
+    price_summary: Optional[PriceSummary],
+    cache_timeout_s: Optional[float],
+) -> float:
+    # As _get_cache_timeout_s, a summary is stale once the delta sync saw an upload
+    # newer than it
+    delta_sync = delta_sync_dict.get(_args[1])
+    if delta_sync is not None and cache_timeout_s != 0 and price_summary is not None:
+        dirty_upload_time = delta_sync.get_dirty_upload_time(str(_args))
         if (
-            len(listings.history.index) > 0
-            and listings.history.index.max() != listings.history.index.min()
+            dirty_upload_time is not None
+            and dirty_upload_time > price_summary.last_upload_time_s
         ):
-            listings.regularSaleVelocity = (
-                3600 * 24 * 7 * len(listings.history.index)
-            ) / (listings.history.index.max() - listings.history.index.min())
+            return 0.0
+        if cache_timeout_s is None and delta_sync.covers(price_summary.update_time):
+            return max(freshness_policy.ttl_s(str(_args)), DELTA_SYNC_TIMEOUT_S)
+    if cache_timeout_s is not None:
+        return cache_timeout_s
+    return freshness_policy.ttl_s(str(_args))
 
-        cache[str(_args)] = (listings, time.time())
 
-    data = cache[str(_args)][0]
-    universalis_mutex.unlock()
+def is_price_summary_expired(
+    id: int,
+    world: Union[int, str],
+    time_s: Optional[float] = None,
+    cache_timeout_s: Optional[float] = None,
+) -> bool:
+    time_s = time_s if time_s is not None else time.time()
+    price_summary = get_price_summary_table(world).get(id)
+    return (
+        price_summary is None
+        or time_s - price_summary.update_time
+        > _get_summary_timeout_s([id, world], price_summary, cache_timeout_s)
+    )
+
+
+def get_price_summary_update_time(id: int, world: Union[int, str]) -> Optional[float]:
+    return get_price_summary_table(world).get_update_time(id)
+
+
+def get_price_summary_ttl_s(id: int, world: Union[int, str]) -> float:
+    return _get_summary_timeout_s(
+        [id, world], get_price_summary_table(world).get(id), None
+    )
+
+
+# Min prices and sale statistics of the items, refreshing the expired ones in
+# queries of up to MULTI_ITEM_CHUNK_SIZE items that return one field per listing. Items
+# without any summary on Universalis are left out.
+def get_price_summaries_many(
+    ids: Iterable[int],
+    world: Union[int, str],
+    cache_timeout_s: Optional[float] = None,
+) -> Dict[int, PriceSummary]:
+    id_list = list(dict.fromkeys(ids))
+    price_summary_table = get_price_summary_table(world)
+
+    time_s = time.time()
+    owned_id_list: List[int] = []
+    waiting_future_list: List[Future] = []
+    for id in id_list:
+        if is_price_summary_expired(id, world, time_s, cache_timeout_s):
+            future, owner = summary_single_flight.claim(str([id, world]))
+            if owner:
+                owned_id_list.append(id)
+            else:
+                waiting_future_list.append(future)
+
+    chunk_list = [
+        owned_id_list[chunk_index : chunk_index + MULTI_ITEM_CHUNK_SIZE]
+        for chunk_index in range(0, len(owned_id_list), MULTI_ITEM_CHUNK_SIZE)
+    ]
+    unresolved_id_set = set(owned_id_list)
+    error: Optional[BaseException] = None
+    try:
+        future_list = [
+            http_client.submit(_get_summary_url(chunk, world)) for chunk in chunk_list
+        ]
+        for chunk, future in zip(chunk_list, future_list):
+            content_list = _parse_summaries_many(chunk, loads(future.result().content))
+            update_time = time.time()
+            price_summary_table.update(content_list, update_time)
+            universalis_mutex.lock()
+            try:
+                for content in content_list:
+                    key = str([content["itemID"], world])
+                    freshness_policy.observe_upload(
+                        key,
+                        content["lastUploadTime"] / 1000,
+                        content.get("regularSaleVelocity", 0.0),
+                        update_time,
+                    )
+                    # Without full listings nothing else is stale
+                    delta_sync = delta_sync_dict.get(world)
+                    if delta_sync is not None and key not in cache:
+                        delta_sync.clean(key, content["lastUploadTime"] / 1000)
+            finally:
+                universalis_mutex.unlock()
+            for content in content_list:
+                if content["itemID"] in unresolved_id_set:
+                    unresolved_id_set.remove(content["itemID"])
+                    summary_single_flight.resolve(str([content["itemID"], world]))
+    except BaseException as e:
+        error = e
+        raise e
+    finally:
+        for id in unresolved_id_set:
+            summary_single_flight.resolve(
+                str([id, world]),
+                exception=error or KeyError(f"No price summary for item {id}"),
+            )
+
+    for future in waiting_future_list:
+        future.exception()
+
+    data = {}
+    for id in id_list:
+        price_summary = price_summary_table.get(id)
+        if price_summary is not None:
+            data[id] = price_summary
     return data
+
+
+def get_price_summary(
+    id: int, world: Union[int, str], cache_timeout_s: Optional[float] = None
+) -> PriceSummary:
+    price_summary = get_price_summary_table(world).get(id)
+    if price_summary is None or is_price_summary_expired(
+        id, world, cache_timeout_s=cache_timeout_s
+    ):
+        price_summary = get_price_summaries_many([id], world, cache_timeout_s).get(id)
+        if price_summary is None:
+            raise KeyError(f"No price summary for item {id} in {world}")
+    return price_summary
+
+
+def _update_min_prices(listings: Listings) -> None:
+    listing_table = listings.listings
+    for field_name, mask in (
+        ("minPrice", np.ones(len(listing_table), np.bool_)),
+        ("minPriceNQ", ~listing_table.hq),
+        ("minPriceHQ", listing_table.hq),
+    ):
+        price_per_unit = listing_table.price_per_unit[mask]
+        setattr(
+            listings,
+            field_name,
+            int(price_per_unit.min()) if len(price_per_unit) > 0 else 0,
+        )
+
+
+# Applies a live feed event to a cached item. Returns False when the item is not
+# cached, as an event alone does not give the full listings.
+def apply_market_event(
+    event: str, id: int, world: Union[int, str], rows: List[Dict[str, Any]]
+) -> bool:
+    _args = [id, world]
+    universalis_mutex.lock()
+    try:
+        cache_entry = cache.get(str(_args))
+        if cache_entry is None:
+            return False
+        # Cache entries are replaced whole so lock-free readers see either version
+        listings = cache_entry[0].copy()
+        event_table = ListingTable(rows)
+        time_s = time.time()
+        if event == "listings/add":
+            listings.listings = listings.listings.without(event_table).concat(
+                event_table
+            )
+            listings.listing_history.merge_listings(event_table, "lastReviewTime")
+        elif event == "listings/remove":
+            listings.listings = listings.listings.without(event_table)
+        elif event == "sales/add":
+            listings.recentHistory = event_table.concat(listings.recentHistory)
+            new_sales = listings.history.merge_listings(event_table, "timestamp")
+            listings.history.downsample(time_s)
+            listings.sale_stats.update(*new_sales[:3], time_s)
+            listings.regularSaleVelocity = listings.sale_stats.velocity()
+        else:
+            return False
+        _update_min_prices(listings)
+        listings.lastUploadTime = int(time_s * 1000)
+        cache[str(_args)] = (listings, time.time())
+        get_price_summary_table(world).update_listings([listings], time_s)
+    finally:
+        universalis_mutex.unlock()
+    return True
+
+
+# Oldest lastUploadTime of the key's listings and price summary, None when neither
+# is cached
+def _get_cached_upload_time(key: str) -> Optional[float]:
+    id, world = ast.literal_eval(key)
+    upload_time_list = []
+    cache_entry = cache.get(key)
+    if cache_entry is not None:
+        upload_time_list.append(cache_entry[0].lastUploadTime / 1000)
+    price_summary_table = price_summary_dict.get(world)
+    price_summary = (
+        price_summary_table.get(id) if price_summary_table is not None else None
+    )
+    if price_summary is not None:
+        upload_time_list.append(price_summary.last_upload_time_s)
+    return min(upload_time_list, default=None)
+
+
+# Pulls the items most recently uploaded to the world and marks the cached ones that
+# changed since they were fetched dirty, at most once per min_interval_s. Returns
+# the ids of every dirty item of the world.
+def sync_recently_updated(
+    world: Union[int, str], min_interval_s: float = DELTA_SYNC_INTERVAL_S
+) -> List[int]:
+    delta_sync = delta_sync_dict.setdefault(world, DeltaSync())
+    time_s = time.time()
+    if (
+        delta_sync.last_sync_s is None
+        or time_s - delta_sync.last_sync_s >= min_interval_s
+    ):
+        content = loads(http_client.get(_get_recently_updated_url(world)).content)
+        dirty_key_list = delta_sync.apply(
+            [
+                (str([entry["itemID"], world]), entry["lastUploadTime"] / 1000)
+                for entry in content["items"]
+            ],
+            _get_cached_upload_time,
+            time_s,
+        )
+        _logger.log(
+            logging.DEBUG,
+            f"{len(dirty_key_list)} cached items of {world} changed upstream",
+        )
+    return [ast.literal_eval(key)[0] for key in delta_sync.dirty_keys()]
+
+
+def get_delta_sync_stats(world: Union[int, str]) -> Optional[str]:
+    delta_sync = delta_sync_dict.get(world)
+    return delta_sync.stats() if delta_sync is not None else None
+
+
+# Listings of data_center in one query per chunk, with the price matrix rows of
+# any refreshed items updated in one pass
+def get_dc_listings_many(
+    ids: Iterable[int], cache_timeout_s: Optional[float] = None
+) -> Dict[int, Listings]:
+    if data_center is None:
+        raise ValueError("No data center set")
+    listings_dict = get_listings_many(ids, data_center, cache_timeout_s)
+    listings_list = []
+    update_time_list = []
+    for id, listings in listings_dict.items():
+        update_time = cache.get_update_time(str([id, data_center]))
+        if update_time is not None and update_time != price_matrix.get_update_time(id):
+            listings_list.append(listings)
+            update_time_list.append(update_time)
+    price_matrix.update(listings_list, update_time_list)
+    return listings_dict
+
+
+# World id and price per unit of the cheapest listing in data_center
+def get_dc_cheapest(
+    id: int, cache_timeout_s: Optional[float] = None
+) -> Optional[Tuple[int, int]]:
+    get_dc_listings_many([id], cache_timeout_s)
+    return price_matrix.get_cheapest(id)
+
+
+# World id and revenue per unit of the best world in data_center to sell in
+def get_dc_best_sell(
+    id: int, cache_timeout_s: Optional[float] = None
+) -> Optional[Tuple[int, float]]:
+    get_dc_listings_many([id], cache_timeout_s)
+    return price_matrix.get_best_sell(id)
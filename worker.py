@@ -65,7 +65,7 @@ class Worker(QThread):
                 f"Refreshing marketboard data {recipe_index+1}/{len(recipe_list)} ({recipe.ItemResult.Name})..."
             )
             listings: Listings = get_listings(recipe.ItemResult.ID, self.world)
-            if any(listing.sellerID == self.seller_id for listing in listings.listings):
+            if listings.listings.has_seller(self.seller_id):
                 self.retainer_listings_changed.emit(listings)
             if not self.running:
                 break
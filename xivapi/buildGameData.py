@@ -0,0 +1,85 @@
+# Builds the game data snapshot served by xivapi.gameData. Every document of each
+# content is listed from xivapi and fetched in bulk with the columns its model reads.
+# Rerun after a game patch. Naming contents rebuilds only those, the snapshot keeps
+# the others.
+# Run from the repository root: python -m xivapi.buildGameData [content name ...]
+import json
+import sys
+import time
+from typing import Dict, List, Type
+from pydantic import BaseModel
+
+from xivapi.gameData import GameDataWriter, game_data
+from xivapi.models import (
+    ClassJob,
+    GatheringItem,
+    GatheringPoint,
+    GatheringPointBase,
+    Item,
+    Recipe,
+    TerritoryType,
+)
+from xivapi.xivapi import (
+    LIST_PAGE_LIMIT,
+    get_columns,
+    yield_content_by_ids,
+    yield_content_pages,
+)
+
+CONTENT_MODEL_DICT: Dict[str, Type[BaseModel]] = {
+    "Recipe": Recipe,
+    "Item": Item,
+    "ClassJob": ClassJob,
+    "GatheringItem": GatheringItem,
+    "GatheringPoint": GatheringPoint,
+    "GatheringPointBase": GatheringPointBase,
+    "TerritoryType": TerritoryType,
+}
+
+
+def get_content_ids(content_name: str) -> List[int]:
+    return [
+        page_result.ID
+        for page in yield_content_pages(f"{content_name}?limit={LIST_PAGE_LIMIT}")
+        for page_result in page.Results
+    ]
+
+
+def build_game_data(content_name_list: List[str]) -> None:
+    writer = GameDataWriter(game_data.file_path)
+    build_time = time.time()
+    for content_name in content_name_list:
+        t = time.perf_counter()
+        id_list = get_content_ids(content_name)
+        model = CONTENT_MODEL_DICT[content_name]
+        count = writer.write(
+            content_name,
+            (
+                (content, json.dumps(content, separators=(",", ":")).encode())
+                for content in yield_content_by_ids(
+                    content_name, id_list, ",".join(get_columns(model))
+                )
+                # Rows the model cannot read are left to the network path
+                if _is_valid(model, content)
+            ),
+            build_time,
+        )
+        print(
+            f"{content_name}: {count} of {len(id_list)} documents, "
+            f"{time.perf_counter() - t:.1f}s"
+        )
+    writer.close()
+    print(f"Wrote {game_data.file_path}")
+
+
+def _is_valid(model: Type[BaseModel], content: dict) -> bool:
+    try:
+        model.parse_obj(content)
+    except ValueError as e:
+        print(f"{content.get('ID')}: {e}")
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    build_game_data(sys.argv[1:] or list(CONTENT_MODEL_DICT))
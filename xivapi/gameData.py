@@ -0,0 +1,245 @@
+import logging
+from pathlib import Path
+import sqlite3
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+)
+from pydantic import BaseModel
+from PySide6.QtCore import QMutex
+
+from transport.fastDecode import loads, parse_model
+
+_logger = logging.getLogger(__name__)
+
+GAME_DATA_FILENAME = "game_data.sqlite"
+SCHEMA_VERSION = 1
+
+M = TypeVar("M", bound=BaseModel)
+
+
+# Read only snapshot of the static xivapi content, as built by
+# xivapi.buildGameData. Documents are kept as the JSON xivapi returned for them,
+# keyed by content name and ID, and parsed when looked up. Recipes are also indexed
+# by class job and level and by result item.
+#
+# Without a snapshot file every lookup misses and callers go to xivapi as before.
+class GameData:
+    def __init__(self, filename: str = GAME_DATA_FILENAME) -> None:
+        self.file_path = Path(f".data/{filename}")
+        self._mutex = QMutex()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._content_name_set: Set[str] = set()
+        if not self.file_path.exists():
+            _logger.info(f"No game data snapshot at {self.file_path}")
+            return
+        try:
+            connection = sqlite3.connect(
+                f"file:{self.file_path}?mode=ro", uri=True, check_same_thread=False
+            )
+            if (
+                connection.execute("PRAGMA user_version").fetchone()[0]
+                != SCHEMA_VERSION
+            ):
+                raise sqlite3.DatabaseError("schema version mismatch")
+            self._content_name_set = {
+                content_name
+                for (content_name,) in connection.execute(
+                    "SELECT content_name FROM contents"
+                )
+            }
+        except sqlite3.DatabaseError as e:
+            _logger.log(logging.WARN, f"Error loading {self.file_path}: {e}")
+            return
+        self._connection = connection
+
+    @property
+    def available(self) -> bool:
+        return self._connection is not None
+
+    def has_content(self, content_name: str) -> bool:
+        return content_name in self._content_name_set
+
+    def _query(self, sql: str, parameters: Tuple = ()) -> List[Tuple]:
+        if self._connection is None:
+            return []
+        self._mutex.lock()
+        try:
+            return self._connection.execute(sql, parameters).fetchall()
+        finally:
+            self._mutex.unlock()
+
+    def has(self, content_name: str, id: int) -> bool:
+        return content_name in self._content_name_set and bool(
+            self._query(
+                "SELECT 1 FROM content WHERE content_name = ? AND id = ?",
+                (content_name, id),
+            )
+        )
+
+    def get_data(self, content_name: str, id: int) -> Optional[bytes]:
+        if content_name not in self._content_name_set:
+            return None
+        row_list = self._query(
+            "SELECT data FROM content WHERE content_name = ? AND id = ?",
+            (content_name, id),
+        )
+        return row_list[0][0] if row_list else None
+
+    def get(self, content_name: str, id: int, model: Type[M]) -> Optional[M]:
+        data = self.get_data(content_name, id)
+        return parse_model(model, loads(data)) if data is not None else None
+
+    def get_ids(self, content_name: str) -> List[int]:
+        return [
+            id
+            for (id,) in self._query(
+                "SELECT id FROM content WHERE content_name = ? ORDER BY id",
+                (content_name,),
+            )
+        ]
+
+    def yield_models(self, content_name: str, model: Type[M]) -> Iterator[M]:
+        for (data,) in self._query(
+            "SELECT data FROM content WHERE content_name = ? ORDER BY id",
+            (content_name,),
+        ):
+            yield parse_model(model, loads(data))
+
+    # (ID, Name) of each document with a name, without parsing the models
+    def yield_names(self, content_name: str) -> Iterator[Tuple[int, str]]:
+        for id, data in self._query(
+            "SELECT id, data FROM content WHERE content_name = ? ORDER BY id",
+            (content_name,),
+        ):
+            name = loads(data).get("Name")
+            if name:
+                yield id, name
+
+    # (recipe ID, result item ID) of every recipe
+    def get_recipe_result_ids(self) -> List[Tuple[int, int]]:
+        return self._query(
+            "SELECT id, result_item_id FROM recipe_index ORDER BY id",
+        )
+
+    def get_recipe_ids(self, classjob_id: int, classjob_level: int) -> List[int]:
+        return [
+            id
+            for (id,) in self._query(
+                "SELECT id FROM recipe_index "
+                "WHERE classjob_id = ? AND classjob_level = ? ORDER BY id",
+                (classjob_id, classjob_level),
+            )
+        ]
+
+    def get_recipe_ids_by_result(self, item_id: int) -> List[int]:
+        return [
+            id
+            for (id,) in self._query(
+                "SELECT id FROM recipe_index WHERE result_item_id = ? ORDER BY id",
+                (item_id,),
+            )
+        ]
+
+
+# Writes a snapshot to a new file, moved over file_path once complete so a running
+# app never sees a half written one. The contents of an existing snapshot are copied
+# in first, so rebuilding some contents keeps the others.
+class GameDataWriter:
+    def __init__(self, file_path: Path) -> None:
+        self.file_path = file_path
+        self.temp_path = file_path.with_suffix(".tmp")
+        self.temp_path.parent.mkdir(parents=True, exist_ok=True)
+        self.temp_path.unlink(missing_ok=True)
+        self._connection = sqlite3.connect(self.temp_path)
+        self._connection.executescript(
+            "CREATE TABLE content (content_name TEXT NOT NULL, id INTEGER NOT NULL, "
+            "data BLOB NOT NULL, PRIMARY KEY (content_name, id)) WITHOUT ROWID;"
+            "CREATE TABLE contents (content_name TEXT PRIMARY KEY, "
+            "count INTEGER NOT NULL, build_time REAL NOT NULL);"
+            "CREATE TABLE recipe_index (id INTEGER PRIMARY KEY, classjob_id INTEGER, "
+            "classjob_level INTEGER, result_item_id INTEGER);"
+        )
+        if file_path.exists():
+            self._copy_snapshot()
+
+    def _copy_snapshot(self) -> None:
+        self._connection.execute(
+            "ATTACH DATABASE ? AS snapshot", (str(self.file_path),)
+        )
+        try:
+            if (
+                self._connection.execute("PRAGMA snapshot.user_version").fetchone()[0]
+                != SCHEMA_VERSION
+            ):
+                _logger.log(
+                    logging.WARN,
+                    f"Not copying {self.file_path}, its schema version differs",
+                )
+                return
+            for table_name in ("content", "contents", "recipe_index"):
+                self._connection.execute(
+                    f"INSERT INTO {table_name} SELECT * FROM snapshot.{table_name}"
+                )
+            self._connection.commit()
+        finally:
+            self._connection.execute("DETACH DATABASE snapshot")
+
+    def write(
+        self,
+        content_name: str,
+        row_list: Iterable[Tuple[Dict[str, Any], bytes]],
+        build_time: float,
+    ) -> int:
+        # Documents no longer listed are not carried over from the copied snapshot
+        self._connection.execute(
+            "DELETE FROM content WHERE content_name = ?", (content_name,)
+        )
+        if content_name == "Recipe":
+            self._connection.execute("DELETE FROM recipe_index")
+        count = 0
+        for content, data in row_list:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO content VALUES (?, ?, ?)",
+                (content_name, content["ID"], data),
+            )
+            if content_name == "Recipe":
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO recipe_index VALUES (?, ?, ?, ?)",
+                    (
+                        content["ID"],
+                        (content.get("ClassJob") or {}).get("ID"),
+                        (content.get("RecipeLevelTable") or {}).get("ClassJobLevel"),
+                        (content.get("ItemResult") or {}).get("ID"),
+                    ),
+                )
+            count += 1
+        self._connection.execute(
+            "INSERT OR REPLACE INTO contents VALUES (?, ?, ?)",
+            (content_name, count, build_time),
+        )
+        self._connection.commit()
+        return count
+
+    def close(self) -> None:
+        self._connection.executescript(
+            "CREATE INDEX recipe_classjob_level ON recipe_index "
+            "(classjob_id, classjob_level);"
+            "CREATE INDEX recipe_result_item ON recipe_index (result_item_id);"
+            f"PRAGMA user_version = {SCHEMA_VERSION};"
+        )
+        self._connection.commit()
+        self._connection.execute("VACUUM")
+        self._connection.close()
+        self.temp_path.replace(self.file_path)
+
+
+game_data = GameData()
@@ -0,0 +1,266 @@
+from bisect import bisect_left, insort
+import heapq
+from itertools import islice
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from PySide6.QtCore import QMutex
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+# Share of a query word's trigrams a name word needs to match it as a misspelling
+TRIGRAM_MATCH_RATIO = 0.5
+EXACT_SCORE = 3
+PREFIX_SCORE = 2
+TRIGRAM_SCORE = 1
+# Names of a ranked set are picked walking all names shortest first once the set
+# holds at least this share of them, as the walk then soon finds enough
+DENSE_SHARE = 1 / 16
+# Rough cost of matching one name word by word against that of adding one ID to a
+# set, for choosing between them
+PROBE_COST = 8
+
+
+def tokenize(name: str) -> List[str]:
+    return TOKEN_PATTERN.findall(name.lower())
+
+
+def get_trigrams(token: str) -> Set[str]:
+    return {token[index : index + 3] for index in range(len(token) - 2)}
+
+
+# Name search over the IDs of one content, such as recipes by their result item
+# name. Names are split into lower case words and every query word has to match a
+# word of the name, in any order: in full or as its prefix, or, when no word starts
+# with it, by sharing most of its trigrams, which finds words containing it and
+# most misspellings. Results are ranked by how closely the words matched, then
+# names starting with the query, then shorter names. Adds and searches may come
+# from any thread.
+#
+# Matching is done on whole sets of IDs, as the first letters typed can match
+# most names.
+class NameIndex:
+    def __init__(self) -> None:
+        self._mutex = QMutex()
+        self._names: Dict[int, str] = {}
+        self._id_tokens: Dict[int, Tuple[str, ...]] = {}
+        self._token_ids: Dict[str, Set[int]] = {}
+        self._first_token_ids: Dict[str, Set[int]] = {}
+        self._tokens: List[str] = []  # Sorted, for prefix ranges
+        self._trigram_tokens: Dict[str, Set[str]] = {}
+        # Sorted (name length, name, ID), shortest names first
+        self._ranked: List[Tuple[int, str, int]] = []
+        self._rank_keys: Dict[int, Tuple[int, str, int]] = {}
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, id: int) -> bool:
+        return id in self._names
+
+    # Without rank, _ranked is left for the caller to rebuild
+    def _remove(self, id: int, rank: bool) -> None:
+        del self._names[id]
+        rank_key = self._rank_keys.pop(id)
+        if rank:
+            del self._ranked[bisect_left(self._ranked, rank_key)]
+        token_tuple = self._id_tokens.pop(id)
+        if len(token_tuple) > 0:
+            self._first_token_ids[token_tuple[0]].discard(id)
+        for token in set(token_tuple):
+            id_set = self._token_ids[token]
+            id_set.discard(id)
+            if len(id_set) == 0:
+                del self._token_ids[token]
+                del self._tokens[bisect_left(self._tokens, token)]
+                for trigram in get_trigrams(token):
+                    self._trigram_tokens[trigram].discard(token)
+
+    def _add(self, id: int, name: str, rank: bool) -> None:
+        if self._names.get(id) == name:
+            return
+        if id in self._names:
+            self._remove(id, rank)
+        self._names[id] = name
+        rank_key = self._rank_keys[id] = (len(name), name, id)
+        if rank:
+            insort(self._ranked, rank_key)
+        token_tuple = self._id_tokens[id] = tuple(tokenize(name))
+        if len(token_tuple) > 0:
+            self._first_token_ids.setdefault(token_tuple[0], set()).add(id)
+        for token in set(token_tuple):
+            id_set = self._token_ids.get(token)
+            if id_set is None:
+                id_set = self._token_ids[token] = set()
+                insort(self._tokens, token)
+                for trigram in get_trigrams(token):
+                    self._trigram_tokens.setdefault(trigram, set()).add(token)
+            id_set.add(id)
+
+    def add(self, id: int, name: str) -> None:
+        self._mutex.lock()
+        try:
+            self._add(id, name, True)
+        finally:
+            self._mutex.unlock()
+
+    def add_many(self, id_name_list: Iterable[Tuple[int, str]]) -> None:
+        self._mutex.lock()
+        try:
+            for id, name in id_name_list:
+                self._add(id, name, False)
+            self._ranked = sorted(self._rank_keys.values())
+        finally:
+            self._mutex.unlock()
+
+    def _get_prefix_tokens(self, prefix: str) -> List[str]:
+        return self._tokens[
+            bisect_left(self._tokens, prefix) : bisect_left(
+                self._tokens, prefix + "\uffff"
+            )
+        ]
+
+    # Score of each name word query_token matches. Trigrams are only tried if fuzzy.
+    def _match_token(self, query_token: str, fuzzy: bool) -> Dict[str, int]:
+        token_score_dict = {
+            token: EXACT_SCORE if token == query_token else PREFIX_SCORE
+            for token in self._get_prefix_tokens(query_token)
+        }
+        query_trigram_set = get_trigrams(query_token)
+        if fuzzy and len(token_score_dict) == 0 and len(query_trigram_set) > 0:
+            trigram_count_dict: Dict[str, int] = {}
+            for trigram in query_trigram_set:
+                for token in self._trigram_tokens.get(trigram, ()):
+                    trigram_count_dict[token] = trigram_count_dict.get(token, 0) + 1
+            min_count = max(len(query_trigram_set) * TRIGRAM_MATCH_RATIO, 1)
+            for token, count in trigram_count_dict.items():
+                if count >= min_count:
+                    token_score_dict[token] = TRIGRAM_SCORE
+        return token_score_dict
+
+    def _count_ids(self, token_score_dict: Dict[str, int]) -> int:
+        return sum(len(self._token_ids[token]) for token in token_score_dict)
+
+    # IDs with a word in token_score_dict, by their best score
+    def _get_score_ids(self, token_score_dict: Dict[str, int]) -> Dict[int, Set[int]]:
+        score_token_dict: Dict[int, List[str]] = {}
+        for token, score in token_score_dict.items():
+            score_token_dict.setdefault(score, []).append(token)
+        score_id_dict: Dict[int, Set[int]] = {}
+        seen_id_set: Set[int] = set()
+        for score, token_list in sorted(score_token_dict.items(), reverse=True):
+            id_set = set().union(*(self._token_ids[token] for token in token_list))
+            score_id_dict[score] = id_set - seen_id_set
+            seen_id_set |= id_set
+        return score_id_dict
+
+    # The count shortest names of id_set, of those is_ranked is true for if given
+    def _get_shortest(
+        self,
+        id_set: Set[int],
+        count: int,
+        is_ranked: Optional[Callable[[int], bool]] = None,
+    ) -> List[int]:
+        if len(id_set) >= len(self._names) * DENSE_SHARE:
+            id_iter: Iterable[int] = (id for _, _, id in self._ranked if id in id_set)
+            return list(islice(filter(is_ranked, id_iter), count))
+        return heapq.nsmallest(
+            count, filter(is_ranked, id_set), key=self._rank_keys.__getitem__
+        )
+
+    # IDs of id_set whose first word starts with query_token
+    def _get_first_token_ids(self, query_token: str, id_set: Set[int]) -> Set[int]:
+        first_token_list = self._get_prefix_tokens(query_token)
+        if len(id_set) * PROBE_COST < sum(
+            len(self._first_token_ids.get(token, ())) for token in first_token_list
+        ):
+            return {
+                id for id in id_set if self._id_tokens[id][0].startswith(query_token)
+            }
+        return id_set & set().union(
+            *(self._first_token_ids.get(token, ()) for token in first_token_list)
+        )
+
+    # Best matching (ID, name) pairs, best first. Without fuzzy only names with
+    # words starting with every query word are found.
+    #
+    # The query word matching the fewest names gives the candidates. Each other
+    # word is matched against them as sets, or against their words one name at a
+    # time when they are few, so a common word like "of" costs little.
+    def search(
+        self, query: str, limit: int = 50, fuzzy: bool = True
+    ) -> List[Tuple[int, str]]:
+        query_token_list = list(dict.fromkeys(tokenize(query)))
+        if len(query_token_list) == 0:
+            return []
+        self._mutex.lock()
+        try:
+            match_list = sorted(
+                (
+                    self._match_token(query_token, fuzzy)
+                    for query_token in query_token_list
+                ),
+                key=self._count_ids,
+            )
+            # Summed score: IDs of the names matching every query word so far
+            score_id_dict = self._get_score_ids(match_list[0])
+            for token_score_dict in match_list[1:]:
+                next_score_id_dict: Dict[int, Set[int]] = {}
+                if sum(map(len, score_id_dict.values())) * PROBE_COST < self._count_ids(
+                    token_score_dict
+                ):
+                    for score, id_set in score_id_dict.items():
+                        for id in id_set:
+                            token_score = max(
+                                token_score_dict.get(token, 0)
+                                for token in self._id_tokens[id]
+                            )
+                            if token_score > 0:
+                                next_score_id_dict.setdefault(
+                                    score + token_score, set()
+                                ).add(id)
+                else:
+                    token_score_id_dict = self._get_score_ids(token_score_dict)
+                    for score, id_set in score_id_dict.items():
+                        for token_score, token_id_set in token_score_id_dict.items():
+                            matched_id_set = id_set & token_id_set
+                            if len(matched_id_set) > 0:
+                                next_score_id_dict.setdefault(
+                                    score + token_score, set()
+                                ).update(matched_id_set)
+                score_id_dict = next_score_id_dict
+            query_prefix = " ".join(query_token_list)
+
+            def starts_with_query(id: int) -> bool:
+                return " ".join(self._id_tokens[id]).startswith(query_prefix)
+
+            id_list: List[int] = []
+            for _, id_set in sorted(score_id_dict.items(), reverse=True):
+                if len(id_list) == limit:
+                    break
+                # Names starting with the query first. Past the first word that is
+                # checked only for the names ranked.
+                start_id_set = self._get_first_token_ids(query_token_list[0], id_set)
+                if len(query_token_list) == 1:
+                    id_list.extend(
+                        self._get_shortest(start_id_set, limit - len(id_list))
+                    )
+                    id_list.extend(
+                        self._get_shortest(id_set - start_id_set, limit - len(id_list))
+                    )
+                else:
+                    id_list.extend(
+                        self._get_shortest(
+                            start_id_set, limit - len(id_list), starts_with_query
+                        )
+                    )
+                    id_list.extend(
+                        self._get_shortest(
+                            id_set,
+                            limit - len(id_list),
+                            lambda id: id not in start_id_set
+                            or not starts_with_query(id),
+                        )
+                    )
+            return [(id, self._names[id]) for id in id_list]
+        finally:
+            self._mutex.unlock()
@@ -0,0 +1,220 @@
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+from PySide6.QtCore import QMutex
+
+from cache import RecordStore
+from xivapi.models import Item, Recipe, RecipeLevelTable
+
+INGREDIENT_COUNT = 10
+
+
+class RecipeNode(NamedTuple):
+    ID: int
+    classjob_id: int
+    classjob_level: int
+    amount_result: int
+    result_item_id: int
+    amount_ingredient: Tuple[int, ...]
+    ingredient_item_id: Tuple[Optional[int], ...]
+    # IDs of the recipes making each ingredient, None where xivapi gave none
+    ingredient_recipe_id: Tuple[Optional[Tuple[int, ...]], ...]
+
+
+# Recipes stored once by ID, with their ingredients referring to items and other
+# recipes by ID. Items and class jobs are stored once and shared.
+#
+# Recipe models are views built on first request and shared: the sub-recipes of a
+# view are the views of those recipes, so an intermediate used by many recipes is
+# one object however many recipes use it. When a stored recipe changes its view
+# and the views holding it are dropped, to be rebuilt on their next request.
+#
+# Sub-recipes nested in a fetched recipe are added as well unless the graph has
+# them already, so a recipe fetched on its own is never replaced by a nested copy.
+class RecipeGraph:
+    def __init__(self, filename: str) -> None:
+        # "recipe/{ID}": (RecipeNode, update time), "item/{ID}": (Item, 0.0) and
+        # "classjob/{ID}": (ClassJob, 0.0)
+        self.store = RecordStore(Path(f".data/{filename}"))
+        self._mutex = QMutex()
+        self._views: Dict[int, Recipe] = {}
+        self._view_parents: Dict[int, Set[int]] = {}  # ID: views holding its view
+        self._recipe_level_tables: Dict[int, RecipeLevelTable] = {}
+
+    def __contains__(self, recipe_id: int) -> bool:
+        return f"recipe/{recipe_id}" in self.store
+
+    def __len__(self) -> int:
+        return sum(1 for key in self.store if key.startswith("recipe/"))
+
+    def get_update_time(self, recipe_id: int) -> Optional[float]:
+        entry = self.store.get(f"recipe/{recipe_id}")
+        return entry[1] if entry is not None else None
+
+    def _put_shared(self, key: str, value: Any) -> None:
+        if key not in self.store:
+            self.store[key] = (value, 0.0)
+
+    def _add(
+        self,
+        recipe: Recipe,
+        update_time: float,
+        nested: bool,
+        changed_set: Set[int],
+    ) -> None:
+        key = f"recipe/{recipe.ID}"
+        if nested and key in self.store:
+            return
+        ingredient_recipe_id_list: List[Optional[Tuple[int, ...]]] = []
+        for ingredient_index in range(INGREDIENT_COUNT):
+            item: Optional[Item] = getattr(recipe, f"ItemIngredient{ingredient_index}")
+            if item is not None:
+                self._put_shared(f"item/{item.ID}", item)
+            sub_recipes: Optional[Tuple[Recipe, ...]] = getattr(
+                recipe, f"ItemIngredientRecipe{ingredient_index}"
+            )
+            if sub_recipes is None:
+                ingredient_recipe_id_list.append(None)
+                continue
+            for sub_recipe in sub_recipes:
+                self._add(sub_recipe, update_time, True, changed_set)
+            ingredient_recipe_id_list.append(
+                tuple(sub_recipe.ID for sub_recipe in sub_recipes)
+            )
+        self._put_shared(f"item/{recipe.ItemResult.ID}", recipe.ItemResult)
+        self._put_shared(f"classjob/{recipe.ClassJob.ID}", recipe.ClassJob)
+        node = RecipeNode(
+            recipe.ID,
+            recipe.ClassJob.ID,
+            recipe.RecipeLevelTable.ClassJobLevel,
+            recipe.AmountResult,
+            recipe.ItemResult.ID,
+            tuple(
+                getattr(recipe, f"AmountIngredient{ingredient_index}")
+                for ingredient_index in range(INGREDIENT_COUNT)
+            ),
+            tuple(
+                item.ID if item is not None else None
+                for item in (
+                    getattr(recipe, f"ItemIngredient{ingredient_index}")
+                    for ingredient_index in range(INGREDIENT_COUNT)
+                )
+            ),
+            tuple(ingredient_recipe_id_list),
+        )
+        entry = self.store.get(key)
+        if entry is not None and entry[0] != node:
+            changed_set.add(recipe.ID)
+        self.store[key] = (node, update_time)
+
+    def add(self, recipe: Recipe, update_time: Optional[float] = None) -> None:
+        changed_set: Set[int] = set()
+        self._mutex.lock()
+        try:
+            self._add(
+                recipe,
+                update_time if update_time is not None else time.time(),
+                False,
+                changed_set,
+            )
+            for recipe_id in changed_set:
+                self._drop_view(recipe_id)
+        finally:
+            self._mutex.unlock()
+
+    def _drop_view(self, recipe_id: int) -> None:
+        self._views.pop(recipe_id, None)
+        for parent_id in self._view_parents.pop(recipe_id, ()):
+            self._drop_view(parent_id)
+
+    def _get_recipe_level_table(self, classjob_level: int) -> RecipeLevelTable:
+        recipe_level_table = self._recipe_level_tables.get(classjob_level)
+        if recipe_level_table is None:
+            recipe_level_table = RecipeLevelTable(ClassJobLevel=classjob_level)
+            self._recipe_level_tables[classjob_level] = recipe_level_table
+        return recipe_level_table
+
+    def _get_view(self, recipe_id: int, building_set: Set[int]) -> Optional[Recipe]:
+        view = self._views.get(recipe_id)
+        if view is not None:
+            return view
+        entry = self.store.get(f"recipe/{recipe_id}")
+        if entry is None or recipe_id in building_set:
+            return None
+        building_set.add(recipe_id)
+        node: RecipeNode = entry[0]
+        fields: Dict[str, Any] = {
+            "ID": node.ID,
+            "ClassJob": self.store[f"classjob/{node.classjob_id}"][0],
+            "RecipeLevelTable": self._get_recipe_level_table(node.classjob_level),
+            "AmountResult": node.amount_result,
+            "ItemResult": self.store[f"item/{node.result_item_id}"][0],
+        }
+        for ingredient_index in range(INGREDIENT_COUNT):
+            fields[f"AmountIngredient{ingredient_index}"] = node.amount_ingredient[
+                ingredient_index
+            ]
+            item_id = node.ingredient_item_id[ingredient_index]
+            fields[f"ItemIngredient{ingredient_index}"] = (
+                self.store[f"item/{item_id}"][0] if item_id is not None else None
+            )
+            sub_recipe_ids = node.ingredient_recipe_id[ingredient_index]
+            for sub_recipe_id in sub_recipe_ids or ():
+                self._view_parents.setdefault(sub_recipe_id, set()).add(recipe_id)
+            fields[f"ItemIngredientRecipe{ingredient_index}"] = (
+                tuple(
+                    sub_recipe
+                    for sub_recipe in (
+                        self._get_view(sub_recipe_id, building_set)
+                        for sub_recipe_id in sub_recipe_ids
+                    )
+                    if sub_recipe is not None
+                )
+                if sub_recipe_ids is not None
+                else None
+            )
+        building_set.discard(recipe_id)
+        view = Recipe.construct(**fields)
+        self._views[recipe_id] = view
+        return view
+
+    def get(self, recipe_id: int) -> Optional[Recipe]:
+        view = self._views.get(recipe_id)
+        if view is not None:
+            return view
+        self._mutex.lock()
+        try:
+            return self._get_view(recipe_id, set())
+        finally:
+            self._mutex.unlock()
+
+    # Items stored with the recipes, as results or ingredients
+    def yield_items(self) -> Iterator[Item]:
+        for key in self.store:
+            if key.startswith("item/"):
+                entry = self.store.get(key)
+                if entry is not None:
+                    yield entry[0]
+
+    # (recipe ID, result item name) of every stored recipe
+    def yield_recipe_names(self) -> Iterator[Tuple[int, str]]:
+        for key in self.store:
+            if key.startswith("recipe/"):
+                entry = self.store.get(key)
+                item_entry = (
+                    self.store.get(f"item/{entry[0].result_item_id}")
+                    if entry is not None
+                    else None
+                )
+                if item_entry is not None:
+                    yield entry[0].ID, item_entry[0].Name
+
+    def clear(self) -> None:
+        self._mutex.lock()
+        self.store.clear()
+        self._views.clear()
+        self._view_parents.clear()
+        self._mutex.unlock()
+
+    def save_to_disk(self) -> None:
+        self.store.save_to_disk()
@@ -12,10 +12,12 @@ from typing import (
     Union,
     Generator,
 )
-import requests
+from pathlib import Path
+from urllib.parse import urlparse
 import time
 import json, atexit
 from pydantic import BaseModel, ValidationError
+from pydantic.fields import SHAPE_SINGLETON
 from pydantic_collections import BaseCollectionModel
 from PySide6.QtCore import QMutex, QMutexLocker
 from xivapi.models import (
@@ -27,138 +29,324 @@ from xivapi.models import (
     Recipe,
     RecipeCollection,
 )
-from cache import Persist, PersistMapping, get_size
+from cache import Persist, PersistMapping, SingleFlight, get_size
+from xivapi.gameData import game_data
+from xivapi.nameIndex import NameIndex
+from xivapi.recipeGraph import INGREDIENT_COUNT, RecipeGraph
+from transport.fastDecode import loads, parse_model
+from transport.transport import http_client
 
 _logger = logging.getLogger(__name__)
 
-GET_CONTENT_RATE = 0.05
-get_content_time = time.time() - GET_CONTENT_RATE
+XIVAPI_URL = "https://xivapi.com"
+REQUEST_RATE = 20  # requests per second
+REQUEST_BURST = 20
+
+RECIPE_CACHE_TIMEOUT_S = 3600 * 24 * 30
+IDS_CHUNK_SIZE = 100  # Documents per ids= request, one page of results
+LIST_PAGE_LIMIT = 3000  # Most results xivapi returns per list page
+CLASSJOB_DOH_CATEGORY = "Disciple of the Hand"
+SEARCH_RESULT_LIMIT = 100  # Recipes search_recipes returns from the name index
 
 PRINT_CACHE_SIZE = False
 
-xivapi_mutex = QMutex()
+http_client.set_rate_limit(urlparse(XIVAPI_URL).netloc, REQUEST_RATE, REQUEST_BURST)
+# Requests of the same url made at once share one response
+content_single_flight = SingleFlight()
 
 R = TypeVar("R", bound=BaseModel)
 
 
-# TODO: Move this to QNetworkRequest
-# https://stackoverflow.com/a/59537535/
-def get_content(content_name: str, t: Optional[R] = None):
+def _get_content_url(content_name: str) -> str:
     if content_name[0] == "/":
         content_name = content_name[1:]
-    url = f"https://xivapi.com/{content_name}"
-    global get_content_time
-    xivapi_mutex.lock()
-    now_time = time.time()
-    if now_time - get_content_time < GET_CONTENT_RATE:
-        time.sleep(GET_CONTENT_RATE - now_time + get_content_time)
-    for _ in range(10):
-        try:
-            content_response = requests.get(url)
-            get_content_time = time.time()
-            content_response.raise_for_status()
-        except Exception as e:
-            time.sleep(0.05)
-            print(str(e))
+    return f"{XIVAPI_URL}/{content_name}"
+
+
+def get_content(content_name: str, t: Optional[R] = None):
+    if t is not None:
+        content = _get_game_data_content(content_name, t)
+        if content is not None:
+            return content
+    url = _get_content_url(content_name)
+    content_response = content_single_flight(url, http_client.get, url)
+    return _parse_content(content_name, content_response, t)
+
+
+# Documents requested as {content name}/{ID} come from the game data snapshot when
+# it has them
+def _get_game_data_content(content_name: str, t: Type[R]) -> Optional[R]:
+    name_id = content_name.strip("/").split("/")
+    if len(name_id) != 2 or not name_id[1].isdigit():
+        return None
+    return game_data.get(name_id[0], int(name_id[1]), t)
+
+
+def _parse_content(content_name: str, content_response: Any, t: Optional[R] = None):
+    try:
+        if t is not None:
+            return parse_model(t, loads(content_response.content))
         else:
-            break
-    xivapi_mutex.unlock()
-    if content_response is not None:
-        try:
-            if t is not None:
-                return t.parse_obj(content_response.json())
-            else:
-                print(f"size of response: {len(content_response.content)}")
-                return content_response.content
-        except ValidationError as e:
-            print(f"'{content_name}' failed validation: {e}")
-            print(f"Content Response: {content_response.text}")
-            raise e
-    else:
-        raise RuntimeError("Failed to get content")
+            print(f"size of response: {len(content_response.content)}")
+            return content_response.content
+    except ValidationError as e:
+        print(f"'{content_name}' failed validation: {e}")
+        print(f"Content Response: {content_response.text}")
+        raise e
 
 
 def _get_item(item_id: int) -> Item:
-    return get_content(f"Item/{item_id}", Item)
+    item: Item = get_content(f"Item/{item_id}", Item)
+    item_name_index.add(item.ID, item.Name)
+    return item
 
 
-get_item = Persist(_get_item, "items.json", 3600 * 24 * 30, Item)
+get_item = Persist(_get_item, "items.bin", 3600 * 24 * 30, Item)
 
 if PRINT_CACHE_SIZE:
     print(f"Size of item cache: {len(get_item.cache)} {get_size(get_item):,.0f} bytes")
 
+
+def _is_classjob_doh(classjob: ClassJob) -> bool:
+    return (
+        not isinstance(classjob.ClassJobCategory, int)
+        and classjob.ClassJobCategory.Name == CLASSJOB_DOH_CATEGORY
+    )
+
+
+# The crafting class jobs, from the game data snapshot or else from one request
+# listing every class job with only the columns ClassJob reads. The list endpoint
+# cannot filter on the category, so the few dozen rows are filtered here.
 def _get_classjob_doh_list() -> List[ClassJob]:
-    classjob_doh_list = []
-    for result_list in get_content_page_results("ClassJob"):
-        for result in result_list:
-            classjob_info: ClassJob = get_content(result.Url, ClassJob)
-            if classjob_info.ClassJobCategory.Name == "Disciple of the Hand":
-                classjob_doh_list.append(classjob_info)
-    return classjob_doh_list
+    if game_data.has_content("ClassJob"):
+        classjob_list = list(game_data.yield_models("ClassJob", ClassJob))
+    else:
+        classjob_list = [
+            parse_model(ClassJob, row)
+            for row in yield_content_rows("ClassJob", ",".join(get_columns(ClassJob)))
+        ]
+    return [classjob for classjob in classjob_list if _is_classjob_doh(classjob)]
 
 
 get_classjob_doh_list = Persist(
-    _get_classjob_doh_list, "classjob_doh.json", 3600 * 24 * 30, ClassJobCollection
+    _get_classjob_doh_list, "classjob_doh.bin", 3600 * 24 * 30, ClassJobCollection
 )
 
 if PRINT_CACHE_SIZE:
-    print(f"Size of classjob cache: {len(get_classjob_doh_list.cache)} {get_size(get_classjob_doh_list):,.0f} bytes")
+    print(
+        f"Size of classjob cache: {len(get_classjob_doh_list.cache)} {get_size(get_classjob_doh_list):,.0f} bytes"
+    )
 
 
 def get_content_page_results(
     content_name: str,
 ) -> Generator[List[PageResult], None, None]:
-    first_page: Page = get_content(content_name, Page)
-    yield first_page.Results
-    for page in range(2, first_page.Pagination.PageTotal + 1):
-        next_page: Page = get_content(
-            f"{content_name}&page={page}", Page
-        )  # TODO: This should use ? when not searching
-        yield next_page.Results
-
-
-# def yeild_content_page(content_name: str) -> Generator[Page, None, None]:
-#     first_page: Page = get_content(content_name, Page, False)
-#     yield first_page
-#     for page in range(2, first_page.Pagination.PageTotal + 1):
-#         yield get_page(content_name, page)
-
-
-def get_page(content_name: str, page: int) -> Page:
-    if "search" in content_name:
+    for page in yield_content_pages(content_name):
+        yield page.Results
+
+
+# Yields the pages from first_page on in page order. The first page gives the page
+# count, the rest are requested together before it is yielded and go out as fast as
+# the rate limit allows. Pages not yet sent are cancelled if the caller stops early.
+def yield_content_pages(
+    content_name: str, first_page: int = 1
+) -> Generator[Page, None, None]:
+    first_page_name = (
+        content_name if first_page == 1 else _get_page_name(content_name, first_page)
+    )
+    page: Page = get_content(first_page_name, Page)
+    future_list = [
+        (page_name, http_client.submit(_get_content_url(page_name)))
+        for page_name in (
+            _get_page_name(content_name, page_index)
+            for page_index in range(first_page + 1, page.Pagination.PageTotal + 1)
+        )
+    ]
+    try:
+        yield page
+        for page_name, future in future_list:
+            yield _parse_content(page_name, future.result(), Page)
+    finally:
+        for _, future in future_list:
+            future.cancel()
+
+
+def _get_page_name(content_name: str, page: int) -> str:
+    if "?" in content_name:
         delim = "&"
     else:
         delim = "?"
-    return get_content(f"{content_name}{delim}page={page}", Page)
+    return f"{content_name}{delim}page={page}"
+
+
+def get_page(content_name: str, page: int) -> Page:
+    return get_content(_get_page_name(content_name, page), Page)
 
 
 def _get_recipe(url: str) -> Recipe:
     return get_content(url, Recipe)
 
 
-get_recipe = Persist(_get_recipe, "recipes.json", 3600 * 24 * 30, Recipe)
+recipe_graph = RecipeGraph("recipe_graph.bin")
+# Item names, and recipes by the names of their result items, of every item and
+# recipe the caches and the game data snapshot hold. Loaded by load_name_indexes
+# and added to as content is fetched.
+item_name_index = NameIndex()
+recipe_name_index = NameIndex()
+name_index_load_mutex = QMutex()
+
+
+def _get_recipe_id(url: str) -> int:
+    return int(url.rstrip("/").rsplit("/", 1)[1])
+
+
+def is_recipe_cached(url: str) -> bool:
+    update_time = recipe_graph.get_update_time(_get_recipe_id(url))
+    return (
+        update_time is not None and time.time() - update_time <= RECIPE_CACHE_TIMEOUT_S
+    )
+
+
+def _add_recipe(recipe: Recipe) -> None:
+    recipe_graph.add(recipe)
+    _index_recipe_names(recipe)
+
+
+def _index_recipe_names(recipe: Recipe) -> None:
+    recipe_name_index.add(recipe.ID, recipe.ItemResult.Name)
+    item_name_index.add(recipe.ItemResult.ID, recipe.ItemResult.Name)
+    for ingredient_index in range(INGREDIENT_COUNT):
+        item: Optional[Item] = getattr(recipe, f"ItemIngredient{ingredient_index}")
+        if item is not None:
+            item_name_index.add(item.ID, item.Name)
+        for sub_recipe in (
+            getattr(recipe, f"ItemIngredientRecipe{ingredient_index}") or ()
+        ):
+            _index_recipe_names(sub_recipe)
+
+
+def get_recipe(url: str) -> Recipe:
+    if not is_recipe_cached(url):
+        _add_recipe(_get_recipe(url))
+    return recipe_graph.get(_get_recipe_id(url))
+
+
+# Moves the recipes earlier versions cached whole, each with copies of its
+# sub-recipes, into the graph. Called by the app once its window is shown, recipes
+# fetched before then are kept.
+def migrate_recipe_cache() -> None:
+    if not any(Path(f".data/recipes.{suffix}").exists() for suffix in ("bin", "json")):
+        return
+    recipe_cache = Persist(_get_recipe, "recipes.bin", RECIPE_CACHE_TIMEOUT_S, Recipe)
+    for key in recipe_cache.cache:
+        recipe, update_time = recipe_cache.cache[key]
+        if recipe.ID not in recipe_graph:
+            recipe_graph.add(recipe, update_time)
+    recipe_graph.save_to_disk()
+    recipe_cache.cache.file_path.replace(
+        recipe_cache.cache.file_path.with_suffix(".bin.migrated")
+    )
+
 
 if PRINT_CACHE_SIZE:
-    print(f"Size of recipe cache: {len(get_recipe.cache)} {get_size(get_recipe):,.0f} bytes")
+    print(
+        f"Size of recipe cache: {len(recipe_graph)} "
+        f"{get_size(recipe_graph):,.0f} bytes"
+    )
 
 
 def get_recipe_by_id(recipe_id: int) -> Recipe:
     return get_recipe(f"/Recipe/{recipe_id}")
 
 
-def _get_recipes(classjob_id: int, classjob_level: int) -> RecipeCollection:
-    recipe_collection = RecipeCollection()
-    for recipe_results in get_content_page_results(
-        f"search?filters=RecipeLevelTable.ClassJobLevel={classjob_level},ClassJob.ID={classjob_id}"
-    ):
-        for recipe_result in recipe_results:
-            recipe_collection.append(get_recipe(recipe_result.Url))
-    return recipe_collection
+# Dotted columns of the fields a model reads. Lists of nested models, like the
+# ingredient recipes, are kept as whole columns.
+def get_columns(model: Type[BaseModel], prefix: str = "") -> List[str]:
+    column_list = []
+    for name, field in model.__fields__.items():
+        if (
+            field.shape == SHAPE_SINGLETON
+            and isinstance(field.outer_type_, type)
+            and issubclass(field.outer_type_, BaseModel)
+        ):
+            column_list.extend(get_columns(field.outer_type_, f"{prefix}{name}."))
+        else:
+            column_list.append(f"{prefix}{name}")
+    return column_list
 
 
-get_recipes = Persist(
-    _get_recipes, "recipe_collection.json", 3600 * 24 * 30, RecipeCollection
-)
+RECIPE_COLUMNS = ",".join(get_columns(Recipe))
+
+
+def _get_ids_url(content_name: str, id_list: List[int], columns: str) -> str:
+    return _get_content_url(
+        f"{content_name}?ids={','.join(str(id) for id in id_list)}&columns={columns}"
+    )
+
+
+# Yields the documents of id_list with the given columns, fetched IDS_CHUNK_SIZE at a
+# time with every request sent at once. IDs xivapi does not know are left out.
+def yield_content_by_ids(
+    content_name: str, id_list: List[int], columns: str
+) -> Generator[Dict[str, Any], None, None]:
+    future_list = [
+        http_client.submit(
+            _get_ids_url(
+                content_name,
+                id_list[chunk_index : chunk_index + IDS_CHUNK_SIZE],
+                columns,
+            )
+        )
+        for chunk_index in range(0, len(id_list), IDS_CHUNK_SIZE)
+    ]
+    try:
+        for future in future_list:
+            yield from loads(future.result().content)["Results"]
+    finally:
+        for future in future_list:
+            future.cancel()
+
+
+# Yields every document of a content with the given columns, listed LIST_PAGE_LIMIT
+# to a page
+def yield_content_rows(
+    content_name: str, columns: str
+) -> Generator[Dict[str, Any], None, None]:
+    page: Optional[int] = 1
+    while page is not None:
+        content = loads(
+            http_client.get(
+                _get_content_url(
+                    f"{content_name}?limit={LIST_PAGE_LIMIT}&columns={columns}"
+                    f"&page={page}"
+                )
+            ).content
+        )
+        yield from content["Results"]
+        page = content["Pagination"]["PageNext"]
+
+
+# Gets recipes by their /Recipe/{id} urls. Recipes neither in the recipe graph nor
+# in the game data snapshot are fetched with only the columns the Recipe model
+# reads, and added to the graph as get_recipe would have.
+def get_recipes_by_url(url_list: List[str]) -> List[Recipe]:
+    recipe_id_list = sorted(
+        {
+            int(url.rsplit("/", 1)[1])
+            for url in url_list
+            if url.startswith("/Recipe/") and not is_recipe_cached(url)
+        }
+    )
+    recipe_id_list = [
+        recipe_id
+        for recipe_id in recipe_id_list
+        if not game_data.has("Recipe", recipe_id)
+    ]
+    for result in yield_content_by_ids("Recipe", recipe_id_list, RECIPE_COLUMNS):
+        _add_recipe(parse_model(Recipe, result))
+    # Anything the bulk responses left out is fetched on its own
+    return [get_recipe(url) for url in url_list]
+
 
 # Mapping classjob_id -> classjob_level -> list of recipe urls
 recipe_classjob_level_list_mutex = QMutex()
@@ -180,8 +368,21 @@ def yield_recipes(
         url_list = recipe_classjob_level_list[classjob_id][classjob_level]
         # print(f"{len(url_list)} recipes")
         recipe_classjob_level_list_mutex.unlock()
-        for url in url_list:
-            yield get_recipe(url)
+        for recipe in get_recipes_by_url(url_list):
+            yield recipe
+    elif game_data.has_content("Recipe"):
+        recipe_classjob_level_list_mutex.unlock()
+        url_list = [
+            f"/Recipe/{recipe_id}"
+            for recipe_id in game_data.get_recipe_ids(classjob_id, classjob_level)
+        ]
+        for recipe in get_recipes_by_url(url_list):
+            yield recipe
+        recipe_classjob_level_list_mutex.lock()
+        recipe_classjob_level_list.setdefault(classjob_id, {})[
+            classjob_level
+        ] = url_list
+        recipe_classjob_level_list_mutex.unlock()
     else:
         print(f"No cached recipes for {classjob_id} {classjob_level}")
         recipe_classjob_level_list_mutex.unlock()
@@ -190,10 +391,14 @@ def yield_recipes(
             f"search?filters=RecipeLevelTable.ClassJobLevel={classjob_level},ClassJob.ID={classjob_id}"
         ):
             print(f"{len(page_result_list)} recipes")
-            for page_result in page_result_list:
-                if page_result.UrlType == "Recipe":
-                    url_list.append(page_result.Url)
-                    yield get_recipe(page_result.Url)
+            page_url_list = [
+                page_result.Url
+                for page_result in page_result_list
+                if page_result.UrlType == "Recipe"
+            ]
+            url_list.extend(page_url_list)
+            for recipe in get_recipes_by_url(page_url_list):
+                yield recipe
         recipe_classjob_level_list_mutex.lock()
         recipe_classjob_level_list.setdefault(classjob_id, {})[
             classjob_level
@@ -201,6 +406,12 @@ def yield_recipes(
         recipe_classjob_level_list_mutex.unlock()
 
 
+def get_recipes(classjob_id: int, classjob_level: int) -> RecipeCollection:
+    recipe_collection = RecipeCollection()
+    recipe_collection.extend(yield_recipes(classjob_id, classjob_level))
+    return recipe_collection
+
+
 def get_recipes_up_to_level(
     classjob_id: int, classjob_level_max: int
 ) -> RecipeCollection:
@@ -213,12 +424,73 @@ def get_recipes_up_to_level(
     return recipe_collection
 
 
+# Fills the name indexes from the game data snapshot, the recipe graph and the item
+# cache, once. Names fetched meanwhile are already in them.
+def load_name_indexes() -> None:
+    name_index_load_mutex.lock()
+    try:
+        if recipe_name_index.loaded:
+            return
+        t = time.perf_counter()
+        item_name_dict: Dict[int, str] = dict(game_data.yield_names("Item"))
+        for item in recipe_graph.yield_items():
+            item_name_dict[item.ID] = item.Name
+        for key in get_item.cache:
+            entry = get_item.cache.get(key)
+            if entry is not None:
+                item_name_dict[entry[0].ID] = entry[0].Name
+        item_name_index.add_many(item_name_dict.items())
+        recipe_name_index.add_many(
+            (recipe_id, item_name_dict[item_id])
+            for recipe_id, item_id in game_data.get_recipe_result_ids()
+            if item_id in item_name_dict
+        )
+        recipe_name_index.add_many(recipe_graph.yield_recipe_names())
+        item_name_index.loaded = True
+        recipe_name_index.loaded = True
+        _logger.info(
+            f"Indexed {len(item_name_index)} item and {len(recipe_name_index)} "
+            f"recipe names in {time.perf_counter() - t:.2f}s"
+        )
+    finally:
+        name_index_load_mutex.unlock()
+
+
+# Recipes whose result item names have words starting with each word of
+# search_string, from the recipe name index. xivapi is only searched for names the
+# index has not seen, and if it finds nothing either, recipes with names close to
+# search_string are returned.
 def search_recipes(search_string: str) -> RecipeCollection:
+    load_name_indexes()
     recipe_collection = RecipeCollection()
-    for results in get_content_page_results(f"search?string={search_string}"):
-        for recipe_result in results:
-            if recipe_result.UrlType == "Recipe":
-                recipe_collection.append(get_recipe(recipe_result.Url))
+    recipe_id_list = [
+        recipe_id
+        for recipe_id, _ in recipe_name_index.search(
+            search_string, SEARCH_RESULT_LIMIT, fuzzy=False
+        )
+    ]
+    if len(recipe_id_list) == 0:
+        for results in get_content_page_results(f"search?string={search_string}"):
+            recipe_collection.extend(
+                get_recipes_by_url(
+                    [
+                        recipe_result.Url
+                        for recipe_result in results
+                        if recipe_result.UrlType == "Recipe"
+                    ]
+                )
+            )
+        if len(recipe_collection) > 0:
+            return recipe_collection
+        recipe_id_list = [
+            recipe_id
+            for recipe_id, _ in recipe_name_index.search(
+                search_string, SEARCH_RESULT_LIMIT
+            )
+        ]
+    recipe_collection.extend(
+        get_recipes_by_url([f"/Recipe/{recipe_id}" for recipe_id in recipe_id_list])
+    )
     return recipe_collection
 
 
@@ -226,5 +498,4 @@ def save_to_disk() -> None:
     recipe_classjob_level_list.save_to_disk()
     get_item.save_to_disk()
     get_classjob_doh_list.save_to_disk()
-    get_recipe.save_to_disk()
-    get_recipes.save_to_disk()
+    recipe_graph.save_to_disk()